@@ -1,2 +1,3 @@
 from pycharles.model import Model
+from pycharles.islands import Islands
 from pycharles import offspring_functions
@@ -0,0 +1,141 @@
+import math
+from collections import OrderedDict
+
+
+def _test_bits(bits, positions):
+    for p in positions:
+        if not bits[p >> 3] & (1 << (p & 7)):
+            return False
+    return True
+
+
+class GenomeArchive:
+    """
+    A bounded archive of the canonical keys of genomes which were already explored. Once the archive is full, the
+    oldest keys are forgotten first.
+    """
+
+    _max_size = None
+    _keys = None
+
+    def __init__(self, max_size):
+        """
+        Create a new empty archive
+
+        :param max_size: a positive integer. the maximal number of keys to keep
+        """
+        if max_size < 1:
+            raise ValueError("Archive size must be a positive integer")
+        self._max_size = max_size
+        self.clear()
+
+    def __len__(self): return len(self._keys)
+
+    def __contains__(self, key): return key in self._keys
+
+    def get_max_size(self): return self._max_size
+
+    def clear(self):
+        self._keys = OrderedDict()
+
+    def add(self, key):
+        """
+        Add a key to the archive, forgetting the oldest key if the archive is full. Adding a key which is already
+        archived has no effect.
+
+        :param key: a canonical key of a genome
+        """
+        if key in self._keys:
+            return
+        if len(self._keys) >= self._max_size:
+            self._keys.popitem(last=False)
+        self._keys[key] = None
+
+
+class BloomArchive:
+    """
+    A bounded archive of the canonical keys of genomes which were already explored, based on Bloom filters. This
+    uses a small, fixed amount of memory regardless of the size of the keys, at the price of false positives: a
+    genome which was never archived is reported as archived with a small probability. Keys are added to the current
+    filter until it holds max_size keys, at which point it becomes the previous filter and a new filter is started,
+    so roughly the last max_size to 2*max_size keys are remembered.
+    """
+
+    _max_size = None
+    _bits_num = None
+    _hashes_num = None
+    _current = None
+    _previous = None
+    _count = 0
+
+    def __init__(self, max_size, false_positive_rate=0.01):
+        """
+        Create a new empty archive
+
+        :param max_size: a positive integer. the number of keys each filter holds
+        :param false_positive_rate: a number in the range (0,1). the false-positive rate of each full filter
+        """
+        if max_size < 1:
+            raise ValueError("Archive size must be a positive integer")
+        if false_positive_rate <= 0.0 or false_positive_rate >= 1.0:
+            raise ValueError("False-positive rate must be in the range (0,1)")
+        self._max_size = max_size
+        self._bits_num = max(8, int(math.ceil(-max_size * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self._hashes_num = max(1, int(round(self._bits_num / max_size * math.log(2))))
+        self.clear()
+
+    def __len__(self): return self._count
+
+    def __contains__(self, key):
+        positions = self._positions(key)
+        return _test_bits(self._current, positions) or (self._previous is not None and
+                                                        _test_bits(self._previous, positions))
+
+    def get_max_size(self): return self._max_size
+
+    def clear(self):
+        self._current = bytearray((self._bits_num + 7) // 8)
+        self._previous = None
+        self._count = 0
+
+    def _positions(self, key):
+        # double hashing: the i-th position is h1 + i*h2
+        h1 = hash(key)
+        h2 = hash((key, h1)) | 1
+        return [(h1 + i * h2) % self._bits_num for i in range(0, self._hashes_num)]
+
+    def add(self, key):
+        """
+        Add a key to the archive. Adding a key which is already archived has no effect.
+
+        :param key: a canonical key of a genome
+        """
+        positions = self._positions(key)
+        if _test_bits(self._current, positions):
+            return
+        if self._count >= self._max_size:
+            self._previous = self._current
+            self._current = bytearray((self._bits_num + 7) // 8)
+            self._count = 0
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        self._count += 1
+
+
+_archives = {'exact': GenomeArchive,
+             'bloom': BloomArchive}
+
+
+def genome_archive(max_size, kind='exact'):
+    """
+    Create a genome archive of the requested kind
+
+    :param max_size: a positive integer. the maximal number of keys to keep (see GenomeArchive and BloomArchive)
+    :param kind: string. either 'exact' or 'bloom'
+    :return: an empty archive
+    """
+    try:
+        archive = _archives[kind.lower()]
+    except KeyError:
+        raise ValueError("Invalid archive type")
+    return archive(max_size)
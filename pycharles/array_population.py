@@ -0,0 +1,751 @@
+import numpy as np
+from pycharles.diversity import DiversityTracker
+
+
+def _draw(cumulative, r):
+    """
+    Finds the indices of the cumulative-probabilities table which match the random numbers r.
+
+    :param cumulative: a 1-D array of cumulative probabilities
+    :param r: a 1-D array of random numbers in the range (0, cumulative[-1]]
+    :return: a 1-D array of indices
+    """
+    return np.minimum(np.searchsorted(cumulative, r, side='left'), len(cumulative) - 1)
+
+
+def _draw_excluding(probabilities, cumulative, ignore, rng):
+    """
+    Draws one index per entry of ignore, based on the probabilities table, where each draw never returns
+    the matching ignored index. This is the vectorized equivalent of RouletteWheel.select(ignore_index).
+
+    :param probabilities: a 1-D array of probabilities
+    :param cumulative: a 1-D array of the cumulative probabilities
+    :param ignore: a 1-D array of indices to ignore, one per draw
+    :param rng: a numpy random Generator
+    :return: a 1-D array of indices
+    """
+    n = len(probabilities)
+    p = probabilities[ignore]
+    before = cumulative[ignore] - p
+    remaining = cumulative[-1] - p
+    r = (1.0 - rng.random(len(ignore))) * remaining
+    r = np.where(r > before, r + p, r)
+    drawn = _draw(cumulative, r)
+    drawn = np.where(drawn == ignore, np.where(drawn + 1 < n, drawn + 1, drawn - 1), drawn)
+    empty = remaining <= 0.0
+    if empty.any():
+        uniform = rng.integers(0, n - 1, size=int(empty.sum()))
+        uniform += uniform >= ignore[empty]
+        drawn[empty] = uniform
+    return drawn
+
+
+def _uniform_excluding(n, ignore, rng, size=None):
+    """
+    Draws indices uniformly from [0,n), where each draw never returns the matching ignored index.
+
+    :param n: the number of indices to choose from
+    :param ignore: a 1-D array of indices to ignore, one per draw
+    :param rng: a numpy random Generator
+    :param size: the shape of the draws. The first dimension must match ignore
+    :return: an array of indices
+    """
+    drawn = rng.integers(0, n - 1, size=size if size is not None else len(ignore))
+    ignore = ignore if drawn.ndim == 1 else ignore[:, np.newaxis]
+    return drawn + (drawn >= ignore)
+
+
+def _tournament(strengths, size, ignore, rng, number_of_couples):
+    if ignore is None:
+        candidates = rng.integers(0, len(strengths), size=(number_of_couples, size))
+    else:
+        candidates = _uniform_excluding(len(strengths), ignore, rng, (number_of_couples, size))
+    winners = np.argmax(strengths[candidates], axis=1)
+    return candidates[np.arange(0, number_of_couples), winners]
+
+
+def truncation_size(n, ratio, alive_num=None):
+    """
+    Returns the number of subjects which can be selected by truncation selection: the strongest fraction of the
+    subjects whose strength is not 0, but at least two subjects.
+
+    :param n: the population size
+    :param ratio: a number in the range (0,1]. the fraction of the subjects which can be selected
+    :param alive_num: optional. the number of subjects whose strength is not 0. Default: n
+    :return: a non-negative integer
+    """
+    alive_num = n if alive_num is None else alive_num
+    return max(min(alive_num, max(2, int(np.ceil(ratio * alive_num)))), min(n, 2))
+
+
+def select_couples_by_strength(strengths, number_of_couples, method, parameter, rng, pool=None, alive=None):
+    """
+    Selects pairs of parents based on their strengths, using tournament or truncation selection, where the two
+    parents of each pair are different. Subjects whose strength is 0 are never selected, as they cannot reproduce
+    (unless no subject has a positive strength). This is the vectorized equivalent of the Tournament and
+    Truncation selection tables found in the selection module.
+
+    :param strengths: a 1-D array of the strengths of the population
+    :param number_of_couples: the number of pairs to select
+    :param method: string. either 'tournament' or 'truncation'
+    :param parameter: the tournament size, or the truncation ratio
+    :param rng: a numpy random Generator
+    :param pool: optional, 'truncation' only. a 1-D array of the indices of the strongest fraction of the
+                 population (see truncation_size), when already known
+    :param alive: optional, 'tournament' only. a 1-D array of the indices of the subjects whose strength is not 0,
+                  when already known
+    :return: a tuple of two 1-D arrays of indices: (fathers, mothers)
+    """
+    n = len(strengths)
+    if method == 'tournament':
+        if alive is None:
+            alive = np.flatnonzero(strengths > 0.0)
+        if alive.shape[0] == 0:
+            alive = np.arange(0, n)
+        alive_strengths = strengths[alive]
+        fathers = _tournament(alive_strengths, parameter, None, rng, number_of_couples)
+        mothers = _tournament(alive_strengths, parameter, fathers, rng, number_of_couples)
+        return alive[fathers], alive[mothers]
+    if pool is None:
+        m = truncation_size(n, parameter, int((strengths > 0.0).sum()))
+        pool = np.argpartition(-strengths, m - 1)[0:m] if m < n else np.arange(0, n)
+    m = pool.shape[0]
+    positions = rng.integers(0, m, size=number_of_couples)
+    fathers = pool[positions]
+    mothers = pool[_uniform_excluding(m, positions, rng)]
+    return fathers, mothers
+
+
+def select_couples(probabilities, cumulative, number_of_couples, method, rng):
+    """
+    Selects pairs of parents based on their survival-probabilities, where the two parents of each pair are
+    different. This is the vectorized equivalent of the selection tables found in the selection module. 'roulette'
+    is implemented as a single vectorized binary search over the cumulative probabilities, while 'sus' draws all
+    parents using evenly spaced pointers.
+
+    :param probabilities: a 1-D array of the survival-probabilities of the population
+    :param cumulative: a 1-D array of the cumulative survival-probabilities of the population
+    :param number_of_couples: the number of pairs to select
+    :param method: string. either 'roulette' or 'sus'
+    :param rng: a numpy random Generator
+    :return: a tuple of two 1-D arrays of indices: (fathers, mothers)
+    """
+    n = len(probabilities)
+    total = cumulative[-1]
+    if total <= 0.0:
+        fathers = rng.integers(0, n, size=number_of_couples)
+        mothers = rng.integers(0, n - 1, size=number_of_couples)
+        mothers += mothers >= fathers
+        return fathers, mothers
+    if method == 'sus':
+        step = total / (2 * number_of_couples)
+        pointers = (rng.random() + np.arange(0, 2 * number_of_couples)) * step
+        parents = _draw(cumulative, pointers)
+        rng.shuffle(parents)
+        fathers = parents[0::2]
+        mothers = parents[1::2].copy()
+        conflicts = fathers == mothers
+        if conflicts.any():
+            mothers[conflicts] = _draw_excluding(probabilities, cumulative, fathers[conflicts], rng)
+    else:
+        fathers = _draw(cumulative, (1.0 - rng.random(number_of_couples)) * total)
+        mothers = _draw_excluding(probabilities, cumulative, fathers, rng)
+    return fathers, mothers
+
+
+def slice_and_stitch_batch(fathers, mothers, widths, sizes, rng):
+    """
+    The batched equivalent of offspring_functions.slice_and_stitch, which breeds all couples at once. Each couple is
+    sliced at a random position of the binary representation of its subjects. Genes before the slicing position are
+    copied as they are, and the gene in which the slicing position falls is stitched with bit masks.
+
+    :param fathers: a 2-D integer matrix of the gene indices of one parent of each couple
+    :param mothers: a 2-D integer matrix of the gene indices of the other parent of each couple
+    :param widths: a 1-D array of the number of bits of each gene
+    :param sizes: a 1-D array of the size of the pool of values of each gene
+    :param rng: a numpy random Generator
+    :return: a tuple of two 2-D integer matrices, the first and second child of each couple
+    """
+    offsets = np.cumsum(widths) - widths
+    r = rng.integers(0, int(widths.sum()) + 1, size=(fathers.shape[0], 1))
+    # the number of low bits of each gene which are taken from the other parent
+    low_bits = np.clip(offsets + widths - r, 0, widths)
+    masks = np.left_shift(1, low_bits) - 1
+    child1 = (fathers & ~masks) | (mothers & masks)
+    child2 = (mothers & ~masks) | (fathers & masks)
+    return child1 % sizes, child2 % sizes
+
+
+def parents_similarity_batch(fathers, mothers, widths, sizes, rng):
+    """
+    The batched equivalent of offspring_functions.parents_similarity, which breeds all couples at once. Bits
+    which are the same in both parents are kept, and the bits where the parents differ are replaced with random bits.
+
+    :param fathers: a 2-D integer matrix of the gene indices of one parent of each couple
+    :param mothers: a 2-D integer matrix of the gene indices of the other parent of each couple
+    :param widths: a 1-D array of the number of bits of each gene
+    :param sizes: a 1-D array of the size of the pool of values of each gene
+    :param rng: a numpy random Generator
+    :return: a tuple of two 2-D integer matrices, the first and second child of each couple
+    """
+    diff = fathers ^ mothers
+    same = fathers & ~diff
+    limits = np.left_shift(1, widths)
+    child1 = same | (rng.integers(0, limits, size=fathers.shape) & diff)
+    child2 = same | (rng.integers(0, limits, size=fathers.shape) & diff)
+    return child1 % sizes, child2 % sizes
+
+
+def mutate_batch(genes, mutation_odds, widths, sizes, rng, skip_sampling_odds=0.05):
+    """
+    Mutate a matrix of gene indices in place. Each bit of the binary representation of each gene index is
+    flipped with probability mutation_odds.
+
+    :param genes: a 2-D integer matrix of gene indices
+    :param mutation_odds: a number in the continuous range [0,1], representing the probability of a bit
+                          flipping its value
+    :param widths: the number of bits of each gene
+    :param sizes: the number of possible values of each gene
+    :param rng: a numpy random Generator
+    :param skip_sampling_odds: below these odds, only the positions of the flipped bits are drawn
+    """
+    if mutation_odds <= 0.0 or genes.size == 0:
+        return
+    if mutation_odds < skip_sampling_odds:
+        _mutate_sparse(genes, mutation_odds, widths, sizes, rng)
+        return
+    for b in range(0, int(widths.max())):
+        flips = (rng.random(genes.shape) < mutation_odds) & (widths > b)
+        genes ^= flips.astype(np.int64) << b
+    genes %= sizes
+
+
+def _mutate_sparse(genes, mutation_odds, widths, sizes, rng):
+    """
+    Mutate a matrix of gene indices in place, by drawing only the positions of the flipped bits. The gaps between
+    flipped bits of the entire matrix (viewed as one long sequence of bits) are drawn from a geometric
+    distribution, so the cost is proportional to the number of flipped bits rather than the number of bits.
+    """
+    offsets = np.concatenate(([0], np.cumsum(widths)))
+    row_bits = int(offsets[-1])
+    total_bits = row_bits * genes.shape[0]
+    expected = total_bits * mutation_odds
+    positions = np.cumsum(rng.geometric(mutation_odds, size=int(expected + 4 * expected ** 0.5) + 16)) - 1
+    while positions[-1] < total_bits:
+        more = np.cumsum(rng.geometric(mutation_odds, size=positions.shape[0])) + positions[-1]
+        positions = np.concatenate((positions, more))
+    positions = positions[positions < total_bits]
+    if positions.shape[0] == 0:
+        return
+    rows, bits = np.divmod(positions, row_bits)
+    cols = np.searchsorted(offsets, bits, side='right') - 1
+    masks = np.left_shift(1, widths[cols] - 1 - (bits - offsets[cols]))
+    np.bitwise_xor.at(genes, (rows, cols), masks)
+    genes[rows, cols] %= sizes[cols]
+
+
+batch_offspring_functions = {'slice_and_stitch': slice_and_stitch_batch,
+                             'parents_similarity': parents_similarity_batch}
+
+
+class ArrayPopulation:
+    """
+    A population stored as NumPy arrays rather than as a list of Elements. Each subject is a row in a 2-D
+    integer matrix, where each cell holds the index of the gene in its pool of possible values. Strengths and
+    probabilities are 1-D float arrays, aligned with the rows of the matrix. Subjects are decoded back to their
+    values only when requested.
+    """
+
+    _codec = None
+    _widths = None
+    _sizes = None
+    _genes = None
+    _strengths = None
+    _probabilities = None
+    _parent_genes = None
+    _parent_strengths = None
+    _parent_probabilities = None
+    _parent_cumulative = None
+    _rng = None
+    _seed_sequence = None
+    _buffers = list()
+    _max_buffers = 2
+    _skip_sampling_odds = 0.05
+
+    def __init__(self, codec, genome_length, seed=None):
+        """
+        Create a new empty population
+
+        :param codec: a GeneCodec of all values a subject in the population can have
+        :param genome_length: the number of genes of each subject
+        :param seed: a seed to be supplied to the population's pseudo-random number generator
+        """
+        self._codec = codec
+        layout = codec.layout(genome_length)
+        self._sizes = np.array(layout.sizes, dtype=np.int64)
+        self._widths = np.array(layout.widths, dtype=np.int64)
+        self.set_seed(seed)
+        self._buffers = list()
+        self.set_genes(np.zeros((0, genome_length), dtype=np.int64))
+
+    def __len__(self): return self._genes.shape[0]
+
+    def get_genes(self): return self._genes
+    def get_strengths(self): return self._strengths
+    def get_probabilities(self): return self._probabilities
+
+    def set_seed(self, seed):
+        self._seed_sequence = np.random.SeedSequence(seed)
+        self._rng = np.random.default_rng(self._seed_sequence)
+
+    def spawn_rngs(self, n):
+        """
+        Create independent pseudo-random number generators, derived from the seed of the population rather than
+        from the numbers it has drawn. Each call returns new generators.
+
+        :param n: the number of generators
+        :return: a list of numpy random Generators
+        """
+        return [np.random.default_rng(s) for s in self._seed_sequence.spawn(n)]
+
+    def set_genes(self, genes):
+        """
+        Replace the population with a new matrix of gene indices. Strengths and probabilities are reset.
+
+        :param genes: a 2-D integer matrix of gene indices
+        """
+        self._genes = genes
+        self._strengths = np.zeros(genes.shape[0], dtype=np.float64)
+        self._probabilities = np.zeros(genes.shape[0], dtype=np.float64)
+
+    def encode(self, population):
+        """
+        Convert subjects to a matrix of gene indices
+
+        :param population: a sequence of subjects
+        :return: a 2-D integer matrix of gene indices
+        """
+        genes = np.array(self._codec.to_indices_batch(population), dtype=np.int64)
+        return genes.reshape((len(population), self._genes.shape[1]))
+
+    def decode(self, genes):
+        """
+        Convert a matrix of gene indices back to subjects
+
+        :param genes: a 2-D integer matrix of gene indices
+        :return: a list of subjects
+        """
+        return self._codec.from_indices_batch(genes.tolist())
+
+    def get_rng_state(self):
+        """
+        Returns the state of the population's pseudo-random number generator, including the generators it spawned
+
+        :return: a dict which can be serialized as JSON
+        """
+        return {'bit_generator': self._rng.bit_generator.state, 'entropy': self._seed_sequence.entropy,
+                'spawned': self._seed_sequence.n_children_spawned}
+
+    def set_rng_state(self, state):
+        """
+        Restore the state of the population's pseudo-random number generator
+
+        :param state: a state returned by get_rng_state
+        """
+        self._seed_sequence = np.random.SeedSequence(state['entropy'], n_children_spawned=state['spawned'])
+        self._rng = np.random.default_rng(self._seed_sequence)
+        self._rng.bit_generator.state = state['bit_generator']
+
+    def load(self, indices, strengths, genome_length):
+        """
+        Replace the population with an already evaluated population, such as the one of a checkpoint. No data is
+        copied: the genes and strengths are read-only views over the provided buffers (which may be memory-mapped),
+        and as all operations of the population write their results into the population's own buffers, the provided
+        buffers are never written to.
+
+        :param indices: a buffer of the gene indices of all subjects, row after row
+        :param strengths: a buffer of the strengths of all subjects, as doubles
+        :param genome_length: the number of genes of each subject
+        """
+        self._strengths = np.frombuffer(strengths, dtype=np.float64)
+        self._genes = np.frombuffer(indices, dtype=indices.format).reshape(len(self._strengths), genome_length)
+        self._probabilities = np.zeros(len(self._strengths), dtype=np.float64)
+        self._parent_genes = None
+
+    def set_subjects(self, population):
+        self.set_genes(self.encode(population))
+        self._parent_genes = None
+
+    def get_subjects(self, n=None):
+        """
+        Decode the subjects of the population
+
+        :param n: if defined, decode only the first n subjects
+        :return: a list of subjects
+        """
+        return self.decode(self._genes if n is None else self._genes[0:n])
+
+    def _in_use(self, buffer):
+        return any(genes is not None and (genes is buffer or genes.base is buffer)
+                   for genes in (self._genes, self._parent_genes))
+
+    def _buffer(self, rows):
+        """
+        Returns a matrix of gene indices of the requested number of rows, to write a new population into. The matrix
+        is a view of one of the buffers the population reuses across generations, which holds neither the current
+        population nor the parents generation. If all buffers are in use, a new matrix is allocated.
+
+        :param rows: the number of rows
+        :return: a writable 2-D integer matrix
+        """
+        genome_length = self._genes.shape[1]
+        free = [i for i, buffer in enumerate(self._buffers) if not self._in_use(buffer)]
+        for i in free:
+            if self._buffers[i].shape[0] >= rows:
+                return self._buffers[i][0:rows]
+        buffer = np.empty((rows, genome_length), dtype=np.int64)
+        if free:
+            self._buffers[free[0]] = buffer
+        elif len(self._buffers) < self._max_buffers:
+            self._buffers.append(buffer)
+        return buffer
+
+    def keep(self, rows):
+        """
+        Keep only the specified rows of the population, in the order provided
+
+        :param rows: a slice, an array of row indices or a boolean mask
+        """
+        if isinstance(rows, slice):
+            self._genes = self._genes[rows]
+        else:
+            rows = np.asarray(rows)
+            if rows.dtype == np.bool_:
+                rows = np.flatnonzero(rows)
+            genes = self._buffer(rows.shape[0])
+            if self._genes.dtype == genes.dtype:
+                np.take(self._genes, rows, axis=0, out=genes)
+            else:
+                genes[:] = self._genes[rows]
+            self._genes = genes
+        self._strengths = self._strengths[rows]
+        self._probabilities = self._probabilities[rows]
+
+    def extend(self, genes):
+        """
+        Add new subjects to the population. The strengths and probabilities of the new subjects are zero.
+
+        :param genes: a 2-D integer matrix of gene indices
+        """
+        n = len(self)
+        extended = self._buffer(n + genes.shape[0])
+        extended[0:n] = self._genes
+        extended[n:] = genes
+        self._genes = extended
+        self._strengths = np.concatenate((self._strengths, np.zeros(genes.shape[0], dtype=np.float64)))
+        self._probabilities = np.concatenate((self._probabilities, np.zeros(genes.shape[0], dtype=np.float64)))
+
+    def next_generation(self, survivors_num, children):
+        """
+        Replace the population with the next generation: its first survivors_num subjects, except for those with
+        strength 0, followed by new subjects. The strengths and probabilities of the new subjects are zero.
+
+        :param survivors_num: the number of subjects at the beginning of the population which may survive
+        :param children: a 2-D integer matrix of gene indices of the new subjects
+        :return: the number of subjects which survived
+        """
+        survivors = np.flatnonzero(self._strengths[0:survivors_num] > 0.0)
+        n = survivors.shape[0]
+        genes = self._buffer(n + children.shape[0])
+        genes[0:n] = self._genes[survivors]
+        genes[n:] = children
+        strengths = np.zeros(genes.shape[0], dtype=np.float64)
+        strengths[0:n] = self._strengths[survivors]
+        probabilities = np.zeros(genes.shape[0], dtype=np.float64)
+        probabilities[0:n] = self._probabilities[survivors]
+        self._genes = genes
+        self._strengths = strengths
+        self._probabilities = probabilities
+        return n
+
+    def replace_last(self, population):
+        """
+        Replace the last subjects of the population with new subjects. The strengths and probabilities of the new
+        subjects are zero.
+
+        :param population: a sequence of subjects
+        """
+        n = len(population)
+        self.keep(slice(0, len(self) - n))
+        self.extend(self.encode(population))
+
+    def kill_misfits(self):
+        """
+        Remove all subjects with strength 0
+        """
+        self.keep(self._strengths > 0.0)
+
+    def evaluation_chunks(self):
+        """
+        Returns the slices of rows whose strengths are computed together, as a single batch. The entire population
+        is a single batch.
+
+        :return: a list of slices
+        """
+        return [slice(0, len(self))]
+
+    def reset_strengths(self):
+        """
+        Set the strengths and probabilities of all subjects to zero
+        """
+        self._reset_strengths()
+
+    def _reset_strengths(self):
+        # new arrays, as the current ones may be shared with the parents generation, or be read-only
+        self._strengths = np.zeros(len(self), dtype=np.float64)
+        self._probabilities = np.zeros(len(self), dtype=np.float64)
+
+    def strengths_to_evaluate(self, fitness_cache=None, indices=False, rows=None):
+        """
+        Find the subjects whose strength must be computed. When a fitness cache is provided, cached strengths are
+        set right away, and each distinct subject which is not in the cache is returned once.
+
+        :param fitness_cache: optional. a FitnessCache, keyed by the bytes of each subject's gene indices
+        :param indices: Boolean. if True, return a 2-D matrix of gene indices rather than a list of decoded subjects
+        :param rows: optional. a slice of the rows to evaluate, out of evaluation_chunks. The strengths of the
+                     entire population are reset along with its first rows. Default: the entire population
+        :return: a tuple of (subjects, pending), where pending should be passed to set_strengths along with the
+                 strengths of the subjects
+        """
+        rows = slice(0, len(self)) if rows is None else rows
+        if rows.start == 0:
+            self._reset_strengths()
+        genes = self._genes[rows]
+        if fitness_cache is None:
+            return self._batch(genes, indices), None
+        genes = np.ascontiguousarray(genes)
+        strengths = self._strengths[rows]
+        pending = dict()
+        for r in range(0, genes.shape[0]):
+            key = genes[r].tobytes()
+            s = fitness_cache.get(key)
+            if s is None:
+                pending.setdefault(key, list()).append(r)
+            else:
+                strengths[r] = s
+        firsts = np.array([same[0] for same in pending.values()], dtype=np.int64)
+        return self._batch(genes[firsts], indices), pending
+
+    def set_strengths(self, strengths, pending=None, fitness_cache=None, rows=None):
+        """
+        Set the strengths of the subjects returned by strengths_to_evaluate
+
+        :param strengths: a sequence of non-negative numbers
+        :param pending: the pending output of strengths_to_evaluate
+        :param fitness_cache: optional. the FitnessCache provided to strengths_to_evaluate
+        :param rows: optional. the rows provided to strengths_to_evaluate
+        """
+        chunk = self._strengths[slice(0, len(self)) if rows is None else rows]
+        if pending is None:
+            chunk[:] = strengths
+        else:
+            for (key, same), s in zip(pending.items(), strengths):
+                fitness_cache.put(key, s)
+                chunk[same] = s
+
+    def _batch(self, genes, indices):
+        return genes if indices else self.decode(genes)
+
+    def strength_to_probability(self):
+        """
+        Compute the survival-probability of all subjects, which is their normalized strength over the entire
+        population's combined strength. If the combined strength is infinite, only subjects with infinite strength
+        have a non-zero probability.
+        """
+        total_strength = self._strengths.sum()
+        if np.isinf(total_strength):
+            self._probabilities = np.isinf(self._strengths).astype(np.float64)
+        elif total_strength > 0.0:
+            self._probabilities = self._strengths / total_strength
+        else:
+            self._probabilities = np.zeros(len(self), dtype=np.float64)
+
+    def sort(self, top=None):
+        """
+        Sort the population by a decreasing order of strength
+
+        :param top: optional. sort only the top strongest subjects, which are moved to the beginning of the
+                    population, while the order of the rest of the population is arbitrary (a partial sort)
+        """
+        if top is None or top >= len(self):
+            self.keep(np.argsort(-self._strengths, kind='stable'))
+            return
+        order = np.argpartition(-self._strengths, top - 1)
+        first = order[0:top]
+        first = first[np.argsort(-self._strengths[first], kind='stable')]
+        self.keep(np.concatenate((first, order[top:])))
+
+    def build_selection_table(self):
+        """
+        Mark the current population as the parents of the next generation, and build their cumulative
+        survival-probabilities table, which is used for all parent selections of the next generation.
+        """
+        self._parent_genes = self._genes
+        self._parent_strengths = self._strengths
+        self._parent_probabilities = self._probabilities
+        self._parent_cumulative = np.cumsum(self._probabilities)
+
+    def breed(self, number_of_couples, method, offspring_function, batch_offspring_function=None, parameter=None,
+              mutation_odds=None, breeder=None):
+        """
+        Select couples out of the parents generation and create two children for each couple, either using a batch
+        offspring function which breeds all couples at once, or using an offspring function which works on subjects.
+
+        :param number_of_couples: the number of pairs of children to create
+        :param method: string. the selection method, one of 'roulette', 'sus', 'tournament' or 'truncation'
+        :param offspring_function: a function of (subject1, subject2) => (new_subject1, new_subject2)
+        :param batch_offspring_function: optional. a function of (fathers, mothers, widths, sizes, rng) =>
+                                         (children1, children2) of matrices of gene indices, such as
+                                         slice_and_stitch_batch, or its name in batch_offspring_functions. When
+                                         provided, offspring_function is not used
+        :param parameter: the tournament size or truncation ratio, for 'tournament' and 'truncation'
+        :param mutation_odds: optional. when defined, the children are also mutated (see mutate)
+        :param breeder: optional. a ParallelBreeder, which breeds the couples in worker processes when the batch
+                        offspring function is provided by name
+        :return: a 2-D integer matrix of the children's gene indices, where the two children of each couple are
+                 adjacent
+        """
+        if self._parent_genes is None:
+            self.build_selection_table()
+        if method in ('tournament', 'truncation'):
+            fathers, mothers = select_couples_by_strength(self._parent_strengths, number_of_couples, method,
+                                                          parameter, self._rng)
+        else:
+            fathers, mothers = select_couples(self._parent_probabilities, self._parent_cumulative,
+                                              number_of_couples, method, self._rng)
+        if breeder is not None and isinstance(batch_offspring_function, str):
+            return breeder.breed(self._parent_genes, fathers, mothers, batch_offspring_function, self._widths,
+                                 self._sizes, self._seed_sequence, mutation_odds)
+        return self.breed_couples(self._parent_genes, fathers, mothers, offspring_function, batch_offspring_function,
+                                  mutation_odds)
+
+    def breed_couples(self, parents, fathers, mothers, offspring_function, batch_offspring_function=None,
+                      mutation_odds=None):
+        """
+        Create two children for each of the provided couples
+
+        :param parents: a 2-D integer matrix of gene indices of the parents
+        :param fathers: an array of row indices of parents
+        :param mothers: an array of row indices of parents, the same length as fathers
+        :param offspring_function: a function of (subject1, subject2) => (new_subject1, new_subject2)
+        :param batch_offspring_function: optional. a batch offspring function, or its name (see breed)
+        :param mutation_odds: optional. when defined, the children are also mutated (see mutate)
+        :return: a 2-D integer matrix of the children's gene indices, where the two children of each couple are
+                 adjacent
+        """
+        if batch_offspring_function is not None:
+            if isinstance(batch_offspring_function, str):
+                batch_offspring_function = batch_offspring_functions[batch_offspring_function]
+            child1, child2 = batch_offspring_function(parents[fathers], parents[mothers], self._widths, self._sizes,
+                                                      self._rng)
+            children = np.empty((2 * len(fathers), parents.shape[1]), dtype=np.int64)
+            children[0::2] = child1
+            children[1::2] = child2
+        else:
+            subjects = list()
+            for father, mother in zip(self.decode(parents[fathers]), self.decode(parents[mothers])):
+                subjects.extend(offspring_function(father, mother))
+            children = self.encode(subjects)
+        if mutation_odds is not None:
+            self.mutate(children, mutation_odds)
+        return children
+
+    def _make_writeable(self):
+        # the arrays of a population loaded from a checkpoint are read-only views over the checkpoint's buffers
+        if not self._genes.flags.writeable:
+            self._genes = self._genes.copy()
+        if not self._strengths.flags.writeable:
+            self._strengths = self._strengths.copy()
+
+    def replace_row(self, row, genes, strength):
+        """
+        Replace a single subject of the population in place. Its probability is set to zero.
+
+        :param row: the row of the subject
+        :param genes: a 1-D integer array of the gene indices of the new subject
+        :param strength: the strength of the new subject
+        """
+        self._make_writeable()
+        self._genes[row] = genes
+        self._strengths[row] = strength
+        self._probabilities[row] = 0.0
+
+    def swap_rows(self, row1, row2):
+        """
+        Switch the places of two subjects of the population
+
+        :param row1: a row index
+        :param row2: a row index
+        """
+        self._make_writeable()
+        for a in (self._genes, self._strengths, self._probabilities):
+            a[[row1, row2]] = a[[row2, row1]]
+
+    def mutate(self, genes, mutation_odds):
+        """
+        Mutate a matrix of gene indices in place, using the population's pseudo-random number generator (see
+        mutate_batch).
+
+        :param genes: a 2-D integer matrix of gene indices
+        :param mutation_odds: a number in the continuous range [0,1], representing the probability of a bit
+                              flipping its value
+        """
+        mutate_batch(genes, mutation_odds, self._widths, self._sizes, self._rng, self._skip_sampling_odds)
+
+    def row_keys(self, genes=None):
+        """
+        Returns a canonical, hashable key of each subject's genes, which is the same for all equal subjects.
+
+        :param genes: optional. a 2-D integer matrix of gene indices. If not provided, the keys of the population
+                      are returned
+        :return: a list of bytes objects
+        """
+        genes = np.ascontiguousarray(self._genes if genes is None else genes, dtype=np.int64)
+        return [row.tobytes() for row in genes]
+
+    def unique_rows(self):
+        """
+        Find the first occurrence of each unique subject in the population
+
+        :return: a sorted 1-D array of row indices
+        """
+        _, first = np.unique(self._genes, axis=0, return_index=True)
+        first.sort()
+        return first
+
+
+class ArrayDiversityTracker(DiversityTracker):
+    """
+    A DiversityTracker of an ArrayPopulation, whose genomes are keyed by the bytes of their gene indices (see
+    ArrayPopulation.row_keys). The alleles of all changed genomes are counted at once, using vectorized operations.
+    """
+
+    def __init__(self, sizes):
+        """
+        Create a new tracker
+
+        :param sizes: the number of possible values of each gene
+        """
+        super().__init__(sizes, None)
+
+    def clear(self):
+        super().clear()
+        self._alleles = [np.zeros(size, dtype=np.int64) for size in self._sizes]
+
+    def _count_alleles(self, keys, changes):
+        if not keys:
+            return
+        genes = np.frombuffer(b''.join(keys), dtype=np.int64).reshape((len(keys), len(self._sizes)))
+        changes = np.array(changes, dtype=np.int64)
+        for g, counts in enumerate(self._alleles):
+            np.add.at(counts, genes[:, g], changes)
@@ -0,0 +1,263 @@
+import gc
+import sys
+import json
+import time
+import random
+import platform
+from pycharles import mutation
+from pycharles import selection
+from pycharles import binary_utils
+from pycharles.codec import GeneCodec
+from pycharles.model import Model
+
+_digits = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
+
+
+def _values(kind, genome_length):
+    """
+    Creates the all_values of a synthetic workload: either a list of 16 values, or a dict where each position
+    has its own pool of values, of varying sizes.
+    """
+    if kind == 'list':
+        return _digits + ["a", "b", "c", "d", "e", "f"]
+    return {i: _digits[0:2 + i % 9] for i in range(0, genome_length)}
+
+
+def _population(all_values, size, genome_length, duplicates=0.0):
+    """
+    Creates a random population. A fraction of the population (duplicates) is made of copies of other subjects.
+    """
+    def pool(i): return all_values[i] if isinstance(all_values, dict) else all_values
+    unique = size - int(size * duplicates)
+    population = [[random.choice(pool(i)) for i in range(0, genome_length)] for _ in range(0, unique)]
+    population += [list(population[random.randrange(0, unique)]) for _ in range(unique, size)]
+    return population
+
+
+def _sum_strength(subject):
+    return float(len(set(subject)))
+
+
+def _ranked_model(population, all_values, backend='list', **params):
+    """
+    Creates a model of a synthetic workload whose population is already evaluated and ranked, so the evolution
+    phases can be timed on their own.
+    """
+    model = Model(population, all_values, _sum_strength, backend=backend, seed=1, **params)
+    ranking = model._rank()
+    try:
+        batch = next(ranking)
+        while True:
+            batch = ranking.send(model._evaluate(batch))
+    except StopIteration:
+        pass
+    return model
+
+
+def bench_selection(size, genome_length, values, method):
+    probabilities = [random.random() for _ in range(0, size)]
+    total = sum(probabilities)
+    probabilities = [p / total for p in probabilities]
+
+    def run():
+        selection.selection_table(method, probabilities).select_couples(size // 2)
+    return run
+
+
+def bench_breed(size, genome_length, values, backend):
+    all_values = _values(values, genome_length)
+    model = _ranked_model(_population(all_values, size, genome_length), all_values, backend)
+    return lambda: model._breed(size // 2)
+
+
+def bench_mutate(size, genome_length, values, backend, mutation_odds=0.01):
+    all_values = _values(values, genome_length)
+    model = _ranked_model(_population(all_values, size, genome_length), all_values, backend)
+    if backend == 'numpy':
+        genes = model._population.get_genes().copy()
+        return lambda: model._population.mutate(genes, mutation_odds)
+    elements = model._elements
+    codec = model._codec
+    return lambda: mutation.mutate_elements(elements, mutation_odds, codec)
+
+
+def bench_encode(size, genome_length, values, backend):
+    all_values = _values(values, genome_length)
+    population = _population(all_values, size, genome_length)
+    if backend == 'legacy':
+        return lambda: [binary_utils.seq_to_binary_string(subject, all_values) for subject in population]
+    codec = GeneCodec(all_values)
+    return lambda: codec.encode_batch(population)
+
+
+def bench_duplicates(size, genome_length, values, backend, policy='kill'):
+    all_values = _values(values, genome_length)
+    model = _ranked_model(_population(all_values, size, genome_length, duplicates=0.3), all_values, backend,
+                          duplication_policy=policy)
+    if backend == 'numpy':
+        genes = model._population.get_genes()
+        return lambda: (model._population.set_genes(genes), model._handle_duplicates())
+    elements = model._elements
+    return lambda: (setattr(model, '_elements', list(elements)), model._handle_duplicates())
+
+
+def bench_evolve(size, genome_length, values, backend, generations=10):
+    from pycharles.examples import reach_42
+    all_values = reach_42.values_list() if values == 'list' else reach_42.values_dict(genome_length)
+    population = reach_42.random_population(all_values, size, genome_length)
+
+    def run():
+        # a new evaluator for each run, so results memoized by previous runs are not reused
+        strength = reach_42.strength_func(reach_42.ExpressionEvaluator())
+        Model(population, all_values, strength, generations=generations, backend=backend, seed=1).evolve()
+    return run
+
+
+def bench_evolve_scaled(size, genome_length, values, backend, generations=5):
+    from pycharles.examples import reach_42
+    population, all_values, _ = reach_42.scaled_workload(size, genome_length, values)
+
+    def run():
+        strength = reach_42.batch_strength_func(reach_42.ExpressionEvaluator(), bounded=True)
+        Model(population, all_values, strength, generations=generations, batch_strength=True, backend=backend,
+              seed=1).evolve()
+    return run
+
+
+# name: (benchmark, population sizes, genome lengths, values kinds, variants). The variant of a benchmark is either
+# the model's backend, the selection method, or the encoding implementation
+_benchmarks = {
+    'selection': (bench_selection, [100, 1000, 10000, 100000], [None], [None],
+                  ['roulette', 'alias', 'sus', 'tournament', 'truncation']),
+    'breed': (bench_breed, [100, 1000, 10000, 100000], [7, 64], ['list', 'dict'], ['list', 'numpy']),
+    'mutate': (bench_mutate, [100, 1000, 10000, 100000], [7, 64], ['list', 'dict'], ['list', 'numpy']),
+    'encode': (bench_encode, [100, 1000, 10000, 100000], [7, 64], ['list', 'dict'], ['legacy', 'codec']),
+    'duplicates': (bench_duplicates, [100, 1000, 10000, 100000], [7, 64], ['list', 'dict'], ['list', 'numpy']),
+    'evolve': (bench_evolve, [30, 300, 3000], [7, 15], ['list', 'dict'], ['list', 'numpy']),
+    'evolve_scaled': (bench_evolve_scaled, [1000, 10000], [31, 63], ['dict'], ['list', 'numpy'])
+}
+
+
+def _available(variant):
+    if variant != 'numpy':
+        return True
+    try:
+        import numpy
+    except ImportError:
+        return False
+    return True
+
+
+def time_it(run, repeat=5, min_time=0.05):
+    """
+    Times a callable. Each measurement runs the callable enough times to take at least min_time seconds, and the
+    garbage collector is disabled while measuring.
+
+    :param run: a callable with no arguments
+    :param repeat: the number of measurements
+    :param min_time: the minimal duration of a single measurement, in seconds
+    :return: a list of the durations of a single call of each measurement, in seconds
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(0, number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1000:
+            break
+        number *= 10 if elapsed == 0.0 else max(2, min(10, int(min_time / elapsed) + 1))
+    timings = list()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(0, repeat):
+            start = time.perf_counter()
+            for _ in range(0, number):
+                run()
+            timings.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return timings
+
+
+def run(names=None, max_size=None, repeat=5, seed=0, log=None):
+    """
+    Runs the benchmarks.
+
+    :param names: None or a list of benchmark names. None runs all benchmarks
+    :param max_size: None or an integer. skip population sizes larger than max_size
+    :param repeat: the number of measurements of each case
+    :param seed: the seed used to create the workloads
+    :param log: None or a function which is called with a line of text after each case
+    :return: a dict of the results, which can be saved as JSON and later compared using compare
+    """
+    results = list()
+    for name in names or list(_benchmarks.keys()):
+        if name not in _benchmarks:
+            raise ValueError("Unknown benchmark {0}".format(name))
+        benchmark, sizes, genome_lengths, values_kinds, variants = _benchmarks[name]
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            for genome_length in genome_lengths:
+                for values in values_kinds:
+                    for variant in variants:
+                        if not _available(variant):
+                            continue
+                        random.seed(seed)
+                        timings = time_it(benchmark(size, genome_length, values, variant), repeat=repeat)
+                        timings.sort()
+                        case = {'benchmark': name, 'size': size, 'genome_length': genome_length, 'values': values,
+                                'variant': variant, 'best': timings[0], 'median': timings[len(timings) // 2],
+                                'repeat': repeat}
+                        results.append(case)
+                        if log is not None:
+                            log('{0:<64} best: {1:>12} median: {2:>12}'.format(
+                                case_key(case), _format_time(case['best']), _format_time(case['median'])))
+    return {'python': sys.version.split()[0], 'platform': platform.platform(), 'time': time.time(),
+            'results': results}
+
+
+def case_key(case):
+    return '{benchmark}[size={size},genome={genome_length},values={values},variant={variant}]'.format(**case)
+
+
+def _format_time(seconds):
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '{0:.3f}{1}'.format(seconds / scale, unit)
+    return '{0:.1f}ns'.format(seconds * 1e9)
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Compares the results of two benchmark runs, case by case, using the best timing of each case.
+
+    :param baseline: a dict returned by run (or loaded from its JSON file)
+    :param current: a dict returned by run (or loaded from its JSON file)
+    :param threshold: the relative slow-down above which a case is considered a regression
+    :return: a list of tuples (case key, baseline time, current time, ratio, regressed), for all cases found in
+             both runs
+    """
+    baseline_cases = {case_key(case): case for case in baseline['results']}
+    comparison = list()
+    for case in current['results']:
+        key = case_key(case)
+        if key not in baseline_cases:
+            continue
+        before = baseline_cases[key]['best']
+        ratio = case['best'] / before if before > 0.0 else float('inf')
+        comparison.append((key, before, case['best'], ratio, ratio > 1.0 + threshold))
+    return comparison
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
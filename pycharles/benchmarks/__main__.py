@@ -0,0 +1,42 @@
+import sys
+import argparse
+from pycharles import benchmarks
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m pycharles.benchmarks',
+                                     description='Time the phases of the evolution and full evolve runs')
+    subparsers = parser.add_subparsers(dest='command')
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('names', nargs='*', help='benchmarks to run (default: all). options: {0}'
+                            .format(', '.join(benchmarks._benchmarks.keys())))
+    run_parser.add_argument('--max-size', type=int, default=None, help='skip larger population sizes')
+    run_parser.add_argument('--repeat', type=int, default=5, help='number of measurements of each case')
+    run_parser.add_argument('--seed', type=int, default=0, help='seed of the workloads')
+    run_parser.add_argument('--output', '-o', default=None, help='save the results to this JSON file')
+    compare_parser = subparsers.add_parser('compare', help='compare the results of two runs')
+    compare_parser.add_argument('baseline', help='JSON file of the baseline run')
+    compare_parser.add_argument('current', help='JSON file of the current run')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='relative slow-down considered a regression (default: 0.1)')
+    args = parser.parse_args(args)
+
+    if args.command == 'compare':
+        comparison = benchmarks.compare(benchmarks.load(args.baseline), benchmarks.load(args.current),
+                                        args.threshold)
+        for key, before, after, ratio, regressed in comparison:
+            print('{0:<64} {1:>12} -> {2:>12} {3:>7.2f}x{4}'.format(
+                key, benchmarks._format_time(before), benchmarks._format_time(after), ratio,
+                '  REGRESSION' if regressed else ''))
+        return 1 if any(c[4] for c in comparison) else 0
+    if args.command != 'run':
+        parser.print_help()
+        return 2
+    results = benchmarks.run(args.names or None, args.max_size, args.repeat, args.seed, log=print)
+    if args.output is not None:
+        benchmarks.save(results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import mmap
+import struct
+
+_magic = b'PYCHCKPT'
+_version = 2
+_alignment = 8
+_sizes = {'B': 1, 'H': 2, 'I': 4, 'Q': 8}
+
+
+def index_typecode(max_pool_size):
+    """
+    Returns the smallest unsigned integer typecode (in the sense of the array module) which can hold the indices
+    of a pool of values of the provided size.
+
+    :param max_pool_size: the size of the largest pool of values of any gene
+    :return: one of 'B', 'H', 'I' or 'Q'
+    """
+    for typecode in ('B', 'H', 'I'):
+        if max_pool_size <= 2 ** (8 * _sizes[typecode]):
+            return typecode
+    return 'Q'
+
+
+def _padding(position):
+    return (_alignment - position % _alignment) % _alignment
+
+
+def write(path, state, typecode, indices, strengths):
+    """
+    Write a checkpoint file. The file is made of a small JSON header, followed by the gene indices of the entire
+    population as a flat array of fixed-size unsigned integers, followed by the strengths as a flat array of doubles.
+    Both arrays are aligned, so they can be memory-mapped when the checkpoint is read. The file is first written to
+    a temporary file which then replaces path, so an existing checkpoint is never left half-written.
+
+    :param path: the path of the checkpoint file
+    :param state: a JSON-serializable dict
+    :param typecode: the typecode of the indices, see index_typecode
+    :param indices: a bytes-like object of the indices of all subjects, row after row
+    :param strengths: a bytes-like object of the strengths of all subjects, as doubles
+    """
+    header = json.dumps(dict(state, typecode=typecode, byteorder=sys.byteorder)).encode('utf-8')
+    temp_path = '{0}.tmp'.format(path)
+    with open(temp_path, 'wb') as f:
+        f.write(_magic)
+        f.write(struct.pack('<II', _version, len(header)))
+        f.write(header)
+        position = len(_magic) + 8 + len(header)
+        f.write(b'\0' * _padding(position))
+        f.write(indices)
+        position += _padding(position) + len(memoryview(indices).cast('B'))
+        f.write(b'\0' * _padding(position))
+        f.write(strengths)
+    os.replace(temp_path, path)
+
+
+def read(path):
+    """
+    Read a checkpoint file written by write. The file is memory-mapped, and the indices and strengths are returned
+    as views over the mapped file, so nothing is copied until it is used.
+
+    :param path: the path of the checkpoint file
+    :return: a tuple of (state, indices, strengths, indices_offset, strengths_offset), where indices and strengths
+             are memoryviews of the mapped file, and the offsets are their positions in the file
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[0:len(_magic)] != _magic:
+        raise ValueError("{0} is not a checkpoint file".format(path))
+    version, header_length = struct.unpack('<II', mapped[len(_magic):len(_magic) + 8])
+    if version != _version:
+        raise ValueError("Unsupported checkpoint version {0}".format(version))
+    position = len(_magic) + 8
+    state = json.loads(mapped[position:position + header_length].decode('utf-8'))
+    if state['byteorder'] != sys.byteorder:
+        raise ValueError("Checkpoint was written on a machine with a different byte order")
+    position += header_length
+    indices_offset = position + _padding(position)
+    indices_length = state['rows'] * state['genome_length'] * _sizes[state['typecode']]
+    position = indices_offset + indices_length
+    strengths_offset = position + _padding(position)
+    view = memoryview(mapped)
+    indices = view[indices_offset:indices_offset + indices_length].cast(state['typecode'])
+    strengths = view[strengths_offset:strengths_offset + 8 * state['rows']].cast('d')
+    return state, indices, strengths, indices_offset, strengths_offset
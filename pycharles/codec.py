@@ -0,0 +1,271 @@
+from collections import namedtuple
+
+
+GenomeLayout = namedtuple('GenomeLayout', ['pools', 'lookups', 'sizes', 'widths', 'offsets', 'formats', 'bits_num',
+                                           'exact'])
+GenomeLayout.__doc__ = """
+The binary layout of a subject of a certain length: the pool of possible values of each gene, a value-to-index
+lookup of each pool, the number of bits of each gene, the offset of each gene in the binary representation of the
+entire subject and the total number of bits. A layout is exact if every combination of bits is a valid subject,
+which is the case when the size of every pool is a power of 2.
+"""
+
+
+def value_index(values):
+    """
+    Creates a lookup function from a value to its index in values. A hash-map is used when all values are
+    hashable, otherwise the lookup falls back to values.index.
+
+    :param values: a list of values
+    :return: a function f(value) => index
+    """
+    try:
+        table = dict()
+        for i, v in enumerate(values):
+            # keep the first index of repeating values, like values.index does
+            table.setdefault(v, i)
+    except TypeError:
+        return values.index
+    return table.__getitem__
+
+
+class GeneCodec:
+    """
+    A GeneCodec converts subjects to and from their binary representation, as well as to and from their gene
+    indices (the index of each gene in its pool of possible values). Everything that depends only on the possible
+    values - value-to-index hash-maps, the number of bits of each gene and the offset of each gene - is computed
+    once, when the codec is created, rather than for every gene of every subject.
+    """
+
+    _all_values = list()
+    _layouts = dict()
+
+    def __init__(self, all_values):
+        """
+        Create a new codec
+
+        :param all_values: list or dict. a sequence of all values a subject in the population can have
+        """
+        self._all_values = all_values
+        self._layouts = dict()
+        if isinstance(all_values, dict):
+            self.layout(len(all_values))
+
+    def get_all_values(self): return self._all_values
+
+    def layout(self, genome_length):
+        """
+        Returns the binary layout of subjects of the provided length. Layouts are computed once and cached.
+
+        :param genome_length: the number of genes of each subject
+        :return: a GenomeLayout
+        """
+        layout = self._layouts.get(genome_length)
+        if layout is None:
+            if isinstance(self._all_values, dict):
+                if genome_length != len(self._all_values):
+                    raise ValueError("Subjects must have exactly {0} genes".format(len(self._all_values)))
+                pools = [self._all_values[i] for i in range(0, genome_length)]
+                lookups = [value_index(pool) for pool in pools]
+            else:
+                pools = [self._all_values] * genome_length
+                lookups = [value_index(self._all_values)] * genome_length
+            sizes = [len(pool) for pool in pools]
+            widths = [len('{0:b}'.format(size - 1)) for size in sizes]
+            offsets = [0] * genome_length
+            for i in range(1, genome_length):
+                offsets[i] = offsets[i-1] + widths[i-1]
+            formats = ['0{0}b'.format(w) for w in widths]
+            bits_num = offsets[-1] + widths[-1] if genome_length > 0 else 0
+            exact = all(size == 1 << w for size, w in zip(sizes, widths))
+            layout = GenomeLayout(pools, lookups, sizes, widths, offsets, formats, bits_num, exact)
+            self._layouts[genome_length] = layout
+        return layout
+
+    def to_indices(self, subject):
+        """
+        Convert a subject to the indices of its genes
+
+        :param subject: a subject of the population
+        :return: a list of integers
+        """
+        return [lookup(g) for lookup, g in zip(self.layout(len(subject)).lookups, subject)]
+
+    def key(self, subject):
+        """
+        Returns a canonical, hashable key of a subject's genes, which is the same for all equal subjects.
+
+        :param subject: a subject of the population
+        :return: a tuple of integers
+        """
+        return tuple([lookup(g) for lookup, g in zip(self.layout(len(subject)).lookups, subject)])
+
+    def from_indices(self, indices):
+        """
+        Convert gene indices back to a subject. Indices which exceed the size of their pool wrap around.
+
+        :param indices: a sequence of integers
+        :return: a subject
+        """
+        layout = self.layout(len(indices))
+        return [pool[i % size] for pool, size, i in zip(layout.pools, layout.sizes, indices)]
+
+    def encode(self, subject):
+        """
+        Convert a subject to a binary representation.
+
+        Example:
+        >>> GeneCodec(['X','Y','Z']).encode(['Y','Z'])
+        '0110'
+
+        :param subject: a subject of the population
+        :return: a string made of the binary encoding of the subject
+        """
+        layout = self.layout(len(subject))
+        return ''.join([format(lookup(g), f) for lookup, f, g in zip(layout.lookups, layout.formats, subject)])
+
+    def decode(self, binary_string, genome_length=None):
+        """
+        Convert a binary representation back to a subject. This is the opposite of encode.
+
+        Example:
+        >>> GeneCodec(['X','Y','Z']).decode('0110')
+        ['Y','Z']
+
+        :param binary_string: a string made of the binary encoding of a subject
+        :param genome_length: the number of genes of the subject. If not provided, the number of genes is
+                              derived from the length of the binary string
+        :return: a subject
+        """
+        if genome_length is None:
+            genome_length = self._genome_length_of(len(binary_string))
+        layout = self.layout(genome_length)
+        return [pool[int(binary_string[o:o+w], 2) % size]
+                for pool, size, w, o in zip(layout.pools, layout.sizes, layout.widths, layout.offsets)]
+
+    def _genome_length_of(self, bits_num):
+        if isinstance(self._all_values, dict):
+            return len(self._all_values)
+        return bits_num // self.layout(1).bits_num
+
+    def pack(self, subject):
+        """
+        Convert a subject to a packed binary representation: a single integer whose bits are the binary
+        representation of the subject (see encode).
+
+        Example:
+        >>> GeneCodec(['X','Y','Z']).pack(['Y','Z'])
+        6
+
+        :param subject: a subject of the population
+        :return: a non-negative integer
+        """
+        layout = self.layout(len(subject))
+        packed = 0
+        for lookup, w, g in zip(layout.lookups, layout.widths, subject):
+            packed = (packed << w) | lookup(g)
+        return packed
+
+    def unpack(self, packed, genome_length):
+        """
+        Convert a packed binary representation back to a subject. This is the opposite of pack.
+
+        :param packed: a non-negative integer
+        :param genome_length: the number of genes of the subject
+        :return: a subject
+        """
+        layout = self.layout(genome_length)
+        subject = [None] * genome_length
+        for i in range(genome_length - 1, -1, -1):
+            w = layout.widths[i]
+            subject[i] = layout.pools[i][(packed & ((1 << w) - 1)) % layout.sizes[i]]
+            packed >>= w
+        return subject
+
+    def normalize(self, packed, genome_length, genes=None):
+        """
+        Make a packed binary representation canonical, by wrapping the indices of genes which exceed the size of
+        their pool, exactly like decoding does. Equal subjects always have the same canonical packed representation.
+
+        :param packed: a non-negative integer
+        :param genome_length: the number of genes of the subject
+        :param genes: optional. the positions of the only genes which might exceed their pool, if known
+        :return: a non-negative integer
+        """
+        layout = self.layout(genome_length)
+        if layout.exact:
+            return packed
+        for i in (range(0, genome_length) if genes is None else genes):
+            w = layout.widths[i]
+            shift = layout.bits_num - layout.offsets[i] - w
+            index = (packed >> shift) & ((1 << w) - 1)
+            if index >= layout.sizes[i]:
+                packed ^= (index ^ (index % layout.sizes[i])) << shift
+        return packed
+
+    def encode_batch(self, subjects):
+        """
+        Convert many subjects of the same length to their binary representations
+
+        :param subjects: a sequence of subjects
+        :return: a list of binary strings
+        """
+        if not subjects:
+            return list()
+        layout = self.layout(len(subjects[0]))
+        pairs = list(zip(layout.lookups, layout.formats))
+        return [''.join([format(lookup(g), f) for (lookup, f), g in zip(pairs, subject)]) for subject in subjects]
+
+    def decode_batch(self, binary_strings, genome_length=None):
+        """
+        Convert many binary representations of the same length back to subjects
+
+        :param binary_strings: a sequence of binary strings
+        :param genome_length: the number of genes of each subject (see decode)
+        :return: a list of subjects
+        """
+        if not binary_strings:
+            return list()
+        if genome_length is None:
+            genome_length = self._genome_length_of(len(binary_strings[0]))
+        layout = self.layout(genome_length)
+        genes = list(zip(layout.pools, layout.sizes, layout.offsets, [o + w for o, w in zip(layout.offsets,
+                                                                                            layout.widths)]))
+        return [[pool[int(s[start:end], 2) % size] for pool, size, start, end in genes] for s in binary_strings]
+
+    def to_indices_batch(self, subjects):
+        """
+        Convert many subjects of the same length to the indices of their genes
+
+        :param subjects: a sequence of subjects
+        :return: a list of lists of integers
+        """
+        if not subjects:
+            return list()
+        lookups = self.layout(len(subjects[0])).lookups
+        return [[lookup(g) for lookup, g in zip(lookups, subject)] for subject in subjects]
+
+    def from_indices_batch(self, indices):
+        """
+        Convert many sequences of gene indices back to subjects
+
+        :param indices: a sequence of sequences of integers, all of the same length
+        :return: a list of subjects
+        """
+        if not indices:
+            return list()
+        layout = self.layout(len(indices[0]))
+        genes = list(zip(layout.pools, layout.sizes))
+        return [[pool[i % size] for (pool, size), i in zip(genes, row)] for row in indices]
+
+
+def as_codec(values):
+    """
+    Returns a GeneCodec of the provided values, or the values themselves if they already are a GeneCodec.
+
+    :param values: list, dict or GeneCodec
+    :return: a GeneCodec
+    """
+    if isinstance(values, GeneCodec):
+        return values
+    return GeneCodec(values)
@@ -0,0 +1,133 @@
+def packed_indices(layout):
+    """
+    Creates a function which converts a packed binary representation (see GeneCodec.pack) to the indices of its
+    genes, without decoding the genes themselves.
+
+    :param layout: the GenomeLayout of the subjects
+    :return: a function f(packed) => list of integers
+    """
+    shifts = [layout.bits_num - offset - w for offset, w in zip(layout.offsets, layout.widths)]
+    masks = [(1 << w) - 1 for w in layout.widths]
+    sizes = layout.sizes
+
+    def to_indices(packed):
+        return [((packed >> shift) & mask) % size for shift, mask, size in zip(shifts, masks, sizes)]
+    return to_indices
+
+
+class DiversityTracker:
+    """
+    Tracks the diversity of a population across generations. The population is summarized by the number of copies
+    of each distinct genome and by the allele counts - the number of subjects carrying each possible value of each
+    gene. Between generations, only genomes whose number of copies changed are decoded and their alleles counted,
+    so once the population converges, an update costs little more than hashing the keys of its genomes.
+
+    Two metrics are computed for each generation: the ratio of unique genomes in the population, and the gene
+    diversity - the probability that two random subjects differ at a gene (Gini-Simpson index), normalized by its
+    maximum for the size of the gene's pool and averaged over all genes. A gene diversity of 0 means all subjects
+    are identical, and a value close to 1 means alleles are spread evenly.
+    """
+
+    _sizes = list()
+    _to_indices = None
+    _copies = dict()
+    _alleles = list()
+    _population_size = 0
+    _generations = list()
+
+    def __init__(self, sizes, to_indices):
+        """
+        Create a new tracker
+
+        :param sizes: the number of possible values of each gene
+        :param to_indices: a function which converts the key of a genome to the indices of its genes
+        """
+        self._sizes = list(sizes)
+        self._to_indices = to_indices
+        self.clear()
+
+    def clear(self):
+        self._copies = dict()
+        self._alleles = [[0] * size for size in self._sizes]
+        self._population_size = 0
+        self._generations = list()
+
+    def get_generations(self): return self._generations
+
+    def _count_alleles(self, keys, changes):
+        """
+        Add the alleles of genomes to the allele counts
+
+        :param keys: a list of keys of genomes
+        :param changes: the number of copies added (or removed, if negative) of each genome
+        """
+        alleles = self._alleles
+        for key, change in zip(keys, changes):
+            for counts, i in zip(alleles, self._to_indices(key)):
+                counts[i] += change
+
+    def update(self, keys, generation=None):
+        """
+        Update the tracker with the genomes of the current population, and record the metrics of a generation.
+
+        :param keys: a sequence of canonical, hashable keys of the genomes of the entire population
+        :param generation: optional. the number of the generation
+        :return: the record of the generation, a dict with the keys 'generation', 'unique_ratio' and 'gene_diversity'
+        """
+        copies = dict()
+        for key in keys:
+            copies[key] = copies.get(key, 0) + 1
+        changed = list()
+        changes = list()
+        previous = self._copies
+        for key, n in copies.items():
+            change = n - previous.pop(key, 0)
+            if change != 0:
+                changed.append(key)
+                changes.append(change)
+        # genomes which are no longer part of the population
+        changed.extend(previous.keys())
+        changes.extend(-n for n in previous.values())
+        self._count_alleles(changed, changes)
+        self._copies = copies
+        self._population_size = len(keys)
+        record = {'generation': generation, 'unique_ratio': self.get_unique_ratio(),
+                  'gene_diversity': self.get_gene_diversity()}
+        self._generations.append(record)
+        return record
+
+    def get_unique_ratio(self):
+        """
+        Returns the ratio of unique genomes in the population
+
+        :return: a number in the range [0,1]
+        """
+        if self._population_size == 0:
+            return 0.0
+        return len(self._copies) / self._population_size
+
+    def get_gene_diversity(self):
+        """
+        Returns the normalized Gini-Simpson index of the alleles of each gene, averaged over all genes whose pool
+        has more than a single value.
+
+        :return: a number in the range [0,1]
+        """
+        n = self._population_size
+        genes = [counts for counts in self._alleles if len(counts) > 1]
+        if n == 0 or not genes:
+            return 0.0
+        total = 0.0
+        for counts in genes:
+            simpson = 1.0 - float(sum(c * c for c in counts)) / (n * n)
+            total += simpson / (1.0 - 1.0 / len(counts))
+        return total / len(genes)
+
+    def get_allele_frequencies(self):
+        """
+        Returns the frequency of each possible value of each gene in the population
+
+        :return: a list with a list of frequencies for each gene, in the order of the gene's pool of values
+        """
+        n = self._population_size
+        return [[float(c) / n if n > 0 else 0.0 for c in counts] for counts in self._alleles]
@@ -1,6 +1,6 @@
 import math
 import random
-from pycharles.binary_utils import *
+from pycharles.mutation import mutate_elements
 
 
 class Element:
@@ -10,24 +10,71 @@ class Element:
     refer to as Fitness Function). The higher an element's strength is, the higher are hus chance of
     reproducing and survival. An Element can also mutate, which is the act of a spontaneous change of
     one of its genes.
+
+    An Element can hold its genes either as a sequence of values, or packed as a single integer (see
+    GeneCodec.pack), or both. Elements created by crossover and mutation hold only the packed form, and their genes
+    are decoded only when they are first required.
+
+    Elements have no instance dictionary (see __slots__), as populations may hold millions of them.
     """
 
-    _genes = list()
-    _strength = 0.0
-    _probability = 0.0
+    __slots__ = ('_genes', '_packed', '_codec', '_genome_length', '_strength', '_probability')
 
-    def __init__(self, genes):
+    def __init__(self, genes=None, packed=None, codec=None, genome_length=None):
         """
-        create a new Element
+        create a new Element. Either genes, or packed, codec and genome_length must be provided.
+
         :param genes: The genes of the new Element
+        :param packed: The packed binary representation of the genes of the new Element
+        :param codec: the GeneCodec of the packed binary representation
+        :param genome_length: the number of genes of the new Element
         """
-        self.set_genes(genes)
+        self._strength = 0.0
+        self._probability = 0.0
+        if genes is not None:
+            self.set_genes(genes)
+        else:
+            self.set_packed(packed, codec, genome_length)
 
     def get_strength(self): return self._strength
     def get_probability(self): return self._probability
-    def get_genes(self): return self._genes
+    def get_genome_length(self): return self._genome_length
+
+    def get_genes(self):
+        if self._genes is None:
+            self._genes = self._codec.unpack(self._packed, self._genome_length)
+        return self._genes
+
+    def get_packed(self, codec):
+        """
+        Returns the packed binary representation of the Element's genes, packing them if required.
+
+        :param codec: a GeneCodec
+        :return: a non-negative integer
+        """
+        if self._packed is None or self._codec is not codec:
+            self._packed = codec.pack(self.get_genes())
+            self._codec = codec
+        return self._packed
+
+    def set_genes(self, genes):
+        self._genes = genes
+        self._genome_length = len(genes)
+        self._packed = None
+        self._codec = None
+
+    def set_packed(self, packed, codec, genome_length):
+        """
+        Set the Element's genes to a packed binary representation. The genes are decoded only when required.
 
-    def set_genes(self, genes): self._genes = genes
+        :param packed: a non-negative integer, normalized by codec
+        :param codec: a GeneCodec
+        :param genome_length: the number of genes
+        """
+        self._packed = packed
+        self._codec = codec
+        self._genome_length = genome_length
+        self._genes = None
 
     def set_strength(self, strength_function):
         """
@@ -35,11 +82,18 @@ class Element:
 
         :param strength_function: a function that maps a sequence of values to a non-negative number
         """
-        s = strength_function(self._genes)
-        if s < 0.0:
+        self.set_strength_value(strength_function(self.get_genes()))
+
+    def set_strength_value(self, strength):
+        """
+        Sets the strength of the Element to an already computed value.
+
+        :param strength: a non-negative number
+        """
+        if strength < 0.0:
             raise ValueError("Strength must be non-negative")
         else:
-            self._strength = s
+            self._strength = strength
             self._probability = 0.0
 
     def strength_to_probability(self, total_strength):
@@ -65,40 +119,26 @@ class Element:
                 else:
                     self._probability = p
 
-    def mutate(self, mutation_odds, values):
+    def mutate(self, mutation_odds, values, rng=random):
         """
         Mutate the Element. Behind the scenes, all genes are converted to binary representations, and for each binary
-        bit, there's a probability it will suddenly flip and change its value. After this process, the binary
-        representation is transformed back to the new genes.
+        bit, there's a probability it will suddenly flip and change its value. Only the positions of the flipped bits
+        are drawn, and they are flipped on the packed binary representation, which is decoded back to genes only
+        when required.
 
         :param mutation_odds: a number in the continuous range [0,1], representing the probability of a bit flipping
                               its value
-        :param values: list or dict. a sequence of all values a subject in the population can have
+        :param values: list, dict or GeneCodec. a sequence of all values a subject in the population can have
+        :param rng: the pseudo-random number generator to draw from. Default: the random module
         """
-        new_genes = list()
-        for i,g in enumerate(self._genes):
-            if isinstance(values, dict):
-                gene = values[i].index(g)
-            else:
-                gene = values.index(g)
-            bits = int_to_binary_string(gene)
-            gene_size = get_single_gene_bits_num(values,i)
-            padded_bits = pad_binary_string(bits,gene_size)
-            mutated_bits = ''
-            for b in padded_bits:
-                r = random.random()
-                if r <= mutation_odds:
-                    b = flip_bit_char(b)
-                mutated_bits += b
-            new_genes.append(get_value_of_binary_string(mutated_bits, values, i))
-        self.set_genes(new_genes)
+        mutate_elements([self], mutation_odds, values, rng=rng)
 
     # The hash, eq, ne functions are used to compare elements based on their genes.
     def __hash__(self):
-        return hash(''.join(map(lambda x: str(x), self._genes)))
+        return hash(tuple(map(lambda x: str(x), self.get_genes())))
 
     def __eq__(self, other):
-        return self.__hash__() == hash(other)
+        return isinstance(other, Element) and self.get_genes() == other.get_genes()
 
     def __ne__(self, other):
         return not self.__eq__(other)
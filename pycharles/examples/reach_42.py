@@ -1,11 +1,11 @@
 from __future__ import division
 import math
+import time
 import operator
 import random
 from pycharles import offspring_functions
 from pycharles.model import Model
-from functools import partial
-from pyparsing import (Literal, CaselessLiteral, Word, Combine, Group, Optional, ZeroOrMore, Forward, nums, alphas, oneOf)
+from functools import partial, lru_cache
 
 
 # Original class-code taken from: https://stackoverflow.com/a/2371789/5863503
@@ -29,6 +29,9 @@ class NumericStringParser:
             self.exprStack.append('unary -')
 
     def __init__(self):
+        # pyparsing is only required when this parser is used
+        from pyparsing import (Literal, CaselessLiteral, Word, Combine, Group, Optional, ZeroOrMore, Forward, nums,
+                               alphas, oneOf)
         point = Literal(".")
         e = CaselessLiteral("E")
         fnumber = Combine(Word("+-" + nums, nums) +
@@ -91,42 +94,259 @@ class NumericStringParser:
         return val
 
 
-def reach_42():
+_negate = object()
+_precedence = {'+': 1, '-': 1, '*': 2, '/': 2, '^': 3}
+_operations = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv, '^': operator.pow}
+
+
+class ExpressionEvaluator:
     """
-    In this example, the population is made out of 30 combinations of simple mathematical equations. Each
-    equation is constructed of four integers from 0 to 9, separated by one of four mathematical operators:
-    [+,-,/,*]. The goal of the model is to construct such mathematical equation which will yield 42.
+    A fast replacement of NumericStringParser for the equations of this example: integers (each with an optional
+    sign), the operators +, -, *, / and ^ (with the usual precedence, where ^ is right-associative), parentheses and
+    unary signs, following the grammar of NumericStringParser. Each expression is compiled once, into a program in
+    reverse Polish notation, using the shunting-yard algorithm, and the results are memoized by expression string,
+    so the many copies of the same subjects in a population are evaluated only once. Does not require pyparsing.
     """
-    calculator = NumericStringParser()
 
-    def strength(subject, calculator):
+    _cache_size = None
+    _evaluate = None
+
+    def __init__(self, cache_size=2 ** 16):
         """
-        This is the strength function which will be supplied to the model. The strength is calculated as
-        abs(1/(42-x)) for any given x.
-        calculator is an instance of NumericStringParser which is used to compute the mathematical result
-        out of a string of numbers and operators.
-
-        :param subject: the subject to evaluate
-        :param calculator: an instance of NumericStringParser
-        :return: calculated strength
+        Create a new evaluator
+
+        :param cache_size: None or a positive integer. the number of results kept by the memoization cache. None
+                           keeps all results
         """
-        try:
-            result = calculator.eval(''.join(subject))
-            if result == 42.0:
-                return math.inf
+        self._cache_size = cache_size
+        self._evaluate = lru_cache(maxsize=cache_size)(self._compute)
+
+    def __getstate__(self):
+        return {'cache_size': self._cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['cache_size'])
+
+    def get_cache_info(self): return self._evaluate.cache_info()
+
+    @staticmethod
+    def compile(num_string):
+        """
+        Compile an expression into a program in reverse Polish notation.
+
+        :param num_string: the expression
+        :return: a list of numbers and operators, where each operator is either a function of two numbers or _negate
+        :raise ValueError: if the expression is invalid
+        """
+        program = list()
+        # the operators stack holds binary operators, and parentheses as the negation flag of their group
+        stack = list()
+        n = len(num_string)
+        i = 0
+        while True:
+            # an operand: an optional sign, followed by a number (which may have a sign of its own) or a group
+            negative = i < n and num_string[i] == '-'
+            if i < n and num_string[i] in '+-':
+                i += 1
+            if i < n and num_string[i] == '(':
+                stack.append(negative)
+                i += 1
+                continue
+            start = i
+            if i < n and num_string[i] in '+-':
+                i += 1
+            digits = i
+            while i < n and num_string[i].isdigit():
+                i += 1
+            if i == digits:
+                raise ValueError("Invalid expression {0}".format(num_string))
+            program.append(float(num_string[start:i]))
+            if negative:
+                program.append(_negate)
+            # closing parentheses, followed by a binary operator or the end of the expression
+            while i < n and num_string[i] == ')':
+                while stack and not isinstance(stack[-1], bool):
+                    program.append(_operations[stack.pop()])
+                if not stack:
+                    raise ValueError("Invalid expression {0}".format(num_string))
+                if stack.pop():
+                    program.append(_negate)
+                i += 1
+            if i == n:
+                break
+            op = num_string[i]
+            if op not in _precedence:
+                raise ValueError("Invalid expression {0}".format(num_string))
+            while stack and not isinstance(stack[-1], bool) and \
+                    (_precedence[stack[-1]] > _precedence[op] or (_precedence[op] == _precedence[stack[-1]] != 3)):
+                program.append(_operations[stack.pop()])
+            stack.append(op)
+            i += 1
+        while stack:
+            op = stack.pop()
+            if isinstance(op, bool):
+                raise ValueError("Invalid expression {0}".format(num_string))
+            program.append(_operations[op])
+        return program
+
+    @staticmethod
+    def run(program):
+        """
+        Run a compiled program
+
+        :param program: a program returned by compile
+        :return: the result
+        """
+        stack = list()
+        push = stack.append
+        pop = stack.pop
+        for item in program:
+            if item.__class__ is float:
+                push(item)
+            elif item is _negate:
+                stack[-1] = -stack[-1]
             else:
-                return abs(1/(result-42.0))
-        except:
-            return 0.0
+                right = pop()
+                stack[-1] = item(stack[-1], right)
+        return stack[0]
+
+    def _compute(self, num_string):
+        try:
+            return self.run(self.compile(num_string))
+        except (ValueError, ArithmeticError):
+            return None
 
-    def strength_func(calculator):
+    def eval(self, num_string):
         """
-        This function created a partial function of strength to be used by the model.
+        Evaluate an expression, the same way NumericStringParser.eval does
 
-        :param calculator: an instance of NumericStringParser
-        :return: a partial function of strength
+        :param num_string: the expression
+        :return: the result
+        :raise ValueError: if the expression is invalid, or cannot be computed (a division by zero, for example)
         """
-        return partial(strength, calculator=calculator)
+        result = self._evaluate(num_string)
+        if result is None:
+            raise ValueError("Cannot evaluate {0}".format(num_string))
+        return result
+
+    def eval_batch(self, num_strings):
+        """
+        Evaluate a batch of expressions, where each distinct expression is evaluated once.
+
+        :param num_strings: a sequence of expressions
+        :return: a list of results, where invalid expressions have the result None
+        """
+        results = {num_string: self._evaluate(num_string) for num_string in num_strings}
+        return [results[num_string] for num_string in num_strings]
+
+
+def _strength_of(result, bounded=False):
+    if result is None:
+        return 0.0
+    if bounded:
+        return 1/(1+abs(result-42.0))
+    if result == 42.0:
+        return math.inf
+    return abs(1/(result-42.0))
+
+
+def strength(subject, calculator):
+    """
+    This is the strength function which will be supplied to the model. The strength is calculated as
+    abs(1/(42-x)) for any given x.
+    calculator is an instance of NumericStringParser (or ExpressionEvaluator) which is used to compute the
+    mathematical result out of a string of numbers and operators.
+
+    :param subject: the subject to evaluate
+    :param calculator: an instance of NumericStringParser or ExpressionEvaluator
+    :return: calculated strength
+    """
+    try:
+        result = calculator.eval(''.join(subject))
+        if result == 42.0:
+            return math.inf
+        else:
+            return abs(1/(result-42.0))
+    except:
+        return 0.0
+
+
+def strength_func(calculator):
+    """
+    This function created a partial function of strength to be used by the model.
+
+    :param calculator: an instance of NumericStringParser
+    :return: a partial function of strength
+    """
+    return partial(strength, calculator=calculator)
+
+
+def batch_strength(subjects, evaluator, bounded=False):
+    """
+    A batch variant of strength, to be used with the batch_strength parameter of the model. All distinct subjects
+    of the batch are evaluated once.
+
+    :param subjects: a sequence of subjects to evaluate
+    :param evaluator: an instance of ExpressionEvaluator
+    :param bounded: Boolean. if True, the strength is calculated as 1/(1+abs(x-42)), so an equation which yields 42
+                    has the finite strength 1 and evolution never stops early
+    :return: a list of strengths
+    """
+    results = evaluator.eval_batch([''.join(subject) for subject in subjects])
+    return [_strength_of(result, bounded) for result in results]
+
+
+def batch_strength_func(evaluator, bounded=False):
+    """
+    This function created a partial function of batch_strength to be used by the model.
+
+    :param evaluator: an instance of ExpressionEvaluator
+    :param bounded: Boolean. see batch_strength
+    :return: a partial function of batch_strength
+    """
+    return partial(batch_strength, evaluator=evaluator, bounded=bounded)
+
+
+def values_list():
+    return ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "+", "-", "*", "/"]
+
+
+def values_dict(genome_length=7):
+    digits = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
+    operators = ["+", "-", "*", "/"]
+    return {i: list(digits) if i % 2 == 0 else list(operators) for i in range(0, genome_length)}
+
+
+def random_population(all_values, size, genome_length=7):
+    """
+    Creates a random population of equations, where digits and operators alternate.
+
+    :param all_values: the values of the model, either values_list() or values_dict()
+    :param size: the number of subjects
+    :param genome_length: an odd number. the number of genes of each subject
+    :return: a list of subjects
+    """
+    population = list()
+    for _ in range(0, size):
+        subject = list()
+        for i in range(0, genome_length):
+            if isinstance(all_values, dict):
+                subject.append(all_values[i][random.randint(0, len(all_values[i]) - 1)])
+            elif i % 2 == 0:
+                subject.append(all_values[random.randint(0, 9)])
+            else:
+                subject.append(all_values[random.randint(10, 13)])
+        population.append(subject)
+    return population
+
+
+def reach_42():
+    """
+    In this example, the population is made out of 30 combinations of simple mathematical equations. Each
+    equation is constructed of four integers from 0 to 9, separated by one of four mathematical operators:
+    [+,-,/,*]. The goal of the model is to construct such mathematical equation which will yield 42.
+    """
+    calculator = ExpressionEvaluator()
 
     def calc(subject, calculator):
         try:
@@ -150,43 +370,64 @@ def reach_42():
     # values are a list
     seed = 1519568369
     random.seed(seed)
-    all_values = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "+", "-", "*", "/"]
-    population = list()
-    for _ in range(0, 30):
-        subject = list()
-        for i in range(0, 7):
-            if i % 2 == 0:
-                r = random.randint(0, 9)
-            else:
-                r = random.randint(10, 13)
-            subject.append(all_values[r])
-        population.append(subject)
+    all_values = values_list()
+    population = random_population(all_values, 30)
     print('>> Values are a list:\n',all_values)
     run_model(population,all_values,seed)
 
     # values are a dict
     seed = 1519568346
     random.seed(seed)
-    all_values = {0: ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"],
-                  2: ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"],
-                  4: ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"],
-                  6: ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"],
-                  1: ["+", "-", "*", "/"],
-                  3: ["+", "-", "*", "/"],
-                  5: ["+", "-", "*", "/"]}
-    population = list()
-    for _ in range(0,30):
-        subject = list()
-        for i in range(0,7):
-            if i%2 == 0:
-                r = random.randint(0,9)
-            else:
-                r = random.randint(0,3)
-            subject.append(all_values[i][r])
-        population.append(subject)
+    all_values = values_dict()
+    population = random_population(all_values, 30)
     print('>> Values are a dict:')
     positions = list(all_values.keys())
     positions.sort()
     for p in positions:
         print(p,':',all_values[p])
     run_model(population,all_values,seed)
+
+
+def scaled_workload(size=10000, genome_length=31, values='dict', seed=1519568369):
+    """
+    A scaled-up variant of the example - a larger population of longer equations - which is used as a standard
+    throughput workload (by the benchmarks package, for example). The strength is bounded (see batch_strength), so
+    evolution always runs for all generations, and the amount of work depends only on the size of the workload.
+
+    :param size: the number of subjects
+    :param genome_length: an odd number. the number of genes of each subject
+    :param values: 'list' or 'dict'. see values_list and values_dict
+    :param seed: the seed of the random population
+    :return: a tuple of (population, all_values, strength_function), where strength_function is a batch strength
+             function (to be used with batch_strength=True)
+    """
+    all_values = values_list() if values == 'list' else values_dict(genome_length)
+    state = random.getstate()
+    random.seed(seed)
+    population = random_population(all_values, size, genome_length)
+    random.setstate(state)
+    return population, all_values, batch_strength_func(ExpressionEvaluator(), bounded=True)
+
+
+def reach_42_scaled(size=10000, genome_length=31, generations=20, backend='list'):
+    """
+    Runs the scaled-up variant of the example (see scaled_workload), and reports its throughput.
+
+    :param size: the number of subjects
+    :param genome_length: an odd number. the number of genes of each subject
+    :param generations: the number of generations
+    :param backend: the backend of the model
+    """
+    population, all_values, strength_function = scaled_workload(size, genome_length)
+    model = Model(population, all_values, strength_function, generations=generations, batch_strength=True,
+                  backend=backend, collect_stats=True, seed=1519568369)
+    start = time.perf_counter()
+    model.evolve()
+    elapsed = time.perf_counter() - start
+    generations_num = len(model.get_stats()['generations'])
+    print('** REACH 42 (scaled) **')
+    print('Population: {0}, genome length: {1}, backend: {2}'.format(size, genome_length, backend))
+    print('Generations: {0}, subjects per second: {1:.0f}'.format(generations_num, generations_num * size / elapsed))
+    print("Model's best result: {0}  =  {1}".format(' '.join(model.get_best()),
+                                                    ExpressionEvaluator().eval(''.join(model.get_best()))))
+    print('End reason: {0}'.format(model.get_end_reason()[1]))
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+
+
+class FitnessCache:
+    """
+    A bounded cache of strengths, keyed by a canonical key of a subject's genes. Strength functions can be
+    expensive, and the same subjects (elitists, duplicates, subjects which were already explored in previous
+    generations) are evaluated again and again. Once the cache is full, entries are evicted either by least
+    recent use ('lru') or by least frequent use ('lfu'). The cache also counts hits, misses and evictions.
+    """
+
+    _max_size = None
+    _policy = None
+    _entries = None
+    _frequencies = None
+    _min_frequency = 0
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+
+    def __init__(self, max_size, policy='lru'):
+        """
+        Create a new empty cache
+
+        :param max_size: a positive integer. the maximal number of strengths to keep
+        :param policy: string. the eviction policy, either 'lru' (least recently used) or 'lfu' (least frequently used)
+        """
+        if max_size < 1:
+            raise ValueError("Fitness cache size must be a positive integer")
+        p = policy.lower()
+        if p not in ('lru', 'lfu'):
+            raise ValueError("Invalid fitness cache policy")
+        self._max_size = max_size
+        self._policy = p
+        self.clear()
+
+    def __len__(self): return len(self._entries)
+
+    def __contains__(self, key): return key in self._entries
+
+    def get_max_size(self): return self._max_size
+    def get_policy(self): return self._policy
+    def get_hits(self): return self._hits
+    def get_misses(self): return self._misses
+    def get_evictions(self): return self._evictions
+
+    def get_stats(self):
+        """
+        Returns the cache's counters
+
+        :return: a dict with the keys 'hits', 'misses', 'evictions', 'size' and 'max_size'
+        """
+        return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                'size': len(self._entries), 'max_size': self._max_size}
+
+    def clear(self):
+        """
+        Remove all entries and reset all counters
+        """
+        self._entries = dict() if self._policy == 'lfu' else OrderedDict()
+        self._frequencies = dict()
+        self._min_frequency = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        """
+        Returns the cached strength of key, and counts a hit or a miss.
+
+        :param key: a canonical key of a subject's genes
+        :return: the cached strength, or None if key is not cached
+        """
+        if key not in self._entries:
+            self._misses += 1
+            return None
+        self._hits += 1
+        if self._policy == 'lfu':
+            strength, frequency = self._entries[key]
+            self._touch(key, frequency)
+            return strength
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, strength):
+        """
+        Cache the strength of key, evicting another entry if the cache is full.
+
+        :param key: a canonical key of a subject's genes
+        :param strength: the strength of the subject
+        """
+        if self._policy == 'lfu':
+            if key in self._entries:
+                frequency = self._entries[key][1]
+                self._entries[key] = (strength, frequency)
+                self._touch(key, frequency)
+                return
+            if len(self._entries) >= self._max_size:
+                self._evict()
+            self._entries[key] = (strength, 1)
+            self._frequencies.setdefault(1, OrderedDict())[key] = None
+            self._min_frequency = 1
+        else:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            elif len(self._entries) >= self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            self._entries[key] = strength
+
+    def _touch(self, key, frequency):
+        """
+        Increase the use-frequency of key, when using the 'lfu' policy. Keys are kept in buckets of equal
+        frequency, so both touching and evicting are O(1).
+        """
+        bucket = self._frequencies[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._frequencies[frequency]
+            if self._min_frequency == frequency:
+                self._min_frequency = frequency + 1
+        self._frequencies.setdefault(frequency + 1, OrderedDict())[key] = None
+        self._entries[key] = (self._entries[key][0], frequency + 1)
+
+    def _evict(self):
+        bucket = self._frequencies[self._min_frequency]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self._frequencies[self._min_frequency]
+        del self._entries[key]
+        self._evictions += 1
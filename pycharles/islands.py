@@ -0,0 +1,247 @@
+import time
+import multiprocessing
+from pycharles.model import Model
+
+
+def _handle(model, command):
+    """
+    Applies a single command sent to an island onto its model.
+
+    :param model: the island's Model
+    :param command: a tuple of (name, arguments)
+    :return: the command's result
+    """
+    name, args = command
+    if name == 'evolve':
+        generations, migrants, first = args
+        if first:
+            model.set_generations(generations)
+            model.evolve()
+        else:
+            # the island carries on from its last generation, keeping its strengths and early-stop bookkeeping
+            model.evolve_more(generations)
+        n = max(1, migrants)
+        best = list(model.get_best(n)) if n > 1 else [model.get_best()]
+        return model.get_end_reason(), model.get_best_strength(), best, model.get_best_strengths(n)
+    elif name == 'immigrate':
+        # the strongest subject of the island always survives
+        subjects, strengths = args
+        n = model.get_population_size() - 1
+        model.replace_weakest(subjects[0:n], strengths[0:n])
+        return None
+    else:
+        raise ValueError("Unknown island command {0}".format(name))
+
+
+def _island_process(connection, model_params):
+    """
+    The main loop of an island's process: create the island's Model, and apply the commands received over the
+    connection until None is received. Exceptions are sent back to the main process.
+
+    :param connection: one end of a multiprocessing Pipe
+    :param model_params: a dict of parameters for the Model's constructor
+    """
+    try:
+        model = Model(**model_params)
+    except Exception as e:
+        connection.send((False, e))
+        return
+    connection.send((True, None))
+    while True:
+        command = connection.recv()
+        if command is None:
+            break
+        try:
+            connection.send((True, _handle(model, command)))
+        except Exception as e:
+            connection.send((False, e))
+    connection.close()
+
+
+class _LocalIsland:
+    """
+    An island which runs in the current process.
+    """
+
+    def __init__(self, model_params):
+        self._model = Model(**model_params)
+        self._result = None
+
+    def send(self, command): self._result = _handle(self._model, command)
+    def recv(self): return self._result
+    def close(self): pass
+
+
+class _ProcessIsland:
+    """
+    An island which runs in its own process, and receives its commands over a pipe.
+    """
+
+    def __init__(self, model_params):
+        self._connection, child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_island_process, args=(child_connection, model_params),
+                                                daemon=True)
+        self._process.start()
+        child_connection.close()
+        self.recv()
+
+    def send(self, command): self._connection.send(command)
+
+    def recv(self):
+        ok, result = self._connection.recv()
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        try:
+            self._connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join()
+        self._connection.close()
+
+
+class Islands:
+    """
+    An island model: several independent Models (islands), each evolving its own population, possibly with its own
+    seed, offspring function or mutation odds. Every few generations, the strongest subjects of each island migrate
+    to its neighbouring islands, where they replace the weakest subjects. Islands can run in parallel, one process
+    per island.
+    """
+
+    _default_end_reason = (-1, None)
+
+    _islands_num = None
+    _migration_interval = None
+    _migrants = None
+    _topology = None
+    _generations = None
+    _processes = True
+    _model_params = list()
+    _best = None
+    _best_strength = None
+    _end_reasons = list()
+    _end_reason = _default_end_reason
+
+    def __init__(self, population, all_values, strength_function, islands=4, migration_interval=5, migrants=1,
+                 topology='ring', generations=10, island_params=None, processes=True, seed=int(time.time()),
+                 **model_params):
+        """
+        Islands' constructor
+
+        :param population: the initial population of each island (see Model)
+        :param all_values: list or dict. a sequence of all values a subject in the population can have
+        :param strength_function: see Model. When running in processes, the strength function must be picklable
+                                  unless processes are forked
+        :param islands: a positive integer. the number of islands
+        :param migration_interval: a positive integer. the number of generations between migrations
+        :param migrants: a non-negative integer. the number of strongest subjects each island sends to each of its
+                         neighbours in every migration
+        :param topology: string. which islands are neighbours: 'ring' (each island sends to the next one) or 'full'
+                         (each island sends to all other islands)
+        :param generations: a positive integer. the total number of generations of each island
+        :param island_params: None or a list of dicts, one per island, of Model parameters which override the
+                              shared parameters for that island (e.g. offspring_function, mutation_odds, seed)
+        :param processes: Boolean. run each island in its own process. When False, islands run one after the
+                          other in the current process
+        :param seed: the seed of the first island. island i is seeded with seed+i, unless overridden
+        :param model_params: any other Model parameters, shared by all islands
+        """
+        if islands < 1:
+            raise ValueError("Number of islands must be a positive integer")
+        if migration_interval < 1:
+            raise ValueError("Migration interval must be a positive integer")
+        if migrants < 0:
+            raise ValueError("Number of migrants must be a non-negative integer")
+        if topology not in ('ring', 'full'):
+            raise ValueError("Invalid topology")
+        if generations < 1:
+            raise ValueError("Generations number must be a positive integer")
+        if island_params is not None and len(island_params) != islands:
+            raise ValueError("island_params must have exactly one dict per island")
+        self._islands_num = islands
+        self._migration_interval = migration_interval
+        self._migrants = migrants
+        self._topology = topology
+        self._generations = generations
+        self._processes = processes
+        self._model_params = list()
+        for i in range(0, islands):
+            params = dict(model_params, population=population, all_values=all_values,
+                          strength_function=strength_function, seed=seed + i)
+            if island_params is not None:
+                params.update(island_params[i])
+            self._model_params.append(params)
+
+    def get_best(self): return self._best
+    def get_best_strength(self): return self._best_strength
+    def get_end_reason(self): return self._end_reason
+    def get_end_reasons(self): return self._end_reasons
+
+    def _neighbours(self, i):
+        if self._topology == 'ring':
+            return [(i + 1) % self._islands_num] if self._islands_num > 1 else list()
+        return [j for j in range(0, self._islands_num) if j != i]
+
+    def evolve(self):
+        """
+        Evolve all islands for the specified amount of generations, migrating subjects between them every
+        migration_interval generations. Islands whose population perished, converged, which stopped early or
+        exhausted their budget are retired, and evolution stops once an island finds an ideal solution.
+        """
+        island_type = _ProcessIsland if self._processes else _LocalIsland
+        islands = list()
+        try:
+            for params in self._model_params:
+                islands.append(island_type(params))
+            self._end_reasons = [self._default_end_reason] * self._islands_num
+            self._best = None
+            self._best_strength = None
+            self._end_reason = self._default_end_reason
+            active = list(range(0, self._islands_num))
+            remaining = self._generations
+            while remaining > 0 and active:
+                generations = min(self._migration_interval, remaining)
+                first = remaining == self._generations
+                remaining -= generations
+                for i in active:
+                    islands[i].send(('evolve', (generations, self._migrants, first)))
+                emigrants = dict()
+                for i in active:
+                    end_reason, best_strength, best, strengths = islands[i].recv()
+                    self._end_reasons[i] = end_reason
+                    if self._best_strength is None or best_strength > self._best_strength:
+                        self._best_strength = best_strength
+                        self._best = best[0]
+                    emigrants[i] = (best[0:self._migrants], strengths[0:self._migrants])
+                if any(self._end_reasons[i][0] == 1 for i in active):
+                    self._end_reason = (1, 'Ideal solution found')
+                    break
+                active = [i for i in active if self._end_reasons[i][0] not in (2, 3, 5, 6)]
+                if remaining > 0 and self._migrants > 0:
+                    self._migrate(islands, active, emigrants)
+            if self._end_reason == self._default_end_reason:
+                if active:
+                    self._end_reason = (0, 'Evolution completed')
+                else:
+                    self._end_reason = (4, 'All islands stopped')
+        finally:
+            for island in islands:
+                island.close()
+
+    def _migrate(self, islands, active, emigrants):
+        """
+        Send the emigrants of each island, along with their strengths, to its active neighbours, where they replace
+        the weakest subjects.
+        """
+        immigrants = {i: (list(), list()) for i in active}
+        for i, (subjects, strengths) in emigrants.items():
+            for j in self._neighbours(i):
+                if j in immigrants:
+                    immigrants[j][0].extend(subjects)
+                    immigrants[j][1].extend(strengths)
+        for i in active:
+            if immigrants[i][0]:
+                islands[i].send(('immigrate', immigrants[i]))
+                islands[i].recv()
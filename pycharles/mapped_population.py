@@ -0,0 +1,441 @@
+import os
+import shutil
+import tempfile
+import weakref
+import itertools
+import numpy as np
+from collections.abc import Sequence
+from pycharles.checkpoint import index_typecode
+from pycharles.array_population import (ArrayPopulation, batch_offspring_functions, select_couples,
+                                        select_couples_by_strength, truncation_size)
+
+
+class MappedPopulation(ArrayPopulation):
+    """
+    A population stored like an ArrayPopulation, where the matrix of gene indices, the strengths and the
+    probabilities live in memory-mapped files rather than in memory, so the population can be larger than the
+    available memory. Gene indices are stored using the smallest unsigned integer type which fits the pools of
+    values.
+
+    The population is never processed at once: evaluation, normalization, building the selection table, breeding
+    and mutation all go over the population one chunk of rows at a time, so only a single chunk (and arrays of one
+    number per subject, when sorting) is held in memory. Each operation which rearranges the population writes it
+    into one of three sets of files (slots), which holds neither the current population nor the parents generation.
+
+    Files are created in a temporary directory, which is removed along with the population.
+    """
+
+    _path = None
+    _chunk_size = None
+    _default_chunk_genes = 2 ** 22
+    _dtype = None
+    _maps = dict()
+    _slot = 0
+    _parent_slot = None
+    _slots_num = 3
+
+    def __init__(self, codec, genome_length, seed=None, path=None, chunk_size=None):
+        """
+        Create a new empty population
+
+        :param codec: a GeneCodec of all values a subject in the population can have
+        :param genome_length: the number of genes of each subject
+        :param seed: a seed to be supplied to the population's pseudo-random number generator
+        :param path: optional. the directory in which the temporary directory of the population's files is created.
+                     Default: the system's temporary directory
+        :param chunk_size: optional. a positive integer. the number of subjects processed at once. Default: about 4
+                           million genes per chunk
+        """
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("Chunk size must be a positive integer or None")
+        self._path = tempfile.mkdtemp(prefix='pycharles-', dir=path)
+        weakref.finalize(self, shutil.rmtree, self._path, True)
+        self._chunk_size = chunk_size or max(1, self._default_chunk_genes // max(1, genome_length))
+        self._dtype = np.dtype(index_typecode(max(codec.layout(genome_length).sizes or [1])))
+        self._maps = dict()
+        super().__init__(codec, genome_length, seed)
+
+    def get_path(self): return self._path
+    def get_chunk_size(self): return self._chunk_size
+
+    def _chunks(self, n):
+        return range(0, n, self._chunk_size)
+
+    def _map(self, name, rows, dtype=np.float64, width=None):
+        """
+        Returns a memory-mapped array of the requested number of rows, backed by the file of the provided name. The
+        file is grown when too small, and is otherwise reused.
+        """
+        shape = (rows,) if width is None else (rows, width)
+        mapped = self._maps.get(name)
+        if mapped is None or mapped.shape[0] < rows:
+            if rows == 0 or width == 0:
+                return np.zeros(shape, dtype=dtype)
+            with open(os.path.join(self._path, name), 'ab') as f:
+                f.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            mapped = np.memmap(os.path.join(self._path, name), dtype=dtype, mode='r+', shape=shape)
+            self._maps[name] = mapped
+        return mapped[0:rows]
+
+    def _slot_arrays(self, slot, rows):
+        """
+        Returns the genes, strengths and probabilities of a slot, of the requested number of rows
+        """
+        return (self._map('genes{0}'.format(slot), rows, self._dtype, self._genes.shape[1]),
+                self._map('strengths{0}'.format(slot), rows), self._map('probabilities{0}'.format(slot), rows))
+
+    def _free_slot(self):
+        return next(slot for slot in range(0, self._slots_num) if slot not in (self._slot, self._parent_slot))
+
+    def _use(self, slot, genes, strengths, probabilities):
+        self._slot = slot
+        self._genes = genes
+        self._strengths = strengths
+        self._probabilities = probabilities
+
+    def _gather(self, genes, rows):
+        """
+        Read the requested rows of a matrix of gene indices, in increasing order of position (which is friendlier to
+        a memory-mapped file than random order).
+
+        :param genes: a 2-D integer matrix of gene indices
+        :param rows: a 1-D array of row indices
+        :return: a 2-D matrix of 64-bit gene indices, in the order of rows
+        """
+        order = np.argsort(rows, kind='stable')
+        gathered = np.empty((rows.shape[0], genes.shape[1]), dtype=np.int64)
+        gathered[order] = genes[rows[order]]
+        return gathered
+
+    def _top(self, strengths, k):
+        """
+        Find the k strongest subjects, by finding the strongest subjects of each chunk, and then the strongest out
+        of them.
+
+        :param strengths: a 1-D array of strengths
+        :param k: the number of subjects to find
+        :return: a 1-D array of row indices, by a decreasing order of strength
+        """
+        candidates = list()
+        for start in self._chunks(strengths.shape[0]):
+            chunk = -np.asarray(strengths[start:start + self._chunk_size])
+            if chunk.shape[0] > k:
+                candidates.append(np.sort(np.argpartition(chunk, k - 1)[0:k]) + start)
+            else:
+                candidates.append(np.arange(start, start + chunk.shape[0]))
+        candidates = np.concatenate(candidates) if candidates else np.zeros(0, dtype=np.int64)
+        return candidates[np.argsort(-strengths[candidates], kind='stable')[0:k]]
+
+    def _write(self, sources, rows):
+        """
+        Write a new population into a free slot, one chunk at a time, and make it the current population.
+
+        :param sources: a sequence of functions of (start, stop) => (genes, strengths), each providing the rows
+                        [start, stop) of its part of the new population. Strengths may be None, in which case they
+                        are zero. Probabilities are kept when the source is the current population, and are otherwise
+                        zero
+        :param rows: a sequence of the number of rows of each source
+        """
+        slot = self._free_slot()
+        genes, strengths, probabilities = self._slot_arrays(slot, sum(rows))
+        position = 0
+        for source, n in zip(sources, rows):
+            for start in self._chunks(n):
+                stop = min(n, start + self._chunk_size)
+                chunk_genes, chunk_strengths, chunk_probabilities = source(start, stop)
+                genes[position + start:position + stop] = chunk_genes
+                strengths[position + start:position + stop] = 0.0 if chunk_strengths is None else chunk_strengths
+                probabilities[position + start:position + stop] = \
+                    0.0 if chunk_probabilities is None else chunk_probabilities
+            position += n
+        self._use(slot, genes, strengths, probabilities)
+
+    def _rows_of_current(self, rows):
+        """
+        A source for _write, of the requested rows of the current population
+        """
+        genes, strengths, probabilities = self._genes, self._strengths, self._probabilities
+
+        def source(start, stop):
+            chunk = rows[start:stop]
+            return self._gather(genes, chunk), strengths[chunk], probabilities[chunk]
+        return source
+
+    def _rows_of(self, genes, strengths=None):
+        """
+        A source for _write, of new subjects
+        """
+        def source(start, stop):
+            return (genes[start:stop], None if strengths is None else strengths[start:stop], None)
+        return source
+
+    def set_genes(self, genes):
+        """
+        Replace the population with a new matrix of gene indices. Strengths and probabilities are reset.
+
+        :param genes: a 2-D integer matrix of gene indices
+        """
+        if self._genes is None:
+            self._genes = genes
+        self._write([self._rows_of(genes)], [genes.shape[0]])
+
+    def set_subjects(self, population):
+        """
+        Replace the population with new subjects, which are encoded one chunk at a time
+
+        :param population: a sequence of subjects
+        """
+        subjects = iter(population)
+        self._write([lambda start, stop: (self.encode(list(itertools.islice(subjects, 0, stop - start))), None,
+                                          None)], [len(population)])
+        self._parent_genes = None
+        self._parent_slot = None
+
+    def load(self, indices, strengths, genome_length):
+        """
+        Replace the population with an already evaluated population, such as the one of a checkpoint, which is
+        copied into the population's files one chunk at a time.
+
+        :param indices: a buffer of the gene indices of all subjects, row after row
+        :param strengths: a buffer of the strengths of all subjects, as doubles
+        :param genome_length: the number of genes of each subject
+        """
+        strengths = np.frombuffer(strengths, dtype=np.float64)
+        genes = np.frombuffer(indices, dtype=indices.format).reshape(len(strengths), genome_length)
+        self._parent_genes = None
+        self._parent_slot = None
+        self._write([self._rows_of(genes, strengths)], [genes.shape[0]])
+
+    def keep(self, rows):
+        """
+        Keep only the specified rows of the population, in the order provided
+
+        :param rows: a slice, an array of row indices or a boolean mask
+        """
+        if isinstance(rows, slice) and rows.start in (None, 0) and rows.step in (None, 1):
+            self._use(self._slot, self._genes[rows], self._strengths[rows], self._probabilities[rows])
+            return
+        if isinstance(rows, slice):
+            rows = np.arange(0, len(self))[rows]
+        rows = np.asarray(rows)
+        if rows.dtype == np.bool_:
+            rows = np.flatnonzero(rows)
+        self._write([self._rows_of_current(rows)], [rows.shape[0]])
+
+    def extend(self, genes):
+        """
+        Add new subjects to the population. The strengths and probabilities of the new subjects are zero.
+
+        :param genes: a 2-D integer matrix of gene indices
+        """
+        current, strengths, probabilities = self._genes, self._strengths, self._probabilities
+        self._write([lambda start, stop: (current[start:stop], strengths[start:stop], probabilities[start:stop]),
+                     self._rows_of(genes)], [len(self), genes.shape[0]])
+
+    def next_generation(self, survivors_num, children):
+        """
+        Replace the population with the next generation: its first survivors_num subjects, except for those with
+        strength 0, followed by new subjects. The strengths and probabilities of the new subjects are zero.
+
+        :param survivors_num: the number of subjects at the beginning of the population which may survive
+        :param children: a 2-D integer matrix of gene indices of the new subjects, which may be memory-mapped
+        :return: the number of subjects which survived
+        """
+        survivors = np.flatnonzero(np.asarray(self._strengths[0:survivors_num]) > 0.0)
+        self._write([self._rows_of_current(survivors), self._rows_of(children)],
+                    [survivors.shape[0], children.shape[0]])
+        return survivors.shape[0]
+
+    def evaluation_chunks(self):
+        """
+        Returns the slices of rows whose strengths are computed together, as a single batch: one batch per chunk
+
+        :return: a list of slices
+        """
+        n = len(self)
+        return [slice(start, min(n, start + self._chunk_size)) for start in range(0, max(1, n), self._chunk_size)]
+
+    def _reset_strengths(self):
+        self._strengths[:] = 0.0
+        self._probabilities[:] = 0.0
+
+    def _batch(self, genes, indices):
+        return np.asarray(genes, dtype=np.int64) if indices else self.decode(genes)
+
+    def strength_to_probability(self):
+        """
+        Compute the survival-probability of all subjects (see ArrayPopulation.strength_to_probability), one chunk
+        at a time.
+        """
+        total_strength = self._strengths.sum()
+        for start in self._chunks(len(self)):
+            strengths = self._strengths[start:start + self._chunk_size]
+            if np.isinf(total_strength):
+                self._probabilities[start:start + self._chunk_size] = np.isinf(strengths)
+            elif total_strength > 0.0:
+                self._probabilities[start:start + self._chunk_size] = strengths / total_strength
+            else:
+                self._probabilities[start:start + self._chunk_size] = 0.0
+
+    def sort(self, top=None):
+        """
+        Sort the population by a decreasing order of strength
+
+        :param top: optional. sort only the top strongest subjects, which are moved to the beginning of the
+                    population, while the order of the rest of the population is arbitrary (a partial sort). Subjects
+                    are then moved in place, unless the population is also the parents generation
+        """
+        n = len(self)
+        if top is None or top >= n:
+            self.keep(np.argsort(-self._strengths, kind='stable'))
+            return
+        first = self._top(self._strengths, top)
+        if self._slot == self._parent_slot:
+            rest = np.ones(n, dtype=np.bool_)
+            rest[first] = False
+            self.keep(np.concatenate((first, np.flatnonzero(rest))))
+            return
+        # the unranked subjects at the beginning of the population take the places of the ranked ones
+        ranked = np.zeros(top, dtype=np.bool_)
+        ranked[first[first < top]] = True
+        displaced = np.flatnonzero(~ranked)
+        vacated = first[first >= top]
+        for array in (self._genes, self._strengths, self._probabilities):
+            strongest = array[first]
+            array[vacated] = array[displaced]
+            array[0:top] = strongest
+
+    def build_selection_table(self):
+        """
+        Mark the current population as the parents of the next generation, and build their cumulative
+        survival-probabilities table, one chunk at a time.
+        """
+        self._parent_slot = self._slot
+        self._parent_genes = self._genes
+        self._parent_strengths = self._strengths
+        self._parent_probabilities = self._probabilities
+        self._parent_cumulative = self._map('cumulative', len(self))
+        total = 0.0
+        for start in self._chunks(len(self)):
+            chunk = np.cumsum(np.concatenate(([total], self._probabilities[start:start + self._chunk_size])))[1:]
+            self._parent_cumulative[start:start + self._chunk_size] = chunk
+            total = chunk[-1]
+
+    def breed(self, number_of_couples, method, offspring_function, batch_offspring_function=None, parameter=None,
+              mutation_odds=None, breeder=None):
+        """
+        Select couples out of the parents generation and create two children for each couple (see
+        ArrayPopulation.breed). Couples are selected, bred and mutated one chunk at a time, and the children are
+        written to a memory-mapped file.
+
+        :param number_of_couples: the number of pairs of children to create
+        :param method: string. the selection method, one of 'roulette', 'sus', 'tournament' or 'truncation'
+        :param offspring_function: a function of (subject1, subject2) => (new_subject1, new_subject2)
+        :param batch_offspring_function: optional. a batch offspring function, or its name in
+                                         batch_offspring_functions. When provided, offspring_function is not used
+        :param parameter: the tournament size or truncation ratio, for 'tournament' and 'truncation'
+        :param mutation_odds: optional. when defined, the children are also mutated
+        :param breeder: not supported, as the parents are not held in memory
+        :return: a memory-mapped 2-D integer matrix of the children's gene indices, where the two children of each
+                 couple are adjacent. The matrix is overwritten by the next call
+        """
+        if breeder is not None:
+            raise ValueError("Parallel breeding is not supported by memory-mapped populations")
+        if self._parent_genes is None:
+            self.build_selection_table()
+        parents = self._parent_genes
+        pool = None
+        alive = None
+        if method == 'truncation':
+            alive_num = sum(int((self._parent_strengths[start:start + self._chunk_size] > 0.0).sum())
+                            for start in self._chunks(len(parents)))
+            pool = np.sort(self._top(self._parent_strengths, truncation_size(len(parents), parameter, alive_num)))
+        elif method == 'tournament':
+            alive = np.concatenate([np.flatnonzero(self._parent_strengths[start:start + self._chunk_size] > 0.0) + start
+                                    for start in self._chunks(len(parents))] or [np.zeros(0, dtype=np.int64)])
+        if isinstance(batch_offspring_function, str):
+            batch_offspring_function = batch_offspring_functions[batch_offspring_function]
+        children = self._map('children', 2 * number_of_couples, self._dtype, self._genes.shape[1])
+        couples_per_chunk = max(1, self._chunk_size // 2)
+        for start in range(0, number_of_couples, couples_per_chunk):
+            n = min(couples_per_chunk, number_of_couples - start)
+            if method in ('tournament', 'truncation'):
+                fathers, mothers = select_couples_by_strength(self._parent_strengths, n, method, parameter,
+                                                              self._rng, pool, alive)
+            else:
+                fathers, mothers = select_couples(self._parent_probabilities, self._parent_cumulative, n, method,
+                                                  self._rng)
+            if batch_offspring_function is not None:
+                child1, child2 = batch_offspring_function(self._gather(parents, fathers),
+                                                          self._gather(parents, mothers), self._widths, self._sizes,
+                                                          self._rng)
+                chunk = np.empty((2 * n, parents.shape[1]), dtype=np.int64)
+                chunk[0::2] = child1
+                chunk[1::2] = child2
+            else:
+                subjects = list()
+                for father, mother in zip(self.decode(self._gather(parents, fathers)),
+                                          self.decode(self._gather(parents, mothers))):
+                    subjects.extend(offspring_function(father, mother))
+                chunk = self.encode(subjects)
+            if mutation_odds is not None:
+                super().mutate(chunk, mutation_odds)
+            children[2 * start:2 * (start + n)] = chunk
+        return children
+
+    def mutate(self, genes, mutation_odds):
+        """
+        Mutate a matrix of gene indices in place (see ArrayPopulation.mutate), one chunk at a time.
+
+        :param genes: a 2-D integer matrix of gene indices, which may be memory-mapped
+        :param mutation_odds: a number in the continuous range [0,1], representing the probability of a bit
+                              flipping its value
+        """
+        for start in self._chunks(genes.shape[0]):
+            chunk = genes[start:start + self._chunk_size].astype(np.int64)
+            super().mutate(chunk, mutation_odds)
+            genes[start:start + self._chunk_size] = chunk
+
+
+class PopulationView(Sequence):
+    """
+    A read-only view of the subjects of an ArrayPopulation (or of its first subjects), which decodes subjects only
+    when they are accessed, and one chunk at a time when iterated over. The view is live: it always shows the
+    current state of the population.
+    """
+
+    _population = None
+    _stop = None
+    _chunk_size = 1024
+
+    def __init__(self, population, stop=None):
+        """
+        Create a new view
+
+        :param population: an ArrayPopulation
+        :param stop: optional. show only this number of the first subjects of the population
+        """
+        self._population = population
+        self._stop = stop
+        if isinstance(population, MappedPopulation):
+            self._chunk_size = population.get_chunk_size()
+
+    def __len__(self):
+        n = len(self._population)
+        return n if self._stop is None else min(n, self._stop)
+
+    def __getitem__(self, item):
+        genes = self._population.get_genes()[0:len(self)]
+        if isinstance(item, slice):
+            return self._population.decode(genes[item])
+        if item < 0:
+            item += len(self)
+        if item < 0 or item >= len(self):
+            raise IndexError("Population index out of range")
+        return self._population.decode(genes[item:item + 1])[0]
+
+    def __iter__(self):
+        n = len(self)
+        genes = self._population.get_genes()
+        for start in range(0, n, self._chunk_size):
+            yield from self._population.decode(genes[start:min(n, start + self._chunk_size)])
@@ -1,9 +1,40 @@
+import os
 import time
 import math
-import random
+import heapq
+import array
+import itertools
+from collections import namedtuple
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from pycharles import archive
+from pycharles import diversity
+from pycharles import mutation
+from pycharles import checkpoint
 from pycharles import offspring_functions
 from pycharles import random_util
+from pycharles import selection
+from pycharles import strength
+from pycharles.codec import GeneCodec
 from pycharles.element import Element
+from pycharles.fitness_cache import FitnessCache
+from pycharles.stats import EvolutionStats
+from pycharles.steady_state import SteadyState
+
+
+class _BudgetExhausted(Exception):
+    """
+    Raised within the evolution loop when the time or evaluation budget runs out in the middle of a generation.
+    """
+    pass
+
+
+GenerationSnapshot = namedtuple('GenerationSnapshot', ['generation', 'best', 'best_strength', 'mean_strength',
+                                                       'population_size', 'elapsed'])
+GenerationSnapshot.__doc__ = """
+A lightweight summary of a single generation, yielded by Model.evolve_iter: the generation number, the strongest
+subject and its strength, the mean strength of the population, the population size and the number of seconds
+elapsed since evolution started.
+"""
 
 
 class Model:
@@ -14,6 +45,7 @@ class Model:
     _default_duplication_replace_attempts = 3
 
     _all_values = list()
+    _codec = None
     _initial_population = list()
     _strength_function = None
     _offspring_function = None
@@ -22,18 +54,68 @@ class Model:
     _generations = None
     _duplication_policy = None
     _seed = None
+    _random = None
     _elements = list()
+    _free_elements = list()
     _end_reason = _default_end_reason
     _current_generation = 0
     _duplication_replace_attempts = _default_duplication_replace_attempts
     _verbose = False
     _early_stop = None
     _mutate_elitists = False
+    _selection_method = None
+    _selection_table = None
+    _selection_pool = list()
+    _backend = None
+    _fitness_cache = None
+    _batch_strength = False
+    _strength_input = None
+    _executor = None
+    _executor_workers = None
+    _chunk_size = None
+    _running_executor = None
+    _breeder = None
+    _highest_strength = 0
+    _last_improvement_generation = 0
+    _resume = False
+    _continue = False
+    _checkpoint_path = None
+    _checkpoint_every = None
+    _stats = None
+    _packed_offspring_function = None
+    _selection_parameter = None
+    _default_tournament_size = 2
+    _default_truncation_ratio = 0.5
+    _ranked_num = 0
+    _archive = None
+    _min_population_size = 2
+    _batch_offspring_function = None
+    _stats_callback = None
+    _population = None
+    _track_diversity = False
+    _convergence_threshold = None
+    _convergence_action = None
+    _diversity = None
+    _steady_state = None
+    _steady = None
+    _time_budget = None
+    _evaluation_budget = None
+    _deadline = None
+    _evaluations_num = 0
+    _best_so_far = None
+    _budget_checks = 16
 
     def __init__(self, population, all_values, strength_function, offspring_function='slice_and_stitch',
                  elitism_ratio=0.1, mutation_odds=0.001, generations=10,
                  early_stop=None, mutate_elitists=False, duplication_policy='ignore',
-                 seed=int(time.time()), verbose=False):
+                 selection_method='roulette', backend='list', fitness_cache_size=None, fitness_cache_policy='lru',
+                 batch_strength=False, strength_input='values', executor=None, executor_workers=None,
+                 chunk_size=None, checkpoint_path=None, checkpoint_every=None, collect_stats=False,
+                 stats_callback=None, archive_size=None, archive_type='exact', breeding_workers=None,
+                 storage_path=None, storage_chunk_size=None, track_diversity=False, convergence_threshold=None,
+                 convergence_action='stop', steady_state=None, time_budget=None, evaluation_budget=None,
+                 seed=int(time.time()),
+                 verbose=False):
         """
         Model's constructor
 
@@ -61,18 +143,101 @@ class Model:
                                 the next one
         :param duplication_policy: string. The policy of the model regarding duplicates in the population at the end of
                                    each generation. See README file for more details.
+        :param selection_method: string. The method used to randomly select parents based on their strength. One of
+                                 'roulette', 'alias' (list backend only), 'sus', 'tournament' or 'truncation'.
+                                 See README file for more details.
+        :param backend: string. How the population is stored: 'list' stores each subject as an Element, 'numpy'
+                        stores the entire population as NumPy arrays (requires NumPy), and 'mmap' stores these arrays
+                        in memory-mapped files, for populations larger than the available memory. See README file for
+                        more details.
+        :param fitness_cache_size: None or a positive integer. When not None, the strengths of up to this number of
+                                   distinct subjects are cached across generations, so they are not computed again.
+                                   Keep None for non-deterministic strength functions
+        :param fitness_cache_policy: string. The eviction policy of the fitness cache, either 'lru' (least recently
+                                     used) or 'lfu' (least frequently used)
+        :param batch_strength: Boolean. When True, strength_function is a batch function: it receives a sequence of
+                               all the subjects which require evaluation in a generation, and returns a sequence of
+                               their strengths, in the same order. Budgets are then checked once per batch, unless
+                               chunk_size is set
+        :param strength_input: string. What the strength function receives for each subject: 'values' for the subject
+                               itself, or 'indices' for the indices of its genes in all_values. With the 'numpy'
+                               backend and batch_strength, 'indices' provides a 2-D matrix of gene indices
+        :param executor: None, string or a concurrent.futures.Executor. When not None, strengths are computed in
+                         parallel: 'thread' uses a thread pool (for strength functions which release the GIL),
+                         'process' uses a process pool (for pure-Python strength functions, which must then be
+                         picklable). Pools created by the model live for the duration of evolve
+        :param executor_workers: None or a positive integer. The number of workers of a pool created by the model,
+                                 or of the provided Executor, which is used to size the chunks. When None, the
+                                 pool's default is used, and chunks are sized for os.cpu_count() workers
+        :param chunk_size: None or a positive integer. The number of subjects sent to a worker at once. When None,
+                           each generation is split to about four chunks per worker
+        :param checkpoint_path: None or a path. Where checkpoints are automatically saved during evolution
+        :param checkpoint_every: None or a positive integer. When not None (and checkpoint_path is set), a checkpoint
+                                 is saved at the end of every this number of generations
+        :param collect_stats: Boolean. When True, the wall time and number of calls of each phase of the evolution,
+                              as well as counters such as the number of fitness evaluations, are recorded for each
+                              generation. See get_stats
+        :param stats_callback: None or a function of (model, generation_stats). When not None, stats are collected,
+                               and the function is called at the end of each generation with its stats
+        :param archive_size: None or a positive integer. When not None, and the duplication policy is 'kill' or
+                             'replace', the genomes of the last evaluated subjects (up to about this number) are
+                             archived, and new subjects whose genome was already explored are treated as duplicates
+        :param archive_type: string. 'exact' keeps the archived genomes in a set, while 'bloom' uses Bloom filters,
+                             which take much less memory but may reject a new genome with a small probability
+        :param breeding_workers: None or a positive integer. 'numpy' backend only. When not None, offspring are
+                                 bred and mutated in chunks by this number of worker processes, over shared memory.
+                                 The results depend on the seed, but not on the number of workers
+        :param storage_path: None or a path. 'mmap' backend only. The directory in which the files of the population
+                             are created (in a temporary sub-directory, removed along with the model). When None, the
+                             system's temporary directory is used
+        :param storage_chunk_size: None or a positive integer. 'mmap' backend only. The number of subjects processed
+                                   at once, which is also the number of subjects evaluated as a single batch. When
+                                   None, chunks are made of about 4 million genes
+        :param track_diversity: Boolean. When True, the diversity of the population - the ratio of unique genomes
+                                and the frequency of each value of each gene - is tracked in each generation. See
+                                get_diversity
+        :param convergence_threshold: None or a number in the range (0,1]. When not None, diversity is tracked, and
+                                      the population is considered converged once its gene diversity falls below
+                                      this threshold
+        :param convergence_action: string. What the model does once the population converged: 'stop' stops the
+                                   evolution, while 'restart' keeps the elitists and replaces the rest of the
+                                   population with new random subjects
+        :param steady_state: None or a positive integer. When not None, evolution is steady-state: rather than
+                             replacing the entire population, each generation breeds this number of children,
+                             evaluates only them, and each child replaces the weakest subject of the population if it
+                             is at least as strong. See README file for more details.
+        :param time_budget: None or a positive number. When not None, evolution stops once this number of seconds
+                            has passed since it started. The budget is also checked between chunks of evaluations,
+                            so a generation may be interrupted. See get_best_so_far
+        :param evaluation_budget: None or a positive integer. When not None, evolution stops once the strength
+                                  function was called on this number of subjects. A generation may be interrupted,
+                                  and the budget is never exceeded
         :param seed: a seed to be supplied to the model's pseudo-random number generator
         :param verbose: Boolean. Set verbosity level
         """
         self._all_values = all_values
+        self._codec = GeneCodec(all_values)
         self._initial_population = population
+        self._set_backend(backend, population, storage_path, storage_chunk_size)
+        self.set_seed(seed)
         self.set_strength_function(strength_function)
         self.set_offspring_function(offspring_function)
         self.set_elitism_ratio(elitism_ratio)
         self.set_mutation_odds(mutation_odds)
         self.set_generations(generations)
         self.set_duplication_policy(duplication_policy)
-        self.set_seed(seed)
+        self.set_selection_method(selection_method)
+        self.set_fitness_cache(fitness_cache_size, fitness_cache_policy)
+        self.set_batch_strength(batch_strength)
+        self.set_strength_input(strength_input)
+        self.set_executor(executor, executor_workers, chunk_size)
+        self.set_checkpoint(checkpoint_path, checkpoint_every)
+        self.set_stats(collect_stats, stats_callback)
+        self.set_archive(archive_size, archive_type)
+        self.set_diversity(track_diversity, convergence_threshold, convergence_action)
+        self.set_steady_state(steady_state)
+        self.set_budget(time_budget, evaluation_budget)
+        self.set_breeding_workers(breeding_workers)
         self.set_verbosity(verbose)
         self.set_early_stop(early_stop)
         self.set_elitists_mutation(mutate_elitists)
@@ -85,13 +250,19 @@ class Model:
     def set_offspring_function(self, offspring_function):
         if isinstance(offspring_function, str):
             if offspring_function == 'slice_and_stitch':
-                self._offspring_function = offspring_functions.slice_and_stitch_func(self._all_values)
+                self._offspring_function = offspring_functions.slice_and_stitch_func(self._codec, self._random)
+                self._packed_offspring_function = offspring_functions.slice_and_stitch_packed
+                self._batch_offspring_function = offspring_function
             elif offspring_function == 'parents_similarity':
-                self._offspring_function = offspring_functions.parents_similarity_func(self._all_values)
+                self._offspring_function = offspring_functions.parents_similarity_func(self._codec, self._random)
+                self._packed_offspring_function = offspring_functions.parents_similarity_packed
+                self._batch_offspring_function = offspring_function
             else:
                 raise ValueError('Unknown offspring function {0}'.format(offspring_function))
         else:
             self._offspring_function = offspring_function
+            self._packed_offspring_function = None
+            self._batch_offspring_function = None
 
     def set_early_stop(self, patience):
         if patience is not None:
@@ -107,13 +278,120 @@ class Model:
             self._duplication_policy = dp
             self._duplication_replace_attempts = self._default_duplication_replace_attempts
         elif dp.startswith('replace:'):
-            att = dp.split(':')[1]
+            att = int(dp.split(':')[1])
             if att < 1:
                 raise ValueError("Invalid number of attempts")
             else:
+                self._duplication_policy = 'replace'
                 self._duplication_replace_attempts = att
         else:
             raise ValueError("Invalid duplication policy")
+        if self._duplication_policy != 'ignore' and self._backend == 'mmap':
+            raise ValueError("The 'mmap' backend only supports the 'ignore' duplication policy")
+
+    def set_selection_method(self, selection_method):
+        sm = selection_method.lower()
+        if sm in selection.proportional_methods:
+            self._selection_method = sm
+            self._selection_parameter = None
+        elif sm == 'tournament' or sm.startswith('tournament:'):
+            size = int(sm.split(':')[1]) if ':' in sm else self._default_tournament_size
+            if size < 1:
+                raise ValueError("Invalid tournament size")
+            self._selection_method = 'tournament'
+            self._selection_parameter = size
+        elif sm == 'truncation' or sm.startswith('truncation:'):
+            ratio = float(sm.split(':')[1]) if ':' in sm else self._default_truncation_ratio
+            if ratio <= 0.0 or ratio > 1.0:
+                raise ValueError("Invalid truncation ratio")
+            self._selection_method = 'truncation'
+            self._selection_parameter = ratio
+        else:
+            raise ValueError("Invalid selection method")
+        if self._selection_method == 'alias' and self._population is not None:
+            raise ValueError("The 'alias' selection method is only supported by the 'list' backend")
+        self._selection_table = None
+
+    def set_fitness_cache(self, max_size, policy='lru'):
+        if max_size is None or max_size == 0:
+            self._fitness_cache = None
+        else:
+            self._fitness_cache = FitnessCache(max_size, policy)
+
+    def set_batch_strength(self, batch_strength): self._batch_strength = batch_strength
+
+    def set_strength_input(self, strength_input):
+        si = strength_input.lower()
+        if si in ('values', 'indices'):
+            self._strength_input = si
+        else:
+            raise ValueError("Invalid strength input")
+
+    def set_executor(self, executor, workers=None, chunk_size=None):
+        if executor is not None and not isinstance(executor, Executor) and executor not in ('thread', 'process'):
+            raise ValueError("Invalid executor")
+        if workers is not None and workers < 1:
+            raise ValueError("Number of workers must be a positive integer or None")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("Chunk size must be a positive integer or None")
+        self._executor = executor
+        self._executor_workers = workers
+        self._chunk_size = chunk_size
+
+    def set_checkpoint(self, path, every=None):
+        if every is not None and every < 1:
+            raise ValueError("Checkpoint interval must be a positive integer or None")
+        self._checkpoint_path = path
+        self._checkpoint_every = every
+
+    def set_archive(self, max_size, archive_type='exact'):
+        self._archive = archive.genome_archive(max_size, archive_type) if max_size is not None else None
+
+    def set_diversity(self, track_diversity, convergence_threshold=None, convergence_action='stop'):
+        if convergence_threshold is not None and (convergence_threshold <= 0.0 or convergence_threshold > 1.0):
+            raise ValueError("Convergence threshold must be a number in the range (0,1] or None")
+        ca = convergence_action.lower()
+        if ca != 'stop' and ca != 'restart':
+            raise ValueError("Invalid convergence action")
+        track = track_diversity or convergence_threshold is not None
+        if track and self._backend == 'mmap':
+            raise ValueError("The 'mmap' backend does not support diversity tracking")
+        self._track_diversity = track
+        self._convergence_threshold = convergence_threshold
+        self._convergence_action = ca
+        self._diversity = None
+
+    def set_steady_state(self, children_num):
+        if children_num is not None:
+            if children_num < 1:
+                raise ValueError("Number of steady-state children must be a positive integer or None")
+            if self._backend == 'mmap':
+                raise ValueError("The 'mmap' backend does not support steady-state evolution")
+        self._steady_state = children_num
+        self._steady = None
+
+    def set_budget(self, time_budget=None, evaluation_budget=None):
+        if time_budget is not None and time_budget <= 0:
+            raise ValueError("Time budget must be a positive number or None")
+        if evaluation_budget is not None and evaluation_budget < 1:
+            raise ValueError("Evaluation budget must be a positive integer or None")
+        self._time_budget = time_budget
+        self._evaluation_budget = evaluation_budget
+
+    def set_breeding_workers(self, workers):
+        if self._breeder is not None:
+            self._breeder.close()
+        if workers is None:
+            self._breeder = None
+            return
+        if self._backend != 'numpy':
+            raise ValueError("Parallel breeding requires the 'numpy' backend")
+        from pycharles.parallel import ParallelBreeder
+        self._breeder = ParallelBreeder(workers)
+
+    def set_stats(self, collect_stats, callback=None):
+        self._stats = EvolutionStats() if collect_stats or callback is not None else None
+        self._stats_callback = callback
 
     def set_elitism_ratio(self, elitism_ratio):
         if elitism_ratio < 0.0 or elitism_ratio > 1.0:
@@ -134,57 +412,205 @@ class Model:
             raise ValueError("Generations number must be a non-negative integer")
 
     def set_seed(self, seed):
+        """
+        Seed the model's pseudo-random number generators. Each model owns its generators, so models never interfere
+        with each other, or with the random module.
+
+        :param seed: the seed
+        """
         self._seed = seed
-        random.seed(seed)
+        if self._random is None:
+            self._random = random_util.RandomStream(seed)
+        else:
+            self._random.seed(seed)
+        if self._population is not None:
+            self._population.set_seed(seed)
+
+    def spawn_rngs(self, n):
+        """
+        Create independent pseudo-random number generators for parallel work (such as the workers of a parallel
+        computation). The generators are derived from the model's seed rather than from the numbers it has drawn,
+        so models with the same seed spawn the same generators.
+
+        :param n: the number of generators
+        :return: a list of RandomStream, or of numpy random Generators when using the 'numpy' backend
+        """
+        if self._population is not None:
+            return self._population.spawn_rngs(n)
+        return self._random.spawn(n)
+
+    def _set_backend(self, backend, population, storage_path=None, storage_chunk_size=None):
+        b = backend.lower()
+        if b == 'list':
+            self._population = None
+        elif b == 'numpy' or b == 'mmap':
+            try:
+                from pycharles.array_population import ArrayPopulation
+                from pycharles.mapped_population import MappedPopulation
+            except ImportError:
+                raise ImportError("The '{0}' backend requires NumPy to be installed".format(b))
+            genome_length = len(population[0]) if population else 0
+            if b == 'numpy':
+                self._population = ArrayPopulation(self._codec, genome_length)
+            else:
+                self._population = MappedPopulation(self._codec, genome_length, path=storage_path,
+                                                    chunk_size=storage_chunk_size)
+        else:
+            raise ValueError("Invalid backend")
+        self._backend = b
 
     def _set_population(self, population):
         if all(len(subject) == len(population[0]) for subject in population):
-            self._elements = list(map(lambda subject: Element(subject),population))
+            if self._population is not None:
+                self._elements = list()
+                self._population.set_subjects(population)
+            else:
+                self._elements = list(map(lambda subject: Element(subject),population))
+            self._free_elements = list()
         else:
             raise ValueError("All subjects in the population must have the same size")
 
-    def get_population(self): return list(map(lambda el: el.get_genes(), self._elements))
+    def get_population(self):
+        if self._backend == 'mmap':
+            from pycharles.mapped_population import PopulationView
+            return PopulationView(self._population)
+        if self._population is not None:
+            return self._population.get_subjects()
+        return list(map(lambda el: el.get_genes(), self._elements))
+
+    def get_population_size(self): return self._population_size()
     def get_end_reason(self): return self._end_reason
     def get_current_generation(self): return self._current_generation
+    def get_evaluations_num(self): return self._evaluations_num
+
+    def get_best_so_far(self):
+        """
+        Returns the strongest subject found since evolution started, even if it is no longer part of the population,
+        along with its strength. Subjects are tracked as soon as they are evaluated when a budget is set, and at the
+        end of each generation otherwise.
+
+        :return: a tuple of (subject, strength), or None if no subject was evaluated yet
+        """
+        return self._best_so_far
+
+    def get_fitness_cache_stats(self):
+        """
+        Returns the counters of the fitness cache
+
+        :return: None if the fitness cache is disabled, otherwise a dict with the keys 'hits', 'misses', 'evictions',
+                 'size' and 'max_size'
+        """
+        if self._fitness_cache is None:
+            return None
+        return self._fitness_cache.get_stats()
+
+    def get_stats(self):
+        """
+        Returns the stats of the last evolution, when stats collection is enabled. Each generation has a record of
+        the wall time ('times') and number of calls ('calls') of each phase - 'evaluation', 'ranking', 'selection',
+        'breeding', 'mutation', 'duplicates', 'diversity', 'restart' and 'checkpoint' - and of its counters
+        ('counters') - 'evaluations', 'cache_hits', 'misfits_killed', 'duplicates_removed', 'archive_hits',
+        'replace_rounds', 'restarts' and 'replacements' (of steady-state evolution). The time of
+        'duplicates' includes breeding the replacements of duplicates.
+
+        :return: None if stats collection is disabled, otherwise a dict with the keys 'generations' (a list of the
+                 records of all generations) and 'totals' (the times, calls and counters summed over all generations)
+        """
+        if self._stats is None:
+            return None
+        return {'generations': self._stats.get_generations(), 'totals': self._stats.get_totals()}
+
+    def get_diversity(self):
+        """
+        Returns the diversity of the population in each generation of the last evolution, when diversity tracking is
+        enabled. The diversity of each generation is measured after its subjects were evaluated.
+
+        :return: None if diversity tracking is disabled or evolution has not started, otherwise a dict with the keys
+                 'generations' (a list of records of all generations, with the keys 'generation', 'unique_ratio' -
+                 the ratio of unique genomes in the population - and 'gene_diversity' - the Gini-Simpson index of
+                 each gene, normalized to [0,1] and averaged over all genes) and 'allele_frequencies' (the frequency
+                 of each possible value of each gene in the last generation, as a list per gene, in the order of the
+                 gene's pool of values)
+        """
+        if self._diversity is None:
+            return None
+        return {'generations': self._diversity.get_generations(),
+                'allele_frequencies': self._diversity.get_allele_frequencies()}
+
+    def _timed(self, phase, function, *args):
+        """
+        Call function, and record its wall time as a call of phase when stats collection is enabled.
+        """
+        if self._stats is None:
+            return function(*args)
+        start = time.perf_counter()
+        result = function(*args)
+        self._stats.add_time(phase, time.perf_counter() - start)
+        return result
+
+    def _count(self, counter, n=1):
+        if self._stats is not None:
+            self._stats.count(counter, n)
+
+    def _end_generation_stats(self):
+        if self._stats is not None:
+            record = self._stats.end_generation()
+            if record is not None and self._stats_callback is not None:
+                self._stats_callback(self, record)
+
+    def _population_size(self):
+        if self._population is not None:
+            return len(self._population)
+        return len(self._elements)
+
+    def _best_strength(self):
+        if self._population is not None:
+            return self._population.get_strengths()[0]
+        return self._elements[0].get_strength()
 
     def _kill_misfits(self):
         """
         his function removes all Elements of the population with strength 0, as they have no chance of
         reproduce or survive
         """
-        self._elements = [el for el in self._elements if el.get_strength() > 0.0]
+        if self._population is not None:
+            self._population.kill_misfits()
+        else:
+            self._elements = [el for el in self._elements if el.get_strength() > 0.0]
 
     def _print(self, text):
         if self._verbose:
             print(text)
 
+    def _build_selection_table(self):
+        """
+        Build the selection table of the current population, based on the survival-probability of each Element.
+        The table is built once per generation, and is used for all parent selections of the next generation.
+        """
+        if self._population is not None:
+            self._population.build_selection_table()
+            return
+        self._selection_pool = self._elements
+        if self._selection_method in selection.proportional_methods:
+            weights = [el.get_probability() for el in self._elements]
+        else:
+            weights = [el.get_strength() for el in self._elements]
+        self._selection_table = selection.selection_table(self._selection_method, weights,
+                                                          self._selection_parameter, self._random)
+
     def _select_element(self, ignore_this_element=None):
         """
         This function randomly selects a single Element of a population based on their strength.
-        An ordered population is preferred for performance, where the first Element of the population has
-        the highest probability of survival and reproduction, and the rest are ordered by a decreasing
-        order of their strength (and survival probability).
 
         :param ignore_this_element: if defined, this Element will not participate in the random selection
         :return: a random Element of the population
         """
-        if ignore_this_element is None:
-            p = 0.0
-        else:
-            p = ignore_this_element.get_probability()
-        r = random_util.positive_random() * (1.0 - p)
-        prob_sum = 0.0
-        selected = None
-        for element in self._elements:
-            if ignore_this_element is None or ignore_this_element != element:
-                p = element.get_probability()
-                if prob_sum + p >= r:
-                    selected = element
-                else:
-                    prob_sum += p
-        if selected is None:
-            selected = self._elements[-1]
-        return selected
+        if self._selection_table is None:
+            self._build_selection_table()
+        ignore_index = None
+        if ignore_this_element is not None:
+            ignore_index = next((i for i, el in enumerate(self._selection_pool) if el is ignore_this_element), None)
+        return self._selection_pool[self._selection_table.select(ignore_index=ignore_index)]
 
     def reset(self):
         """
@@ -193,106 +619,997 @@ class Model:
         self._set_population(self._initial_population)
         self._end_reason = self._default_end_reason
         self._current_generation = 0
+        self._selection_table = None
+        self._resume = False
+        self._continue = False
+
+    def save_checkpoint(self, path):
+        """
+        Save the state of the model to a checkpoint file: the population (as a compact array of gene indices), the
+        strengths, the current generation, the early-stop bookkeeping and the state of the pseudo-random number
+        generators. The fitness cache is not saved. Evolution can then be resumed using load_checkpoint, on a model
+        created with the same parameters.
+
+        :param path: the path of the checkpoint file
+        """
+        typecode = checkpoint.index_typecode(max(self._codec.layout(self._genome_length()).sizes or [1]))
+        if self._population is not None:
+            # written straight from the arrays (which may be memory-mapped) whenever their types already match
+            indices = self._population.get_genes().astype(typecode, copy=False)
+            strengths = self._population.get_strengths().astype('d', copy=False)
+            numpy_state = self._population.get_rng_state()
+        else:
+            indices = array.array(typecode, [i for el in self._elements for i in self._codec.to_indices(el.get_genes())])
+            strengths = array.array('d', [el.get_strength() for el in self._elements])
+            numpy_state = None
+        state = {'rows': self._population_size(), 'genome_length': self._genome_length(),
+                 'generation': self._current_generation, 'end_reason': list(self._end_reason),
+                 'highest_strength': self._highest_strength,
+                 'last_improvement_generation': self._last_improvement_generation,
+                 'random_state': self._random.getstate(), 'numpy_state': numpy_state}
+        checkpoint.write(path, state, typecode, indices, strengths)
+
+    def load_checkpoint(self, path):
+        """
+        Restore the state of the model from a checkpoint file saved by save_checkpoint. The file is memory-mapped,
+        and with the 'numpy' backend, the population is used directly from the mapped file. The next call to evolve
+        resumes from the generation following the checkpoint.
+
+        :param path: the path of the checkpoint file
+        """
+        state, indices, strengths, _, _ = checkpoint.read(path)
+        rows = state['rows']
+        genome_length = state['genome_length']
+        if self._population is not None:
+            self._population.load(indices, strengths, genome_length)
+            self._population.set_rng_state(state['numpy_state'])
+        else:
+            subjects = self._codec.from_indices_batch([indices[r*genome_length:(r+1)*genome_length].tolist()
+                                                       for r in range(0, rows)])
+            self._elements = [Element(subject) for subject in subjects]
+            for el, s in zip(self._elements, strengths.tolist()):
+                el.set_strength_value(s)
+        (version, internal_state, gauss_next), key, spawned = state['random_state']
+        self._random.setstate(((version, tuple(internal_state), gauss_next), key, spawned))
+        self._current_generation = state['generation']
+        self._end_reason = tuple(state['end_reason'])
+        self._highest_strength = state['highest_strength']
+        self._last_improvement_generation = state['last_improvement_generation']
+        if self._steady_state is None:
+            self._normalize()
+        else:
+            # the positions of the subjects are the slots of the steady-state bookkeeping, with the strongest first
+            self._steady = None
+            self._ranked_num = 1
+        self._resume = True
+
+    def _genome_length(self):
+        if self._population is not None:
+            return self._population.get_genes().shape[1]
+        return self._elements[0].get_genome_length() if self._elements else 0
 
     def get_best(self,n=1):
         """
         Returns the n strongest subject in the population
 
         :param n: how may subjects to return
-        :return: if n==1, return a single subject. if n>1, return a list of subjects, with decreasing strength.
+        :return: if n==1, return a single subject. if n>1, return a list of subjects, with decreasing strength. With
+                 the 'mmap' backend, a view of the first n subjects of the population is returned instead of a list
         """
+        if self._backend == 'mmap' and 1 < n:
+            from pycharles.mapped_population import PopulationView
+            if self._ranked_num < n:
+                self._rank_top(n)
+            return PopulationView(self._population, n)
+        if 1 < n and self._ranked_num < n:
+            self._rank_top(self._population_size())
+        if self._population is not None:
+            best = self._population.get_subjects(n)
+        else:
+            best = [el.get_genes() for el in self._elements[0:n]]
         if n == 1:
-            return self._elements[0].get_genes()
+            return best[0]
+        else:
+            return best
+
+    def get_best_strength(self):
+        """
+        Returns the strength of the strongest subject in the population, as computed in the last generation
+
+        :return: a non-negative number
+        """
+        return self._best_strength()
+
+    def get_best_strengths(self, n=1):
+        """
+        Returns the strengths of the n strongest subjects in the population, matching get_best(n)
+
+        :param n: how may strengths to return
+        :return: a list of non-negative numbers, in a decreasing order
+        """
+        if self._ranked_num < n:
+            self._rank_top(n)
+        if self._population is not None:
+            return self._population.get_strengths()[0:n].tolist()
+        return [el.get_strength() for el in self._elements[0:n]]
+
+    def replace_weakest(self, subjects, strengths=None):
+        """
+        Replace the weakest subjects of the population with the provided subjects (for example, subjects which
+        migrate from another population). Unless their strengths are provided, the new subjects have no strength
+        until the population is evaluated again, which happens in the first generation of the next call to evolve.
+
+        :param subjects: a sequence of subjects, no longer than the population
+        :param strengths: optional. the strengths of the subjects, when already known (such as the strengths of
+                          migrants, computed by the population they came from). The population is then ranked
+                          again, so evolution can continue (see evolve_more)
+        """
+        n = len(subjects)
+        if n == 0:
+            return
+        if n > self._population_size():
+            raise ValueError("Cannot replace more subjects than the population size")
+        if strengths is not None and len(strengths) != n:
+            raise ValueError("Strengths must be provided for all subjects")
+        if self._ranked_num < self._population_size():
+            self._rank_top(self._population_size())
+        if self._population is not None:
+            self._population.replace_last(subjects)
+            if strengths is not None:
+                self._population.get_strengths()[-n:] = strengths
         else:
-            [el.get_genes() for el in self._elements[0:n]]
+            self._elements[-n:] = [Element(subject) for subject in subjects]
+            if strengths is not None:
+                for el, s in zip(self._elements[-n:], strengths):
+                    el.set_strength_value(s)
+        if strengths is not None:
+            self._normalize()
 
-    def _handle_duplicates(self):
+    def _handle_duplicates(self, survivors_num=0):
         """
-        This function applies the duplication policy onto the population.
+        This function applies the duplication policy onto the population. Subjects are identified by a canonical
+        key of their genes - their packed binary representation, which each Element computes once and keeps - and
+        a genome index of these keys is built while scanning the population once. Survivors of the previous
+        generation are indexed first, and each new subject which is a duplicate of an indexed subject, or whose
+        genome was already explored (when the archive is enabled), is rejected. With the 'replace' policy, rejected
+        subjects are replaced by new offspring, which are checked against the index as they are born.
+
+        :param survivors_num: the number of subjects at the beginning of the population which survived from the
+                              previous generation
         """
-        if self._duplication_policy == 'kill':
-            self._elements = list(set(self._elements))
-        elif self._duplication_policy == 'replace':
+        if self._population is not None:
+            self._handle_array_duplicates(survivors_num)
+            return
+        if self._duplication_policy == 'ignore':
+            return
+        codec = self._codec
+        genomes_archive = self._archive
+        elements = self._elements
+        el_num = len(elements)
+        index = set()
+        explored = list()
+        # kept subjects are moved in place to the beginning of the population
+        kept_num = 0
+        for i, el in enumerate(elements):
+            key = el.get_packed(codec)
+            if key in index:
+                continue
+            if genomes_archive is not None and i >= survivors_num and key in genomes_archive:
+                explored.append((key, el))
+                continue
+            index.add(key)
+            elements[kept_num] = el
+            kept_num += 1
+        del elements[kept_num:]
+        for key, el in self._restored_explored(explored, kept_num):
+            index.add(key)
+            elements.append(el)
+        missing = el_num - len(elements)
+        self._count('duplicates_removed', missing)
+        if self._duplication_policy == 'replace':
             for _ in range(0,self._duplication_replace_attempts):
-                n = len(self._elements)
-                self._elements = list(set(self._elements))
-                missing = n - len(self._elements)
                 if missing == 0:
                     break
+                self._count('replace_rounds')
+                for el in self._breed(math.ceil(missing/2)):
+                    key = el.get_packed(codec)
+                    if missing > 0 and key not in index and (genomes_archive is None or key not in genomes_archive):
+                        index.add(key)
+                        elements.append(el)
+                        missing -= 1
+
+    def _handle_array_duplicates(self, survivors_num=0):
+        """
+        This function applies the duplication policy onto the population, when using the 'numpy' backend. Duplicates
+        are found with a single vectorized pass over the entire population, while offspring bred to replace them are
+        checked against a genome index as they are born.
+
+        :param survivors_num: the number of subjects at the beginning of the population which survived from the
+                              previous generation
+        """
+        if self._duplication_policy == 'ignore':
+            return
+        population = self._population
+        genomes_archive = self._archive
+        n = len(population)
+        rows = population.unique_rows()
+        if genomes_archive is not None:
+            keys = population.row_keys()
+            unexplored = list()
+            explored = list()
+            for r in rows:
+                (unexplored if r < survivors_num or keys[r] not in genomes_archive else explored).append(r)
+            rows = sorted(unexplored + self._restored_explored(explored, len(unexplored)))
+        population.keep(rows)
+        missing = n - len(population)
+        self._count('duplicates_removed', missing)
+        if self._duplication_policy == 'replace':
+            index = set(population.row_keys())
+            for _ in range(0,self._duplication_replace_attempts):
+                if missing == 0:
+                    break
+                self._count('replace_rounds')
+                children = self._breed(math.ceil(missing/2))
+                accepted = list()
+                for r, key in enumerate(population.row_keys(children)):
+                    if missing > 0 and key not in index and (genomes_archive is None or key not in genomes_archive):
+                        index.add(key)
+                        accepted.append(r)
+                        missing -= 1
+                population.extend(children[accepted])
+
+    def _restored_explored(self, explored, kept_num):
+        """
+        Choose which of the subjects rejected for having an already explored genome are kept after all. The archive
+        never leaves less than two subjects, so the population can still reproduce.
+
+        :param explored: the subjects rejected by the archive, in their order in the population
+        :param kept_num: the number of subjects kept by the duplication policy
+        :return: the first subjects of explored, which are kept
+        """
+        restored = explored[0:max(0, self._min_population_size - kept_num)]
+        self._count('archive_hits', len(explored) - len(restored))
+        return restored
+
+    def _archive_population(self):
+        """
+        Add the genomes of the entire population, which was just evaluated, to the archive.
+        """
+        if self._population is not None:
+            keys = self._population.row_keys()
+        else:
+            keys = [el.get_packed(self._codec) for el in self._elements]
+        for key in keys:
+            self._archive.add(key)
+
+    def _diversity_tracker(self):
+        """
+        Create a new DiversityTracker for the population
+        """
+        layout = self._codec.layout(self._genome_length())
+        if self._population is not None:
+            from pycharles.array_population import ArrayDiversityTracker
+            return ArrayDiversityTracker(layout.sizes)
+        return diversity.DiversityTracker(layout.sizes, diversity.packed_indices(layout))
+
+    def _update_diversity(self):
+        """
+        Update the diversity tracker with the genomes of the population, which was just evaluated.
+
+        :return: the diversity record of the current generation
+        """
+        if self._population is not None:
+            keys = self._population.row_keys()
+        else:
+            keys = [el.get_packed(self._codec) for el in self._elements]
+        return self._diversity.update(keys, self._current_generation)
+
+    def _restart(self):
+        """
+        Restart the evolution of a converged population: the elitists (and at least the strongest subject) survive,
+        while the rest of the population is replaced with new random subjects, which are evaluated next.
+        """
+        n = self._population_size()
+        survivors_num = max(1, round(self._elitism_ratio * n))
+        pools = self._codec.layout(self._genome_length()).pools
+        rng = self._random
+        self.replace_weakest([[pool[random_util.random_below(len(pool), rng)] for pool in pools]
+                              for _ in range(survivors_num, n)])
+        self._count('restarts')
+
+    def _steady_state_bookkeeping(self):
+        """
+        Create the steady-state bookkeeping of the current population (see SteadyState). The genomes of the population
+        are indexed only when the duplication policy requires it.
+        """
+        keys = None
+        if self._population is not None:
+            strengths = self._population.get_strengths().tolist()
+            if self._duplication_policy != 'ignore':
+                keys = self._population.row_keys()
+        else:
+            strengths = [el.get_strength() for el in self._elements]
+            if self._duplication_policy != 'ignore':
+                keys = [el.get_packed(self._codec) for el in self._elements]
+        return SteadyState(strengths, self._selection_method, self._selection_parameter, self._random, keys)
+
+    def _breed_steady_state(self):
+        """
+        Breed and mutate the children of a single steady-state step, using the selection table of the steady-state
+        bookkeeping.
+
+        :return: a tuple of (children, keys), where children is a list of Elements, or a matrix of gene indices when
+                 using the 'numpy' backend, and keys are their canonical keys
+        """
+        children_num = self._steady_state
+        couples_num = math.ceil(children_num / 2)
+        if self._population is not None:
+            population = self._population
+            couples = self._steady.get_table().select_couples(couples_num)
+            fathers = [f for f, _ in couples]
+            mothers = [m for _, m in couples]
+            children = self._timed('breeding', population.breed_couples, population.get_genes(), fathers, mothers,
+                                   self._offspring_function, self._batch_offspring_function)[0:children_num]
+            self._timed('mutation', population.mutate, children, self._mutations_odds)
+            return children, population.row_keys(children)
+        # the elements of the population are the selection pool of _breed
+        self._selection_table = self._steady.get_table()
+        self._selection_pool = self._elements
+        children = self._timed('breeding', self._breed, couples_num)
+        self._free_elements.extend(children[children_num:])
+        del children[children_num:]
+        self._timed('mutation', mutation.mutate_elements, children, self._mutations_odds, self._codec, 0,
+                    self._random)
+        return children, [el.get_packed(self._codec) for el in children]
+
+    def _steady_state_step(self):
+        """
+        A single step of steady-state evolution. A few children are bred out of the current population, and only
+        they are evaluated: like _rank, this generator yields the subjects which require evaluation. Each child then
+        replaces the weakest subject of the population, if it is at least as strong. The strongest subject is always
+        kept first, while the order of the rest of the population is arbitrary.
+
+        :return: False if the population perished, True otherwise
+        """
+        if self._steady is None:
+            self._steady = self._timed('ranking', self._steady_state_bookkeeping)
+        steady = self._steady
+        if steady.get_alive_num() < 2:
+            self._count('misfits_killed', len(steady) - steady.get_alive_num())
+            self._kill_misfits()
+            return False
+        children, keys = self._breed_steady_state()
+        genomes_archive = self._archive
+        if self._duplication_policy != 'ignore':
+            # children which duplicate a subject of the population or another child, or were already explored
+            index = set()
+            accepted = list()
+            for i, key in enumerate(keys):
+                if key not in steady and key not in index and (genomes_archive is None or key not in genomes_archive):
+                    index.add(key)
+                    accepted.append(i)
+                elif self._population is None:
+                    self._free_elements.append(children[i])
+            self._count('duplicates_removed', len(keys) - len(accepted))
+        else:
+            accepted = list(range(0, len(keys)))
+        # evaluation, using the fitness cache when enabled
+        cache = self._fitness_cache
+        hits = cache.get_hits() if cache is not None else 0
+        strengths = dict()
+        pending = list()
+        for i in accepted:
+            s = cache.get(keys[i]) if cache is not None else None
+            if s is None:
+                pending.append(i)
+            else:
+                strengths[i] = s
+        indices = self._strength_input == 'indices'
+        if self._population is not None:
+            subjects = children[pending] if indices else self._population.decode(children[pending])
+        else:
+            subjects = [children[i].get_genes() for i in pending]
+            if indices:
+                subjects = self._codec.to_indices_batch(subjects)
+        for i, s in zip(pending, (yield from self._evaluation(subjects, hits))):
+            strengths[i] = s
+            if cache is not None:
+                cache.put(keys[i], s)
+        if genomes_archive is not None and self._duplication_policy != 'ignore':
+            for i in pending:
+                genomes_archive.add(keys[i])
+        self._timed('ranking', self._insert_children, children, keys, accepted, strengths)
+        return True
+
+    def _insert_children(self, children, keys, accepted, strengths):
+        """
+        Insert evaluated steady-state children into the population, each replacing the weakest subject if it is at
+        least as strong. Children with strength 0 are discarded.
+        """
+        steady = self._steady
+        replaced = 0
+        for i in accepted:
+            s = strengths[i]
+            slot = steady.weakest()
+            if s <= 0.0 or s < steady.get_strength(slot):
+                if self._population is None:
+                    self._free_elements.append(children[i])
+                continue
+            if self._population is not None:
+                self._population.replace_row(slot, children[i], s)
+            else:
+                children[i].set_strength_value(s)
+                self._free_elements.append(self._elements[slot])
+                self._elements[slot] = children[i]
+            steady.set(slot, s, keys[i])
+            replaced += 1
+            if slot != 0 and s > steady.get_strength(0):
+                if self._population is not None:
+                    self._population.swap_rows(0, slot)
                 else:
-                    number_of_couples = math.ceil(missing/2)
-                    new_elements = self._breed(number_of_couples)
-                    if missing % 2 > 0:
-                        del new_elements[0]
-                    self._elements += new_elements
+                    self._elements[0], self._elements[slot] = self._elements[slot], self._elements[0]
+                steady.swap(0, slot)
+        self._count('replacements', replaced)
+        self._ranked_num = 1
+
+    def _new_element(self, genes=None, packed=None, genome_length=None):
+        """
+        Create a new Element, from either its genes or its packed binary representation. Elements of previous
+        generations which are no longer part of the population are reused when available, rather than allocating
+        new ones.
+        """
+        if not self._free_elements:
+            return Element(genes, packed, self._codec, genome_length)
+        el = self._free_elements.pop()
+        if genes is not None:
+            el.set_genes(genes)
         else:
-            pass
+            el.set_packed(packed, self._codec, genome_length)
+        return el
 
-    def _breed(self, number_of_couples):
+    def _breed(self, number_of_couples, children=None, mutation_odds=None):
         """
         This function is responsible for creating a pair of new Elements based on the number of pairs
         requested. The model's offspringFunction is used for the creation of new Elements.
 
         :param number_of_couples: the number of pairs of new Elements to create
-        :return: a sequence of the new Elements created
+        :param children: optional, 'list' backend only. a list to which the new Elements are appended, instead of
+                         a new list
+        :param mutation_odds: optional, 'numpy' backend only. when defined, the new subjects are also mutated
+        :return: a sequence of the new Elements created, or a matrix of gene indices when using the 'numpy' backend
         """
-        elements = list()
-        for _ in range(0,number_of_couples):
-            father = self._select_element()
-            mother = self._select_element(ignore_this_element=father)
+        if self._population is not None:
+            return self._population.breed(number_of_couples, self._selection_method, self._offspring_function,
+                                          self._batch_offspring_function, self._selection_parameter, mutation_odds,
+                                          self._breeder)
+        if self._selection_table is None:
+            self._build_selection_table()
+        pool = self._selection_pool
+        elements = list() if children is None else children
+        if self._packed_offspring_function is not None and pool:
+            # built-in offspring functions work on the packed genes, and the children are decoded only when required
+            codec = self._codec
+            rng = self._random
+            genome_length = pool[0].get_genome_length()
+            bits_num = codec.layout(genome_length).bits_num
+            for f, m in self._selection_table.select_couples(number_of_couples):
+                child1, child2 = self._packed_offspring_function(pool[f].get_packed(codec),
+                                                                 pool[m].get_packed(codec), bits_num, rng)
+                elements.append(self._new_element(packed=codec.normalize(child1, genome_length),
+                                                  genome_length=genome_length))
+                elements.append(self._new_element(packed=codec.normalize(child2, genome_length),
+                                                  genome_length=genome_length))
+            return elements
+        for f, m in self._selection_table.select_couples(number_of_couples):
+            father = pool[f]
+            mother = pool[m]
             child1genes, child2genes = self._offspring_function(father.get_genes(),mother.get_genes())
-            elements.append(Element(child1genes))
-            elements.append(Element(child2genes))
+            elements.append(self._new_element(child1genes))
+            elements.append(self._new_element(child2genes))
         return elements
 
+    def _next_generation(self):
+        """
+        This function replaces the population with the next generation: the elitists of the current population
+        survive, while the rest of the population is made of their offspring. Mutations and the duplication policy
+        are then applied.
+
+        The current population is the selection pool of the next generation, so it is left untouched until the next
+        generation is complete: misfits are killed by leaving them out of the next generation. Afterwards, the
+        Elements of the current population which did not survive are reused for the offspring of later generations.
+
+        :return: False if the population perished, True otherwise
+        """
+        el_num = self._population_size()
+        alive_num = self._alive_num()
+        self._count('misfits_killed', el_num - alive_num)
+        if alive_num < 2:
+            self._kill_misfits()
+            return False
+        elitism_num = round(self._elitism_ratio * el_num)
+        remaining_couples_num = round((el_num-elitism_num)/2)
+        if self._population is not None:
+            if self._breeder is not None or self._backend == 'mmap':
+                # the offspring are mutated as they are bred, by the breeding workers or one chunk at a time
+                new_born = self._timed('breeding', self._breed, remaining_couples_num, None,
+                                       self._mutations_odds)[0:el_num-elitism_num]
+                survivors_num = self._population.next_generation(elitism_num, new_born)
+                mutants = self._population.get_genes()[0:survivors_num if self._mutate_elitists else 0]
+            else:
+                new_born = self._timed('breeding', self._breed, remaining_couples_num)[0:el_num-elitism_num]
+                survivors_num = self._population.next_generation(elitism_num, new_born)
+                if self._mutate_elitists:
+                    mutants = self._population.get_genes()
+                else:
+                    mutants = self._population.get_genes()[survivors_num:]
+            self._timed('mutation', self._population.mutate, mutants, self._mutations_odds)
+            self._timed('duplicates', self._handle_duplicates, survivors_num)
+            return True
+        elements = self._elements
+        population = [el for el in itertools.islice(elements, 0, elitism_num) if el.get_strength() > 0.0]
+        survivors_num = len(population)
+        self._timed('breeding', self._breed, remaining_couples_num, population)
+        size = survivors_num + el_num - elitism_num
+        self._free_elements.extend(population[size:])
+        del population[size:]
+        self._timed('mutation', mutation.mutate_elements, population, self._mutations_odds, self._codec,
+                    0 if self._mutate_elitists else survivors_num, self._random)
+        self._elements = population
+        self._timed('duplicates', self._handle_duplicates, survivors_num)
+        self._free_elements.extend(itertools.islice(elements, elitism_num, None))
+        self._free_elements.extend(el for el in itertools.islice(elements, 0, elitism_num)
+                                   if el.get_strength() <= 0.0)
+        self._selection_table = None
+        self._selection_pool = list()
+        return True
+
+    def _alive_num(self):
+        """
+        Returns the number of subjects of the population whose strength is not 0
+        """
+        if self._population is not None:
+            return int((self._population.get_strengths() > 0.0).sum())
+        return sum(1 for el in self._elements if el.get_strength() > 0.0)
+
+    def _evaluate(self, subjects):
+        """
+        This function computes the strengths of a batch of subjects, using the model's strength function. A
+        strength function of a single subject is adapted to a batch function.
+
+        :param subjects: a sequence of subjects, or of their gene indices (see strength_input)
+        :return: a list of strengths, one per subject
+        """
+        if self._batch_strength:
+            batch_strength_function = self._strength_function
+        else:
+            batch_strength_function = strength.batched(self._strength_function)
+        return strength.evaluate(batch_strength_function, subjects, self._running_executor, self._chunk_size,
+                                 self._executor_workers or os.cpu_count() or 1)
+
+    def _set_strengths(self):
+        """
+        This generator computes the strength of each subject of the population. All subjects which require evaluation
+        are yielded as a single batch (one batch per chunk of the population with the 'mmap' backend), and their
+        strengths are expected to be sent back. When the fitness cache is enabled, cached strengths are used and only
+        distinct subjects which are not in the cache are yielded.
+        """
+        indices = self._strength_input == 'indices'
+        hits = self._fitness_cache.get_hits() if self._fitness_cache is not None else 0
+        if self._population is not None:
+            for rows in self._population.evaluation_chunks():
+                subjects, pending = self._population.strengths_to_evaluate(self._fitness_cache, indices, rows)
+                strengths = yield from self._evaluation(subjects, hits)
+                self._population.set_strengths(strengths, pending, self._fitness_cache, rows)
+                hits = self._fitness_cache.get_hits() if self._fitness_cache is not None else 0
+            return
+        cache = self._fitness_cache
+        if cache is None:
+            pending = [[el] for el in self._elements]
+            keys = None
+        else:
+            groups = dict()
+            for el in self._elements:
+                key = el.get_packed(self._codec)
+                s = cache.get(key)
+                if s is None:
+                    groups.setdefault(key, list()).append(el)
+                else:
+                    el.set_strength_value(s)
+            pending = list(groups.values())
+            keys = list(groups.keys())
+        if not pending:
+            yield from self._evaluation(list(), hits)
+            return
+        subjects = [elements[0].get_genes() for elements in pending]
+        if indices:
+            subjects = self._codec.to_indices_batch(subjects)
+        strengths = yield from self._evaluation(subjects, hits)
+        for i, (elements, s) in enumerate(zip(pending, strengths)):
+            if keys is not None:
+                cache.put(keys[i], s)
+            for el in elements:
+                el.set_strength_value(s)
+
+    def _evaluation(self, subjects, cache_hits):
+        """
+        This generator yields a batch of subjects for evaluation and returns their strengths. When stats collection
+        is enabled, the evaluation is timed and counted, along with the hits of the fitness cache since cache_hits.
+        """
+        if self._stats is not None and self._fitness_cache is not None:
+            self._stats.count('cache_hits', self._fitness_cache.get_hits() - cache_hits)
+        if len(subjects) == 0:
+            return list()
+        if self._time_budget is None and self._evaluation_budget is None:
+            return (yield from self._evaluate_batch(subjects))
+        # the budget is checked between chunks, and the strongest subject of each chunk is tracked right away
+        n = len(subjects)
+        if self._chunk_size is not None:
+            chunk_size = self._chunk_size
+        elif self._batch_strength:
+            # a batch strength function is still called once per batch, so the budget is checked per batch
+            chunk_size = n
+        else:
+            chunk_size = max(1, math.ceil(n / self._budget_checks))
+        strengths = list()
+        start = 0
+        while start < n:
+            size = chunk_size
+            if self._evaluation_budget is not None:
+                size = min(size, self._evaluation_budget - self._evaluations_num)
+            if size <= 0 or self._budget_exhausted():
+                raise _BudgetExhausted()
+            chunk = subjects[start:start + size]
+            chunk_strengths = yield from self._evaluate_batch(chunk)
+            self._track_best_so_far(chunk, chunk_strengths)
+            strengths.extend(chunk_strengths)
+            start += size
+        return strengths
+
+    def _evaluate_batch(self, subjects):
+        """
+        This generator yields a non-empty batch of subjects for evaluation and returns their strengths, timing and
+        counting the evaluation when stats collection is enabled.
+        """
+        self._evaluations_num += len(subjects)
+        if self._stats is None:
+            return (yield subjects)
+        start = time.perf_counter()
+        strengths = yield subjects
+        self._stats.add_time('evaluation', time.perf_counter() - start)
+        self._stats.count('evaluations', len(subjects))
+        return strengths
+
+    def _track_best_so_far(self, subjects, strengths):
+        """
+        Record the strongest of a batch of evaluated subjects, if it is the strongest subject found so far.
+        """
+        best = max(range(0, len(strengths)), key=strengths.__getitem__)
+        if self._best_so_far is not None and strengths[best] <= self._best_so_far[1]:
+            return
+        subject = subjects[best]
+        if self._strength_input == 'indices':
+            subject = self._codec.from_indices(list(subject) if self._population is None else subject.tolist())
+        self._best_so_far = (list(subject), float(strengths[best]))
+
+    def _budget_exhausted(self):
+        if self._evaluation_budget is not None and self._evaluations_num >= self._evaluation_budget:
+            return True
+        return self._time_budget is not None and time.perf_counter() >= self._deadline
+
+    def _restore_best_so_far(self, evaluated):
+        """
+        Bring the population back to a consistent state after a generation was interrupted: the strongest subject
+        found so far is put back into the population (replacing the weakest subject) as its first subject, unless the
+        population already holds a subject as strong.
+
+        :param evaluated: Boolean. whether the strengths of the population are still valid (such as when a
+                          steady-state step was interrupted). When False, the strengths are unknown and are reset to
+                          zero, so the population will be evaluated again by the next evolution
+        """
+        if not evaluated:
+            if self._population is not None:
+                self._population.reset_strengths()
+            else:
+                for el in self._elements:
+                    el.set_strength_value(0.0)
+        if self._best_so_far is None:
+            self._rank_top(1)
+            return
+        subject, best_strength = self._best_so_far
+        self._rank_top(1)
+        if evaluated and self._best_strength() >= best_strength:
+            return
+        self.replace_weakest([subject])
+        if self._population is not None:
+            self._population.get_strengths()[-1] = best_strength
+        else:
+            self._elements[-1].set_strength_value(best_strength)
+        self._rank_top(1)
+
+    def _rank(self):
+        """
+        This generator computes the strength and survival-probability of each subject of the population, sorts the
+        population by a decreasing order of strength and builds the selection table of the next generation. Subjects
+        which require evaluation are yielded (see _set_strengths).
+        """
+        yield from self._set_strengths()
+        if self._archive is not None and self._duplication_policy != 'ignore':
+            self._archive_population()
+        self._normalize()
+
+    def _normalize(self):
+        """
+        This function computes the survival-probability of each subject of the population, sorts the population by a
+        decreasing order of strength and builds the selection table of the next generation.
+        """
+        self._timed('ranking', self._sort)
+        self._timed('selection', self._build_selection_table)
+
+    def _sort(self):
+        """
+        Fitness-proportional selection methods require the survival-probability of each subject, and the entire
+        population is sorted. Other selection methods work directly on the strengths, so only the elitists (and at
+        least the strongest subject) are ranked, and moved to the beginning of the population.
+        """
+        n = self._population_size()
+        if self._selection_method in selection.proportional_methods:
+            if self._population is not None:
+                self._population.strength_to_probability()
+            else:
+                total_strength = sum([el.get_strength() for el in self._elements])
+                for el in self._elements:
+                    el.strength_to_probability(total_strength)
+            self._rank_top(n)
+        else:
+            self._rank_top(max(1, round(self._elitism_ratio * n)))
+
+    def _rank_top(self, top):
+        """
+        Move the top strongest subjects to the beginning of the population, by a decreasing order of strength. The
+        order of the rest of the population is arbitrary, unless the entire population is ranked.
+
+        :param top: the number of subjects to rank
+        """
+        n = self._population_size()
+        # the slots of the steady-state bookkeeping are the positions of the subjects
+        self._steady = None
+        if self._population is not None:
+            self._population.sort(top if top < n else None)
+        else:
+            elements = self._elements
+            if top >= n:
+                elements.sort(reverse=True)
+            else:
+                first = heapq.nlargest(top, range(0, n), key=lambda i: elements[i].get_strength())
+                ranked = set(first)
+                strongest = [elements[i] for i in first]
+                # the unranked subjects at the beginning of the population take the places of the ranked ones
+                displaced = [elements[i] for i in range(0, top) if i not in ranked]
+                for i, el in zip([i for i in first if i >= top], displaced):
+                    elements[i] = el
+                elements[0:top] = strongest
+            if self._selection_pool is elements:
+                self._selection_table = None
+        self._ranked_num = min(top, n)
+
+    def _start_executor(self):
+        if self._executor == 'thread':
+            self._running_executor = ThreadPoolExecutor(max_workers=self._executor_workers)
+        elif self._executor == 'process':
+            self._running_executor = ProcessPoolExecutor(max_workers=self._executor_workers)
+        else:
+            self._running_executor = self._executor
+
+    def _shutdown_executor(self):
+        if self._running_executor is not None and self._running_executor is not self._executor:
+            self._running_executor.shutdown(wait=True, cancel_futures=True)
+        self._running_executor = None
+
+    def _close_breeder(self):
+        # releases the breeder's worker processes and shared memory until the next evolution
+        if self._breeder is not None:
+            self._breeder.close()
+
     def evolve(self):
         """
         The model's main procedure. This starts the evolution of the subjects of the population
         for the specified amount of generations. This includes reproduction, elitists survival
         and mutation.
+
+        :return: the strongest subject found and its strength, see get_best_so_far. When a budget is set, this may
+                 be a subject found in the middle of an interrupted generation
         """
-        highest_strength = 0
-        last_round_updated_highest_strength = 0
+        for _ in self._run(snapshots=False):
+            pass
+        return self.get_best_so_far()
+
+    def evolve_more(self, generations):
+        """
+        Continue the last evolution for additional generations, rather than starting over from the first generation.
+        The population and its strengths, the generation count, the early-stop bookkeeping and the budgets (the
+        deadline and the number of evaluations so far) all carry on, so no subject is evaluated again. This is how
+        islands evolve between migrations.
+
+        :param generations: a positive integer. the number of additional generations
+        :return: see evolve
+        """
+        self.set_generations(self._current_generation + generations)
+        self._resume = True
+        self._continue = True
+        return self.evolve()
+
+    def evolve_iter(self):
+        """
+        A generator variant of evolve, which yields a GenerationSnapshot at the end of each generation. This allows
+        streaming the progress of the evolution without verbose mode. Breaking out of the loop stops the evolution,
+        in which case the end reason is set to 'Stopped by caller'.
+
+        Example:
+        >>> for snapshot in model.evolve_iter():
+        ...     if snapshot.best_strength > 100:
+        ...         break
+
+        :return: a generator of GenerationSnapshots
+        """
+        return self._run(snapshots=True)
+
+    def _run(self, snapshots):
+        """
+        Run the evolution loop, evaluating the subjects it requires using the model's strength function and
+        executor.
+
+        :param snapshots: Boolean. whether to yield a GenerationSnapshot at the end of each generation
+        """
+        self._start_executor()
+        evolution = self._evolution(snapshots)
+        try:
+            strengths = None
+            while True:
+                try:
+                    item = evolution.send(strengths)
+                except StopIteration:
+                    break
+                if isinstance(item, GenerationSnapshot):
+                    strengths = None
+                    yield item
+                else:
+                    strengths = self._evaluate(item)
+        except GeneratorExit:
+            if self._end_reason == self._default_end_reason:
+                self._end_reason = (4, 'Stopped by caller')
+            raise
+        finally:
+            evolution.close()
+            self._shutdown_executor()
+            self._close_breeder()
+
+    async def evolve_async(self, concurrency=None, timeout=None, timeout_strength=None):
+        """
+        An asyncio variant of evolve, for strength functions which spend most of their time waiting (on a
+        scoring service, a simulator, a database). The strength function may be a coroutine function, in which case
+        all the subjects of a generation are evaluated concurrently. Synchronous strength functions are also
+        supported, and are called directly. The model's executor is not used.
+
+        :param concurrency: None or a positive integer. The maximal number of evaluations awaited at once. When None,
+                            all the subjects of a generation are evaluated at once
+        :param timeout: None or a positive number. The maximal number of seconds a single evaluation (or a single
+                        batch, when batch_strength is set) may take
+        :param timeout_strength: None or a non-negative number. The strength of subjects whose evaluation timed out.
+                                 When None, a timed-out evaluation raises asyncio.TimeoutError
+        :return: the strongest subject found and its strength, see get_best_so_far
+        """
+        evolution = self._evolution(snapshots=False)
+        strengths = None
+        try:
+            while True:
+                try:
+                    subjects = evolution.send(strengths)
+                except StopIteration:
+                    break
+                strengths = await strength.evaluate_async(self._strength_function, subjects, self._batch_strength,
+                                                          concurrency, timeout, timeout_strength)
+        finally:
+            evolution.close()
+            self._close_breeder()
+        return self.get_best_so_far()
+
+    def _mean_strength(self):
+        if self._population is not None:
+            return float(self._population.get_strengths().mean())
+        return sum([el.get_strength() for el in self._elements]) / len(self._elements)
+
+    def _evolution(self, snapshots=False):
+        """
+        The evolution loop itself. This generator yields batches of subjects which require evaluation, and expects
+        their strengths to be sent back, so the same loop serves evolve, evolve_iter and evolve_async.
+
+        :param snapshots: Boolean. whether to also yield a GenerationSnapshot at the end of each generation
+        """
+        start_time = time.perf_counter()
+        if self._stats is not None:
+            self._stats.clear()
+        continued = self._continue
+        if continued:
+            # the budgets, like the rest of the bookkeeping, carry on from the last run (see evolve_more)
+            first_generation = self._current_generation + 1
+            self._resume = False
+            self._continue = False
+        else:
+            self._deadline = start_time + self._time_budget if self._time_budget is not None else None
+            self._evaluations_num = 0
+            if self._resume:
+                first_generation = self._current_generation + 1
+                self._resume = False
+                self._best_so_far = (list(self.get_best()), float(self._best_strength())) \
+                    if self._population_size() else None
+            else:
+                first_generation = 0
+                self._highest_strength = 0
+                self._last_improvement_generation = 0
+                self._best_so_far = None
         self._end_reason = self._default_end_reason
-        for g in range(0,self._generations+1):
+        if not continued or self._diversity is None:
+            self._diversity = self._diversity_tracker() if self._track_diversity else None
+        self._steady = None
+        restart = False
+        for g in range(first_generation,self._generations+1):
+            if self._budget_exhausted():
+                self._end_reason = (6, 'Budget exhausted')
+                break
             self._print('Evolving - starting generation: {0}, population size: {1}, best solution so far: {2}'
-                        .format(g, len(self._elements), self.get_best()))
+                        .format(g, self._population_size(), self.get_best()))
             self._current_generation = g
-            if g > 0:
-                el_num = len(self._elements)
-                self._kill_misfits()
-                if len(self._elements) < 2:
-                    self._end_reason = (2, 'Population perished')
-                    break
-                elitism_num = round(self._elitism_ratio * el_num)
-                elitists = self._elements[0:elitism_num]
-                remaining_couples_num = round((el_num-elitism_num)/2)
-                new_born = self._breed(remaining_couples_num)[0:el_num-elitism_num]
-                if self._mutate_elitists:
-                    self._elements = elitists + new_born
-                    for el in self._elements:
-                        el.mutate(self._mutations_odds, self._all_values)
+            if self._stats is not None:
+                self._stats.start_generation(g)
+            steady_step = g > 0 and not restart and self._steady_state is not None
+            try:
+                if g > 0 and restart:
+                    self._timed('restart', self._restart)
+                    restart = False
+                    yield from self._rank()
+                elif steady_step:
+                    if not (yield from self._steady_state_step()):
+                        self._end_reason = (2, 'Population perished')
+                        break
                 else:
-                    for el in new_born:
-                        el.mutate(self._mutations_odds,self._all_values)
-                    self._elements = elitists + new_born
-                self._handle_duplicates()
-            for el in self._elements:
-                el.set_strength(self._strength_function)
-            total_strength = sum([el.get_strength() for el in self._elements])
-            for el in self._elements:
-                el.strength_to_probability(total_strength)
-            self._elements.sort(reverse=True)
-            if math.isinf(self._elements[0].get_strength()):
-                self._end_reason = (1, 'Ideal solution found')
+                    if g > 0 and not self._next_generation():
+                        self._end_reason = (2, 'Population perished')
+                        break
+                    yield from self._rank()
+            except _BudgetExhausted:
+                self._restore_best_so_far(evaluated=steady_step)
+                self._end_reason = (6, 'Budget exhausted')
                 break
-            if self._elements[0].get_strength() > highest_strength:
-                highest_strength = self._elements[0].get_strength()
-                last_round_updated_highest_strength = g
-            if self._early_stop is not None:
-                if g - last_round_updated_highest_strength >= self._early_stop:
+            best_strength = self._best_strength()
+            if self._best_so_far is None or best_strength > self._best_so_far[1]:
+                self._best_so_far = (list(self.get_best()), float(best_strength))
+            if math.isinf(best_strength):
+                self._end_reason = (1, 'Ideal solution found')
+            if best_strength > self._highest_strength:
+                self._highest_strength = best_strength
+                self._last_improvement_generation = g
+            if self._early_stop is not None and self._end_reason == self._default_end_reason:
+                if g - self._last_improvement_generation >= self._early_stop:
                     self._end_reason = (3, 'Early stop')
-                    break
+            if self._diversity is not None:
+                gene_diversity = self._timed('diversity', self._update_diversity)['gene_diversity']
+                if self._convergence_threshold is not None and self._end_reason == self._default_end_reason:
+                    if gene_diversity < self._convergence_threshold:
+                        if self._convergence_action == 'stop':
+                            self._end_reason = (5, 'Population converged')
+                        else:
+                            self._print('Population converged - restarting')
+                            restart = True
+            if self._checkpoint_every is not None and self._checkpoint_path is not None:
+                if g % self._checkpoint_every == 0:
+                    self._timed('checkpoint', self.save_checkpoint, self._checkpoint_path)
+            self._end_generation_stats()
+            if snapshots:
+                yield GenerationSnapshot(g, self.get_best(), best_strength, self._mean_strength(),
+                                         self._population_size(), time.perf_counter() - start_time)
+            if self._end_reason != self._default_end_reason:
+                break
+        self._end_generation_stats()
         if self._end_reason == self._default_end_reason:
             self._end_reason = (0, 'Evolution completed')
         self._print('Evolution stopped: cause: {0} [reason ID: {1}]'
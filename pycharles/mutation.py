@@ -0,0 +1,107 @@
+import bisect
+import math
+import random
+from pycharles import random_util
+from pycharles.codec import as_codec
+
+
+def flipped_bits(bits_num, mutation_odds, rng=random):
+    """
+    Generates the positions of the bits which flip during a mutation, out of a sequence of bits_num bits where
+    each bit flips with probability mutation_odds. Rather than drawing a random number for each bit, the gaps
+    between flipped bits are drawn directly from a geometric distribution (skip sampling), so the cost is
+    proportional to the number of flipped bits.
+
+    :param bits_num: the length of the bits sequence
+    :param mutation_odds: a number in the continuous range [0,1], representing the probability of a bit flipping
+                          its value
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    :return: a generator of increasing bit positions
+    """
+    if mutation_odds <= 0.0:
+        return
+    if mutation_odds >= 1.0:
+        yield from range(0, bits_num)
+        return
+    log_q = math.log(1.0 - mutation_odds)
+    position = -1
+    while True:
+        position += 1 + int(math.log(random_util.positive_random(rng)) / log_q)
+        if position >= bits_num:
+            return
+        yield position
+
+
+def _flip(genes, positions, layout):
+    """
+    Flips the specified bits of the binary representation of genes.
+
+    :param genes: a subject
+    :param positions: a sequence of bit positions in the binary representation of the subject
+    :param layout: the GenomeLayout of the subject
+    :return: a new subject
+    """
+    new_genes = list(genes)
+    widths = layout.widths
+    offsets = layout.offsets
+    for position in positions:
+        i = bisect.bisect_right(offsets, position) - 1
+        gene = layout.lookups[i](new_genes[i]) ^ (1 << (widths[i] - 1 - (position - offsets[i])))
+        new_genes[i] = layout.pools[i][gene % layout.sizes[i]]
+    return new_genes
+
+
+def mutate_genes(genes, mutation_odds, values, rng=random):
+    """
+    Mutate a single subject. Each bit of the binary representation of the subject flips with probability
+    mutation_odds, but only the flipped bits are ever computed.
+
+    :param genes: a subject
+    :param mutation_odds: a number in the continuous range [0,1], representing the probability of a bit flipping
+                          its value
+    :param values: list, dict or GeneCodec. a sequence of all values a subject in the population can have
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    :return: the mutated subject, or the same subject if no bit has flipped
+    """
+    if not genes or mutation_odds <= 0.0:
+        return genes
+    layout = as_codec(values).layout(len(genes))
+    positions = list(flipped_bits(layout.bits_num, mutation_odds, rng))
+    if not positions:
+        return genes
+    return _flip(genes, positions, layout)
+
+
+def mutate_elements(elements, mutation_odds, values, first=0, rng=random):
+    """
+    Mutate a sequence of Elements in a single pass. The binary representations of all Elements are treated as
+    one long sequence of bits, and the positions of the flipped bits are drawn over this entire sequence, so
+    that Elements which do not mutate are never touched. The bits of each mutated Element are flipped at once on
+    its packed binary representation, using a single XOR mask.
+
+    :param elements: a sequence of Elements, all of the same length
+    :param mutation_odds: a number in the continuous range [0,1], representing the probability of a bit flipping
+                          its value
+    :param values: list, dict or GeneCodec. a sequence of all values a subject in the population can have
+    :param first: the index of the first Element of elements to mutate. the Elements before it are left unchanged
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    """
+    if len(elements) <= first or mutation_odds <= 0.0:
+        return
+    codec = as_codec(values)
+    genome_length = elements[first].get_genome_length()
+    layout = codec.layout(genome_length)
+    element_bits = layout.bits_num
+    if element_bits == 0:
+        return
+    flipped = dict()
+    for position in flipped_bits(element_bits * (len(elements) - first), mutation_odds, rng):
+        e, bit = divmod(position, element_bits)
+        flipped.setdefault(e, list()).append(bit)
+    for e, positions in flipped.items():
+        el = elements[first + e]
+        mask = 0
+        for bit in positions:
+            mask |= 1 << (element_bits - 1 - bit)
+        genes = None if layout.exact else {bisect.bisect_right(layout.offsets, bit) - 1 for bit in positions}
+        el.set_packed(codec.normalize(el.get_packed(codec) ^ mask, genome_length, genes), codec, genome_length)
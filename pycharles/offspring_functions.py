@@ -1,9 +1,10 @@
 import random
 from functools import partial
-from pycharles.binary_utils import *
+from pycharles import random_util
+from pycharles.codec import as_codec
 
 
-def slice_and_stitch(subject1, subject2, values):
+def slice_and_stitch(subject1, subject2, values, rng=random):
     """
     This function creates new subjects by taking the two subjects provided, transform then to a binary encoding
     and then randomly selecting a position where they will be sliced. The new subjects are made of the first part
@@ -13,29 +14,48 @@ def slice_and_stitch(subject1, subject2, values):
 
     :param subject1: one subject of the population
     :param subject2: another subject of the population
-    :param values: list or dict. a sequence of all values a subject in the population can have
+    :param values: list, dict or GeneCodec. a sequence of all values a subject in the population can have
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
     :return: a tuple of two new subjects
     """
-    bits1 = seq_to_binary_string(subject1, values)
-    bits2 = seq_to_binary_string(subject2, values)
+    codec = as_codec(values)
+    bits1 = codec.encode(subject1)
+    bits2 = codec.encode(subject2)
     max_length = len(bits1)
-    r = random.randint(0, max_length)
+    r = random_util.random_below(max_length + 1, rng)
     new_bits1 = bits1[0:r] + bits2[r:max_length]
     new_bits2 = bits2[0:r] + bits1[r:max_length]
-    return binary_string_to_seq(new_bits1,values), binary_string_to_seq(new_bits2,values)
+    return codec.decode(new_bits1, len(subject1)), codec.decode(new_bits2, len(subject2))
 
 
-def slice_and_stitch_func(values):
+def slice_and_stitch_packed(packed1, packed2, bits_num, rng=random):
+    """
+    The equivalent of slice_and_stitch on packed binary representations (see GeneCodec.pack), where slicing and
+    stitching are done with bit masks.
+
+    :param packed1: the packed binary representation of one subject
+    :param packed2: the packed binary representation of another subject
+    :param bits_num: the number of bits of the binary representation of a subject
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    :return: a tuple of the packed binary representations of two new subjects
+    """
+    r = random_util.random_below(bits_num + 1, rng)
+    tail = (1 << (bits_num - r)) - 1
+    return (packed1 & ~tail) | (packed2 & tail), (packed2 & ~tail) | (packed1 & tail)
+
+
+def slice_and_stitch_func(values, rng=random):
     """
     This function creates a partial function of slice_and_stitch to be used by the model.
 
-    :param values: list or dict. a sequence of all values a subject in the population can have
+    :param values: list, dict or GeneCodec. a sequence of all values a subject in the population can have
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
     :return: a partial function f(subject1, subject2) => (new_subject1, new_subject2)
     """
-    return partial(slice_and_stitch, values=values)
+    return partial(slice_and_stitch, values=as_codec(values), rng=rng)
 
 
-def parents_similarity(subject1, subject2, values):
+def parents_similarity(subject1, subject2, values, rng=random):
     """
     This function creates two new subjects by comparing the bits of the binary encoded provided subjects (the
     parents). If both parents have the same bit in a certain location, the offspring have a very high probability
@@ -45,13 +65,14 @@ def parents_similarity(subject1, subject2, values):
 
     :param subject1: one subject of the population
     :param subject2: another subject of the population
-    :param values: list or dict. a sequence of all values a subject in the population can have
+    :param values: list, dict or GeneCodec. a sequence of all values a subject in the population can have
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
     :return: a tuple of two new subjects
     """
     def create_child(bits1, bits2):
         child = ''
         for i in range(0,len(bits1)):
-            r = random.random()
+            r = rng.random()
             if bits1[i] == bits2[i]:
                 take_from_1 = r < 0.9
             else:
@@ -62,18 +83,39 @@ def parents_similarity(subject1, subject2, values):
                 new_bit = bits2[i]
             child += new_bit
         return child
-    bits1 = seq_to_binary_string(subject1, values)
-    bits2 = seq_to_binary_string(subject2, values)
+    codec = as_codec(values)
+    bits1 = codec.encode(subject1)
+    bits2 = codec.encode(subject2)
     new_bits1 = create_child(bits1, bits2)
     new_bits2 = create_child(bits2, bits1)
-    return binary_string_to_seq(new_bits1, values), binary_string_to_seq(new_bits2, values)
+    return codec.decode(new_bits1, len(subject1)), codec.decode(new_bits2, len(subject2))
+
+
+def parents_similarity_packed(packed1, packed2, bits_num, rng=random):
+    """
+    The equivalent of parents_similarity on packed binary representations (see GeneCodec.pack). Bits which are
+    the same in both parents are kept, and the bits where the parents differ are replaced with random bits, so
+    each child is computed with a few bit operations: (packed1 & ~diff) | (random & diff).
+
+    :param packed1: the packed binary representation of one subject
+    :param packed2: the packed binary representation of another subject
+    :param bits_num: the number of bits of the binary representation of a subject
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    :return: a tuple of the packed binary representations of two new subjects
+    """
+    if bits_num == 0:
+        return packed1, packed2
+    diff = packed1 ^ packed2
+    same = packed1 & ~diff
+    return same | (rng.getrandbits(bits_num) & diff), same | (rng.getrandbits(bits_num) & diff)
 
 
-def parents_similarity_func(values):
+def parents_similarity_func(values, rng=random):
     """
     This function creates a partial function of parents_similarity to be used by the model.
 
-    :param values: list or dict. a sequence of all values a subject in the population can have
+    :param values: list, dict or GeneCodec. a sequence of all values a subject in the population can have
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
     :return: a partial function f(subject1, subject2) => (new_subject1, new_subject2)
     """
-    return partial(parents_similarity, values=values)
\ No newline at end of file
+    return partial(parents_similarity, values=as_codec(values), rng=rng)
\ No newline at end of file
@@ -0,0 +1,171 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pycharles.array_population import batch_offspring_functions, mutate_batch
+
+# the shared memory blocks a worker process is attached to, by role
+_attached = dict()
+
+
+def _open(name=None, size=0):
+    """
+    Create a new block of shared memory, or attach to an existing one by name. Blocks are owned by the process
+    which created them, so attached blocks are not tracked (when supported by the Python version).
+    """
+    if name is None:
+        return shared_memory.SharedMemory(create=True, size=max(1, size))
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _attach(role, name, shape):
+    block = _attached.get(role)
+    if block is None or block.name != name:
+        if block is not None:
+            block.close()
+        block = _open(name)
+        _attached[role] = block
+    return np.ndarray(shape, dtype=np.int64, buffer=block.buf)
+
+
+def breed_chunk(parents, children, fathers, mothers, offspring_function, widths, sizes, seed, mutation_odds=None):
+    """
+    Breed a chunk of couples, and optionally mutate their children.
+
+    :param parents: a 2-D integer matrix of gene indices of the parents generation
+    :param children: a 2-D integer matrix with two rows for each couple, to write the children into. The two
+                     children of each couple are adjacent
+    :param fathers: an array of row indices of parents
+    :param mothers: an array of row indices of parents
+    :param offspring_function: the name of a batch offspring function (see batch_offspring_functions)
+    :param widths: the number of bits of each gene
+    :param sizes: the number of possible values of each gene
+    :param seed: the seed of the chunk's pseudo-random number generator (such as a numpy SeedSequence)
+    :param mutation_odds: optional. when defined, the children are mutated (see mutate_batch)
+    """
+    rng = np.random.default_rng(seed)
+    child1, child2 = batch_offspring_functions[offspring_function](parents[fathers], parents[mothers], widths,
+                                                                   sizes, rng)
+    children[0::2] = child1
+    children[1::2] = child2
+    if mutation_odds is not None:
+        mutate_batch(children, mutation_odds, widths, sizes, rng)
+
+
+def _breed_task(task):
+    (parents_name, parents_shape, children_name, children_shape, start, fathers, mothers, offspring_function,
+     widths, sizes, seed, mutation_odds) = task
+    parents = _attach('parents', parents_name, parents_shape)
+    children = _attach('children', children_name, children_shape)
+    breed_chunk(parents, children[2 * start:2 * (start + fathers.shape[0])], fathers, mothers, offspring_function,
+                widths, sizes, seed, mutation_odds)
+
+
+class ParallelBreeder:
+    """
+    Breeds and mutates offspring across worker processes. The parents generation and the children are held in
+    blocks of shared memory, which are reused as long as they are large enough, and which the workers attach to by
+    name: genes are never pickled, and each task is made of the indices of its couples only.
+
+    Couples are split into chunks of a fixed size, and each chunk draws from its own pseudo-random number
+    generator, spawned in the order of the chunks. The children therefore depend on the seed, but not on the
+    number of workers. With a single worker, chunks are bred in the calling process.
+    """
+
+    _workers = 1
+    _chunk_size = 1024
+    _executor = None
+    _blocks = dict()
+    _parents_source = None
+
+    def __init__(self, workers, chunk_size=1024):
+        """
+        Create a new breeder. Worker processes are started when first required.
+
+        :param workers: a positive integer. the number of worker processes
+        :param chunk_size: a positive integer. the number of couples of each task
+        """
+        if workers < 1:
+            raise ValueError("Number of workers must be a positive integer")
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be a positive integer")
+        self._workers = workers
+        self._chunk_size = chunk_size
+        self._blocks = dict()
+
+    def get_workers(self): return self._workers
+
+    def _array(self, role, shape):
+        """
+        Returns a matrix of the requested shape in the shared memory block of a role, replacing the block if it is
+        too small.
+        """
+        size = int(np.prod(shape)) * np.dtype(np.int64).itemsize
+        block = self._blocks.get(role)
+        if block is None or block.size < size:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = _open(size=size)
+            self._blocks[role] = block
+            if role == 'parents':
+                self._parents_source = None
+        return np.ndarray(shape, dtype=np.int64, buffer=block.buf)
+
+    def breed(self, parents, fathers, mothers, offspring_function, widths, sizes, seed_sequence, mutation_odds=None):
+        """
+        Breed couples of parents, and optionally mutate their children.
+
+        :param parents: a 2-D integer matrix of gene indices of the parents generation
+        :param fathers: an array of row indices of parents
+        :param mothers: an array of row indices of parents, the same length as fathers
+        :param offspring_function: the name of a batch offspring function (see batch_offspring_functions)
+        :param widths: the number of bits of each gene
+        :param sizes: the number of possible values of each gene
+        :param seed_sequence: a numpy SeedSequence, which spawns the generators of the chunks
+        :param mutation_odds: optional. when defined, the children are mutated (see mutate_batch)
+        :return: a 2-D integer matrix of the children's gene indices, where the two children of each couple are
+                 adjacent
+        """
+        n = fathers.shape[0]
+        starts = range(0, n, self._chunk_size)
+        seeds = seed_sequence.spawn(len(starts))
+        if self._workers == 1:
+            children = np.empty((2 * n, parents.shape[1]), dtype=np.int64)
+            for start, seed in zip(starts, seeds):
+                end = min(n, start + self._chunk_size)
+                breed_chunk(parents, children[2 * start:2 * end], fathers[start:end], mothers[start:end],
+                            offspring_function, widths, sizes, seed, mutation_odds)
+            return children
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._workers)
+        shared_parents = self._array('parents', parents.shape)
+        # parents are the same for all the breeding of a generation, so they are copied once
+        if self._parents_source is not parents:
+            shared_parents[:] = parents
+            self._parents_source = parents
+        children_shape = (2 * n, parents.shape[1])
+        shared_children = self._array('children', children_shape)
+        parents_name = self._blocks['parents'].name
+        children_name = self._blocks['children'].name
+        tasks = [(parents_name, parents.shape, children_name, children_shape, start,
+                  fathers[start:start + self._chunk_size], mothers[start:start + self._chunk_size],
+                  offspring_function, widths, sizes, seed, mutation_odds) for start, seed in zip(starts, seeds)]
+        for _ in self._executor.map(_breed_task, tasks):
+            pass
+        return shared_children.copy()
+
+    def close(self):
+        """
+        Stop the worker processes and release the shared memory. The breeder can still be used afterwards.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = dict()
+        self._parents_source = None
@@ -1,12 +1,79 @@
 import random
 
 
-def positive_random():
+class RandomStream(random.Random):
+    """
+    A pseudo-random number generator, owned by a single model, which can spawn independent child streams (for
+    example, one for each worker of a parallel computation). Child streams are seeded by a key made of the seed of
+    their parent and their spawn position, so they do not depend on the numbers drawn by the parent, and a model
+    spawns the same child streams whenever it is seeded with the same seed.
+    """
+
+    _key = None
+    _spawned = 0
+
+    def seed(self, a=None, version=2):
+        """
+        Seed the generator, and restart the spawning of child streams.
+
+        :param a: the seed. If None, the generator is seeded by the system, and so are its child streams
+        :param version: see random.Random.seed
+        """
+        super().seed(a, version)
+        self._key = str(a) if a is not None else '{0:032x}'.format(random.SystemRandom().getrandbits(128))
+        self._spawned = 0
+
+    def getstate(self):
+        return super().getstate(), self._key, self._spawned
+
+    def setstate(self, state):
+        internal_state, self._key, self._spawned = state
+        super().setstate(internal_state)
+
+    def spawn(self, n):
+        """
+        Create independent child streams. Each call returns new streams.
+
+        :param n: the number of streams
+        :return: a list of RandomStream
+        """
+        children = [RandomStream('{0}/{1}'.format(self._key, self._spawned + i)) for i in range(0, n)]
+        self._spawned += n
+        return children
+
+
+def positive_random(rng=random):
     """
     Generated a random float number in the range (0,1] rather than [0,1).
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
     :return: a random number
     """
-    r = random.random()
+    r = rng.random()
     if r == 0.0:
         r = 1.0
     return r
+
+
+def random_below(n, rng=random):
+    """
+    Generates a random integer in the range [0,n), by scaling a single uniform number. This is about twice as fast
+    as randrange, and the bias is negligible for any practical n.
+
+    :param n: a positive integer
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    :return: a random integer
+    """
+    return min(int(rng.random() * n), n - 1)
+
+
+def uniforms(size, rng=random):
+    """
+    Generates a block of uniform random numbers in the range [0,1) at once. Drawing all the numbers a loop requires
+    before the loop is cheaper than drawing them one at a time inside it.
+
+    :param size: the number of random numbers
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    :return: a list of random numbers
+    """
+    draw = rng.random
+    return [draw() for _ in range(0, size)]
@@ -0,0 +1,527 @@
+import bisect
+import heapq
+import math
+import random
+from itertools import accumulate
+from pycharles import random_util
+
+
+def _uniform_index(u, n, ignore_index=None):
+    """
+    Maps a uniform random number to an index in the range [0,n), while skipping ignore_index if provided. This is
+    used for uniform selections, and when the probabilities left to select from are all zero.
+
+    :param u: a uniform random number in the range [0,1)
+    :param n: the number of indices to choose from
+    :param ignore_index: if defined, this index will not be selected (unless it is the only one)
+    :return: an index
+    """
+    if ignore_index is None or n < 2:
+        i = int(u * n)
+        return i if i < n else n - 1
+    i = int(u * (n - 1))
+    if i >= n - 1:
+        i = n - 2
+    if i >= ignore_index:
+        i += 1
+    return i
+
+
+class RouletteWheel:
+    """
+    A fitness-proportional (roulette-wheel) selection table. The table holds the cumulative probabilities
+    of the population, and is built once per generation. Each draw is then a binary search over the table,
+    which costs O(log n) rather than a scan of the entire population.
+    """
+
+    _probabilities = list()
+    _cumulative = list()
+    _total = 0.0
+    _rng = random
+
+    def __init__(self, probabilities, rng=random):
+        """
+        Build a new selection table
+
+        :param probabilities: a sequence of the survival-probabilities of the population's Elements
+        :param rng: the pseudo-random number generator to draw from. Default: the random module
+        """
+        self._rng = rng
+        self._probabilities = list(probabilities)
+        self._cumulative = list(accumulate(self._probabilities))
+        self._total = self._cumulative[-1] if self._cumulative else 0.0
+
+    def __len__(self):
+        return len(self._probabilities)
+
+    def select(self, ignore_index=None):
+        """
+        Randomly selects a single index based on the probabilities of the table.
+
+        :param ignore_index: if defined, this index will not participate in the random selection. The probabilities
+                             of all other indices are scaled accordingly
+        :return: the selected index
+        """
+        return self._draw(self._rng.random(), ignore_index)
+
+    def _draw(self, u, ignore_index=None):
+        """
+        Selects a single index based on the probabilities of the table, given a uniform random number. Additional
+        random numbers are drawn only in rare cases.
+
+        :param u: a uniform random number in the range [0,1)
+        :param ignore_index: if defined, this index will not participate in the selection
+        :return: the selected index
+        """
+        n = len(self._cumulative)
+        if ignore_index is None:
+            p = 0.0
+            before = 0.0
+        else:
+            p = self._probabilities[ignore_index]
+            before = self._cumulative[ignore_index] - p
+        remaining = self._total - p
+        if remaining <= 0.0:
+            return _uniform_index(u, n, ignore_index)
+        r = (1.0 - u) * remaining
+        if ignore_index is not None and r > before:
+            # skip over the ignored slice of the wheel
+            r += p
+        i = min(bisect.bisect_left(self._cumulative, r), n - 1)
+        if i == ignore_index:
+            # can only happen due to floating-point rounding at the edges of the ignored slice
+            i = i + 1 if i + 1 < n else i - 1
+        return i
+
+    def select_couples(self, number_of_couples):
+        """
+        Selects pairs of indices, where the two indices of each pair are different. The random numbers of all
+        draws are drawn as a single block.
+
+        :param number_of_couples: the number of pairs to select
+        :return: a list of (father, mother) index tuples
+        """
+        draws = random_util.uniforms(2 * number_of_couples, self._rng)
+        couples = list()
+        for c in range(0, number_of_couples):
+            father = self._draw(draws[2 * c])
+            mother = self._draw(draws[2 * c + 1], father)
+            couples.append((father, mother))
+        return couples
+
+
+class FenwickWheel(RouletteWheel):
+    """
+    A fitness-proportional selection table based on a Fenwick tree (a binary indexed tree) of the weights. Building
+    the table is O(n), and both a draw and an update of a single weight are O(log n), so the table can follow a
+    population which changes only a few subjects at a time, rather than being rebuilt. The tree is rebuilt once every
+    n updates, so floating-point errors do not accumulate.
+    """
+
+    _tree = list()
+    _step = 0
+    _updates = 0
+
+    def __init__(self, probabilities, rng=random):
+        """
+        Build a new selection table
+
+        :param probabilities: a sequence of the survival-probabilities of the population's Elements, or of any
+                              non-negative weights proportional to them (such as their strengths)
+        :param rng: the pseudo-random number generator to draw from. Default: the random module
+        """
+        self._rng = rng
+        self._probabilities = list(probabilities)
+        self._build()
+
+    def _build(self):
+        n = len(self._probabilities)
+        tree = [0.0] + self._probabilities
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self._tree = tree
+        self._step = 1 << (n.bit_length() - 1) if n > 0 else 0
+        self._updates = 0
+
+    def _prefix(self, i):
+        """
+        Returns the sum of the first i weights
+        """
+        tree = self._tree
+        total = 0.0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, index, weight):
+        """
+        Change the weight of a single index
+
+        :param index: the index to update
+        :param weight: its new non-negative weight
+        """
+        delta = weight - self._probabilities[index]
+        self._probabilities[index] = weight
+        self._updates += 1
+        if self._updates > len(self._probabilities):
+            self._build()
+            return
+        tree = self._tree
+        n = len(self._probabilities)
+        i = index + 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def _draw(self, u, ignore_index=None):
+        """
+        Selects a single index based on the weights of the table, given a uniform random number.
+
+        :param u: a uniform random number in the range [0,1)
+        :param ignore_index: if defined, this index will not participate in the selection
+        :return: the selected index
+        """
+        n = len(self._probabilities)
+        total = self._prefix(n)
+        if ignore_index is None:
+            p = 0.0
+            before = 0.0
+        else:
+            p = self._probabilities[ignore_index]
+            before = self._prefix(ignore_index)
+        remaining = total - p
+        if remaining <= 0.0:
+            return _uniform_index(u, n, ignore_index)
+        r = (1.0 - u) * remaining
+        if ignore_index is not None and r > before:
+            # skip over the ignored slice of the wheel
+            r += p
+        # descend the tree to the first index whose cumulative weight reaches r
+        tree = self._tree
+        i = 0
+        step = self._step
+        while step > 0:
+            j = i + step
+            if j <= n and tree[j] < r:
+                i = j
+                r -= tree[j]
+            step >>= 1
+        i = min(i, n - 1)
+        if i == ignore_index and n > 1:
+            # can only happen due to floating-point rounding at the edges of the ignored slice
+            i = i + 1 if i + 1 < n else i - 1
+        return i
+
+
+class AliasTable(RouletteWheel):
+    """
+    A fitness-proportional selection table based on Walker's alias method. Building the table is O(n), and each
+    draw is O(1) - a single uniform index and a single biased coin flip, which are both taken out of a single
+    uniform random number: its integral part (once scaled) is the index, and its fractional part is the coin.
+    """
+
+    _alias = list()
+    _odds = list()
+
+    def __init__(self, probabilities, rng=random):
+        """
+        Build a new selection table
+
+        :param probabilities: a sequence of the survival-probabilities of the population's Elements
+        :param rng: the pseudo-random number generator to draw from. Default: the random module
+        """
+        super().__init__(probabilities, rng)
+        n = len(self._probabilities)
+        self._alias = list(range(0, n))
+        self._odds = [1.0] * n
+        if self._total <= 0.0:
+            return
+        scaled = [p * n / self._total for p in self._probabilities]
+        small = [i for i, s in enumerate(scaled) if s < 1.0]
+        large = [i for i, s in enumerate(scaled) if s >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._odds[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # whatever is left is 1.0 up to floating-point rounding
+        for i in small + large:
+            self._odds[i] = 1.0
+
+    def _draw(self, u, ignore_index=None):
+        """
+        Selects a single index based on the probabilities of the table, given a uniform random number. When the
+        selected index is ignore_index, new random numbers are drawn until another index is selected.
+
+        :param u: a uniform random number in the range [0,1)
+        :param ignore_index: if defined, this index will not participate in the selection
+        :return: the selected index
+        """
+        n = len(self._probabilities)
+        p = 0.0 if ignore_index is None else self._probabilities[ignore_index]
+        if self._total - p <= 0.0:
+            return _uniform_index(u, n, ignore_index)
+        if p > 0.5 * self._total:
+            # rejection would be slow when most of the wheel is ignored
+            return super()._draw(u, ignore_index)
+        while True:
+            x = u * n
+            i = min(int(x), n - 1)
+            if x - i >= self._odds[i]:
+                i = self._alias[i]
+            if i != ignore_index:
+                return i
+            u = self._rng.random()
+
+
+class StochasticUniversalSampling(RouletteWheel):
+    """
+    A fitness-proportional selection table which selects all parents of a generation in a single pass, using
+    stochastic universal sampling: evenly spaced pointers over the cumulative probabilities. This has the
+    same expected selection counts as the roulette-wheel, but with minimal spread.
+    """
+
+    _max_swap_attempts = 8
+
+    def sample(self, n):
+        """
+        Selects n indices in a single O(n) pass over the table.
+
+        :param n: the number of indices to select
+        :return: a list of indices, ordered by their position in the table
+        """
+        size = len(self._cumulative)
+        if self._total <= 0.0:
+            return [_uniform_index(u, size) for u in random_util.uniforms(n, self._rng)]
+        step = self._total / n
+        pointer = self._rng.random() * step
+        indices = list()
+        i = 0
+        for _ in range(0, n):
+            while i < size - 1 and self._cumulative[i] < pointer:
+                i += 1
+            indices.append(i)
+            pointer += step
+        return indices
+
+    def select_couples(self, number_of_couples):
+        """
+        Selects pairs of indices, where the two indices of each pair are different. All parents are drawn at once
+        and shuffled into couples. Couples made of the same index twice are fixed by swapping mothers with another
+        couple, or by drawing a new mother if no suitable swap was found.
+
+        :param number_of_couples: the number of pairs to select
+        :return: a list of (father, mother) index tuples
+        """
+        parents = self.sample(2 * number_of_couples)
+        self._rng.shuffle(parents)
+        fathers = parents[0::2]
+        mothers = parents[1::2]
+        for i in range(0, number_of_couples):
+            if fathers[i] != mothers[i]:
+                continue
+            for _ in range(0, self._max_swap_attempts):
+                j = random_util.random_below(number_of_couples, self._rng)
+                if fathers[j] != mothers[i] and fathers[i] != mothers[j]:
+                    mothers[i], mothers[j] = mothers[j], mothers[i]
+                    break
+            else:
+                mothers[i] = self.select(ignore_index=fathers[i])
+        return list(zip(fathers, mothers))
+
+
+class Tournament:
+    """
+    A tournament selection table. Each draw picks k Elements uniformly at random, and selects the strongest of
+    them. The table works directly on the strengths of the population, so the population does not need to be
+    normalized or sorted, and each draw costs O(k). Elements whose strength is 0 never compete, as they cannot
+    reproduce.
+    """
+
+    _strengths = list()
+    _size = 2
+    _rng = random
+    _candidates = list()
+    _candidate_positions = dict()
+
+    def __init__(self, strengths, size=2, rng=random):
+        """
+        Build a new selection table
+
+        :param strengths: a sequence of the strengths of the population's Elements
+        :param size: a positive integer. the number of Elements competing in each tournament
+        :param rng: the pseudo-random number generator to draw from. Default: the random module
+        """
+        self._strengths = list(strengths)
+        self._size = size
+        self._rng = rng
+        self._candidates = [i for i, s in enumerate(self._strengths) if s > 0.0]
+        self._candidate_positions = {i: p for p, i in enumerate(self._candidates)}
+
+    def __len__(self):
+        return len(self._strengths)
+
+    def update(self, index, strength):
+        """
+        Change the strength of a single index
+
+        :param index: the index to update
+        :param strength: its new strength
+        """
+        old = self._strengths[index]
+        self._strengths[index] = strength
+        positions = self._candidate_positions
+        if old > 0.0 and strength <= 0.0:
+            # the last candidate takes the place of the removed one
+            p = positions.pop(index)
+            last = self._candidates.pop()
+            if last != index:
+                self._candidates[p] = last
+                positions[last] = p
+        elif old <= 0.0 and strength > 0.0:
+            positions[index] = len(self._candidates)
+            self._candidates.append(index)
+
+    def select(self, ignore_index=None):
+        """
+        Selects a single index, the strongest out of k random indices.
+
+        :param ignore_index: if defined, this index will not participate in the random selection
+        :return: the selected index
+        """
+        return self._draw(random_util.uniforms(self._size, self._rng), 0, ignore_index)
+
+    def _draw(self, draws, start, ignore_index=None):
+        """
+        Selects a single index, given the uniform random numbers of a single draw. When no Element has a positive
+        strength, all Elements compete.
+
+        :param draws: a sequence of uniform random numbers in the range [0,1)
+        :param start: the position in draws of the random numbers of this draw
+        :param ignore_index: if defined, this index will not participate in the selection
+        :return: the selected index
+        """
+        candidates = self._candidates
+        if not candidates:
+            n = len(self._strengths)
+            return _uniform_index(draws[start], n, ignore_index)
+        n = len(candidates)
+        ignore = self._candidate_positions.get(ignore_index)
+        best = candidates[_uniform_index(draws[start], n, ignore)]
+        for k in range(start + 1, start + self._size):
+            i = candidates[_uniform_index(draws[k], n, ignore)]
+            if self._strengths[i] > self._strengths[best]:
+                best = i
+        return best
+
+    def select_couples(self, number_of_couples):
+        """
+        Selects pairs of indices, where the two indices of each pair are different. The random numbers of all
+        draws are drawn as a single block.
+
+        :param number_of_couples: the number of pairs to select
+        :return: a list of (father, mother) index tuples
+        """
+        k = self._size
+        draws = random_util.uniforms(2 * k * number_of_couples, self._rng)
+        couples = list()
+        for c in range(0, number_of_couples):
+            father = self._draw(draws, 2 * c * k)
+            mother = self._draw(draws, (2 * c + 1) * k, father)
+            couples.append((father, mother))
+        return couples
+
+
+class Truncation(Tournament):
+    """
+    A truncation selection table. Only the strongest fraction of the Elements whose strength is not 0 can
+    reproduce, and parents are selected uniformly out of it. Finding the strongest fraction is a partial ranking,
+    which costs O(n log m) for m selectable Elements, and each draw is O(1).
+    """
+
+    _ratio = 0.5
+    _pool = list()
+    _positions = dict()
+
+    def __init__(self, strengths, ratio=0.5, rng=random):
+        """
+        Build a new selection table
+
+        :param strengths: a sequence of the strengths of the population's Elements
+        :param ratio: a number in the range (0,1]. the fraction of the Elements whose strength is not 0 which can be
+                      selected. At least two Elements can always be selected
+        :param rng: the pseudo-random number generator to draw from. Default: the random module
+        """
+        super().__init__(strengths, 1, rng)
+        self._ratio = ratio
+        self._rank_pool(self._pool_size())
+
+    def _pool_size(self):
+        alive_num = len(self._candidates)
+        return max(min(alive_num, max(2, math.ceil(self._ratio * alive_num))), min(len(self._strengths), 2))
+
+    def _rank_pool(self, m):
+        self._pool = heapq.nlargest(m, range(0, len(self._strengths)), key=self._strengths.__getitem__)
+        self._positions = {i: p for p, i in enumerate(self._pool)}
+
+    def update(self, index, strength):
+        """
+        Change the strength of a single index. The strongest fraction of the population is ranked again only if the
+        index joins or leaves it, or if its size changes.
+
+        :param index: the index to update
+        :param strength: its new strength
+        """
+        super().update(index, strength)
+        m = self._pool_size()
+        if m != len(self._pool) or index in self._positions or \
+                (self._pool and strength > self._strengths[self._pool[-1]]):
+            self._rank_pool(m)
+
+    def _draw(self, draws, start, ignore_index=None):
+        """
+        Selects a single index uniformly out of the strongest fraction of the population.
+
+        :param draws: a sequence of uniform random numbers in the range [0,1)
+        :param start: the position in draws of the random number of this draw
+        :param ignore_index: if defined, this index will not participate in the selection
+        :return: the selected index
+        """
+        return self._pool[_uniform_index(draws[start], len(self._pool), self._positions.get(ignore_index))]
+
+
+_selection_tables = {'roulette': RouletteWheel,
+                     'alias': AliasTable,
+                     'sus': StochasticUniversalSampling,
+                     'tournament': Tournament,
+                     'truncation': Truncation}
+
+proportional_methods = ('roulette', 'alias', 'sus')
+
+
+def selection_table(method, weights, parameter=None, rng=random):
+    """
+    Build the selection table of the requested method.
+
+    :param method: string. one of 'roulette', 'alias', 'sus', 'tournament' or 'truncation'
+    :param weights: for fitness-proportional methods (see proportional_methods), a sequence of the
+                    survival-probabilities of the population's Elements. Otherwise, a sequence of their strengths
+    :param parameter: optional. the tournament size or the truncation ratio
+    :param rng: the pseudo-random number generator to draw from. Default: the random module
+    :return: a selection table
+    """
+    try:
+        table = _selection_tables[method]
+    except KeyError:
+        raise ValueError('Unknown selection method {0}'.format(method))
+    if parameter is None:
+        return table(weights, rng=rng)
+    return table(weights, parameter, rng)
@@ -0,0 +1,78 @@
+class EvolutionStats:
+    """
+    Records the wall time and number of calls of each phase of the evolution (evaluation, ranking, selection,
+    breeding, mutation, duplicates handling...) and event counters (fitness evaluations, cache hits, duplicates
+    removed...), separately for each generation.
+    """
+
+    _generations = list()
+    _current = None
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._generations = list()
+        self._current = None
+
+    def get_generations(self): return self._generations
+
+    def start_generation(self, generation):
+        """
+        Start recording a new generation. A generation which was not ended is ended first.
+
+        :param generation: the number of the generation
+        """
+        self.end_generation()
+        self._current = {'generation': generation, 'times': dict(), 'calls': dict(), 'counters': dict()}
+
+    def end_generation(self):
+        """
+        Stop recording the current generation.
+
+        :return: the record of the generation, or None if no generation was recorded
+        """
+        record = self._current
+        if record is not None:
+            self._generations.append(record)
+            self._current = None
+        return record
+
+    def add_time(self, phase, seconds):
+        """
+        Record a single call of a phase
+
+        :param phase: string. the name of the phase
+        :param seconds: the wall time of the call
+        """
+        if self._current is None:
+            return
+        times = self._current['times']
+        calls = self._current['calls']
+        times[phase] = times.get(phase, 0.0) + seconds
+        calls[phase] = calls.get(phase, 0) + 1
+
+    def count(self, counter, n=1):
+        """
+        Increase a counter of the current generation
+
+        :param counter: string. the name of the counter
+        :param n: the amount to add
+        """
+        if self._current is None:
+            return
+        counters = self._current['counters']
+        counters[counter] = counters.get(counter, 0) + n
+
+    def get_totals(self):
+        """
+        Returns the times, calls and counters summed over all recorded generations
+
+        :return: a dict with the keys 'generations', 'times', 'calls' and 'counters'
+        """
+        totals = {'generations': len(self._generations), 'times': dict(), 'calls': dict(), 'counters': dict()}
+        for record in self._generations:
+            for field in ('times', 'calls', 'counters'):
+                for name, value in record[field].items():
+                    totals[field][name] = totals[field].get(name, 0) + value
+        return totals
@@ -0,0 +1,120 @@
+import heapq
+import random
+from pycharles import selection
+
+
+class SteadyState:
+    """
+    The bookkeeping of steady-state evolution, where each step replaces only a few subjects of the population. Each
+    subject is identified by its slot (its position in the population), and its strength is kept in a selection
+    table which is updated one slot at a time (a FenwickWheel for fitness-proportional methods), and in a min-heap,
+    which finds the weakest slot. The heap is updated lazily: entries whose strength no longer matches the strength
+    of their slot are discarded when they reach the top, and the heap is compacted once it holds too many of them.
+    Both the selection and the replacement of a subject therefore cost O(log n), rather than O(n).
+
+    Optionally, the number of copies of each genome in the population is kept as well, so children which duplicate
+    an existing subject can be detected.
+    """
+
+    _strengths = list()
+    _table = None
+    _heap = list()
+    _alive_num = 0
+    _keys = None
+    _copies = None
+
+    def __init__(self, strengths, method, parameter=None, rng=random, keys=None):
+        """
+        Create the bookkeeping of a population
+
+        :param strengths: a sequence of the strengths of the population's subjects
+        :param method: string. the selection method, one of 'roulette', 'alias', 'sus', 'tournament' or
+                       'truncation'. Fitness-proportional methods all select using a FenwickWheel
+        :param parameter: optional. the tournament size or the truncation ratio
+        :param rng: the pseudo-random number generator to draw from. Default: the random module
+        :param keys: optional. a sequence of canonical, hashable keys of the genomes of the population's subjects
+        """
+        self._strengths = list(strengths)
+        if method in selection.proportional_methods:
+            self._table = selection.FenwickWheel(self._strengths, rng)
+        else:
+            self._table = selection.selection_table(method, self._strengths, parameter, rng)
+        self._heap = [(s, slot) for slot, s in enumerate(self._strengths)]
+        heapq.heapify(self._heap)
+        self._alive_num = sum(1 for s in self._strengths if s > 0.0)
+        if keys is None:
+            self._keys = None
+            self._copies = None
+        else:
+            self._keys = list(keys)
+            self._copies = dict()
+            for key in self._keys:
+                self._copies[key] = self._copies.get(key, 0) + 1
+
+    def __len__(self):
+        return len(self._strengths)
+
+    def __contains__(self, key):
+        return self._copies is not None and key in self._copies
+
+    def get_table(self): return self._table
+    def get_alive_num(self): return self._alive_num
+    def get_strength(self, slot): return self._strengths[slot]
+
+    def weakest(self):
+        """
+        Find the slot of the weakest subject
+
+        :return: a slot
+        """
+        heap = self._heap
+        while heap[0][0] != self._strengths[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0][1]
+
+    def _push(self, strength, slot):
+        heapq.heappush(self._heap, (strength, slot))
+        if len(self._heap) > 2 * len(self._strengths):
+            # too many outdated entries
+            self._heap = [(s, i) for i, s in enumerate(self._strengths)]
+            heapq.heapify(self._heap)
+
+    def set(self, slot, strength, key=None):
+        """
+        Record a new subject in a slot
+
+        :param slot: the slot of the new subject
+        :param strength: the strength of the new subject
+        :param key: the key of the new subject's genome, when the keys of the population are kept
+        """
+        old = self._strengths[slot]
+        self._alive_num += (strength > 0.0) - (old > 0.0)
+        self._strengths[slot] = strength
+        self._table.update(slot, strength)
+        self._push(strength, slot)
+        if self._keys is not None:
+            old_key = self._keys[slot]
+            if self._copies[old_key] == 1:
+                del self._copies[old_key]
+            else:
+                self._copies[old_key] -= 1
+            self._keys[slot] = key
+            self._copies[key] = self._copies.get(key, 0) + 1
+
+    def swap(self, slot1, slot2):
+        """
+        Record that the subjects of two slots switched places
+
+        :param slot1: a slot
+        :param slot2: a slot
+        """
+        strength1 = self._strengths[slot1]
+        strength2 = self._strengths[slot2]
+        self._strengths[slot1] = strength2
+        self._strengths[slot2] = strength1
+        self._table.update(slot1, strength2)
+        self._table.update(slot2, strength1)
+        self._push(strength2, slot1)
+        self._push(strength1, slot2)
+        if self._keys is not None:
+            self._keys[slot1], self._keys[slot2] = self._keys[slot2], self._keys[slot1]
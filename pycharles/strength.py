@@ -0,0 +1,114 @@
+import asyncio
+import inspect
+import math
+from functools import partial
+
+
+def _batch_strength(strength_function, subjects):
+    return [strength_function(subject) for subject in subjects]
+
+
+def batched(strength_function):
+    """
+    An adapter which turns a strength function of a single subject into a batch strength function, which maps
+    a sequence of subjects to a sequence of strengths. The adapter can be pickled whenever strength_function can,
+    so it can be sent to worker processes.
+
+    :param strength_function: a function that maps a subject to a non-negative number
+    :return: a function f(subjects) => strengths
+    """
+    return partial(_batch_strength, strength_function)
+
+
+def _validated(strengths, subjects_num):
+    strengths = list(strengths)
+    if len(strengths) != subjects_num:
+        raise ValueError("Strength function returned {0} strengths for {1} subjects"
+                         .format(len(strengths), subjects_num))
+    for s in strengths:
+        if s < 0.0:
+            raise ValueError("Strength must be non-negative")
+    return strengths
+
+
+def evaluate(batch_strength_function, subjects, executor=None, chunk_size=None, workers=1):
+    """
+    Evaluate a batch of subjects using a batch strength function, and validate its output. When an executor is
+    provided, the subjects are split into chunks which are evaluated by the executor's workers, and the results
+    are gathered in the original order of the subjects. If a worker raises an exception, the remaining chunks are
+    cancelled and the exception is raised here.
+
+    :param batch_strength_function: a function that maps a sequence of subjects to a sequence of non-negative numbers
+    :param subjects: a sequence of subjects (or a matrix of gene indices)
+    :param executor: optional. a concurrent.futures.Executor
+    :param chunk_size: the number of subjects in each chunk sent to the executor. If None, the subjects are split to
+                       about four chunks per worker
+    :param workers: a positive integer. the number of the executor's workers, used when chunk_size is None
+    :return: a list of strengths, one per subject
+    """
+    n = len(subjects)
+    if executor is None or n == 0:
+        return _validated(batch_strength_function(subjects), n)
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(n / (4 * workers)))
+    chunks = [subjects[i:i+chunk_size] for i in range(0, n, chunk_size)]
+    strengths = list()
+    for chunk, chunk_strengths in zip(chunks, executor.map(batch_strength_function, chunks)):
+        strengths.extend(_validated(chunk_strengths, len(chunk)))
+    return strengths
+
+
+async def _awaited(result, timeout, timeout_strength):
+    """
+    Await the result of a strength function, if it is awaitable, within the provided timeout.
+
+    :return: the result, or timeout_strength if the timeout has expired and timeout_strength is not None
+    """
+    if not inspect.isawaitable(result):
+        return result
+    try:
+        return await asyncio.wait_for(result, timeout)
+    except asyncio.TimeoutError:
+        if timeout_strength is None:
+            raise
+        return timeout_strength
+
+
+async def evaluate_async(strength_function, subjects, batch=False, concurrency=None, timeout=None,
+                         timeout_strength=None):
+    """
+    Evaluate a batch of subjects concurrently, and validate the output. The strength function may either be a
+    coroutine function or a regular function. If an evaluation fails, all other evaluations are cancelled and
+    the exception is raised here.
+
+    :param strength_function: a function that maps a subject to a non-negative number, or a batch strength
+                              function if batch is True
+    :param subjects: a sequence of subjects (or a matrix of gene indices)
+    :param batch: Boolean. whether strength_function is a batch strength function
+    :param concurrency: None or a positive integer. the maximal number of evaluations awaited at once
+    :param timeout: None or a positive number. the maximal number of seconds a single evaluation may take
+    :param timeout_strength: None or a non-negative number. the strength of subjects whose evaluation timed out.
+                             When None, asyncio.TimeoutError is raised
+    :return: a list of strengths, one per subject
+    """
+    n = len(subjects)
+    if batch:
+        strengths = await _awaited(strength_function(subjects), timeout, None if timeout_strength is None
+                                   else [timeout_strength] * n)
+        return _validated(strengths, n)
+    semaphore = asyncio.Semaphore(concurrency) if concurrency is not None else None
+
+    async def evaluate_one(subject):
+        if semaphore is None:
+            return await _awaited(strength_function(subject), timeout, timeout_strength)
+        async with semaphore:
+            return await _awaited(strength_function(subject), timeout, timeout_strength)
+
+    tasks = [asyncio.ensure_future(evaluate_one(subject)) for subject in subjects]
+    try:
+        strengths = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return _validated(strengths, n)
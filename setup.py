@@ -9,4 +9,5 @@ setup(name='pycharles',
       author_email='shakedzy@gmail.com',
       url='https://github.com/shakedzy/pycharles',
       packages=find_packages(),
+      extras_require={'numpy': ['numpy']},
      )
\ No newline at end of file